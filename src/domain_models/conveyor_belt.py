@@ -1,8 +1,12 @@
-from typing import Any, Union
+import copy
+from array import array
+from typing import Any, Dict, List, Set, Tuple, Union
 
 from src.domain_models.common import BaseModel
-from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig
-from src.helpers.data_structures import Queue
+from src.exceptions.exceptions import QueueEmptyError
+from src.exceptions.messages import EMPTY_QUEUE, INVALID_QUEUE_POSITION
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig, ItemCodes
+from src.helpers.data_structures import MaxSizeQueue, OverflowPolicy
 
 
 class ConveyorBeltState:
@@ -10,9 +14,13 @@ class ConveyorBeltState:
     BUSY = 'busy'
 
 
-class ConveyorBelt(Queue, BaseModel):
+class ConveyorBelt(MaxSizeQueue, BaseModel):
+    """
+    Fixed length conveyor belt. Slot 0 is where new items arrive and the last slot is where items leave the belt.
+    Enqueueing an item onto a full belt pushes the item from the last slot off the belt.
+    """
     def __init__(self, config: FactoryFloorConfig):
-        super(). __init__()
+        super().__init__(max_size=config.conveyor_belt_slots, overflow_policy=OverflowPolicy.DROP_OLDEST)
         self._config = config
         self._slot_states = {}
         self._set_slot_states_to_free()
@@ -38,7 +46,7 @@ class ConveyorBelt(Queue, BaseModel):
         -------
             Item at the slot_number.
         """
-        return self._items[slot_number]
+        return self[slot_number]
 
     def put_item_in_slot(self, slot_number: int, item: str):
         """
@@ -52,7 +60,7 @@ class ConveyorBelt(Queue, BaseModel):
             Item which we want to insert.
         """
         self._set_slot_state(slot_number=slot_number, state=ConveyorBeltState.BUSY)
-        self._items[slot_number] = item
+        self[slot_number] = item
 
     def confirm_operation_at_slot_finished(self, slot_number: int):
         """
@@ -87,7 +95,7 @@ class ConveyorBelt(Queue, BaseModel):
             Slot of the conveyor belt at which we need to check if empty.
         """
 
-        return self._items[slot_number] == self._config.empty_code
+        return self[slot_number] == self._config.empty_code
 
     def is_slot_free(self, slot_number: int) -> bool:
         """
@@ -100,6 +108,16 @@ class ConveyorBelt(Queue, BaseModel):
         """
         return self._get_slot_state(slot_number) == ConveyorBeltState.FREE
 
+    def busy_bitmap(self) -> bytes:
+        """
+        Returns busy slots as a bitmap, bit slot_number & 7 of byte slot_number >> 3 set if the slot is busy.
+        """
+        bitmap = bytearray((self._config.conveyor_belt_slots + 7) // 8)
+        for slot_number, slot_state in self._slot_states.items():
+            if slot_state == ConveyorBeltState.BUSY:
+                bitmap[slot_number >> 3] |= 1 << (slot_number & 7)
+        return bytes(bitmap)
+
     def retrieve_item_from_slot(self, slot_number: int) -> Any:
         """
         Returns an item present in the slot: slot_number.
@@ -120,6 +138,34 @@ class ConveyorBelt(Queue, BaseModel):
 
         return item
 
+    def snapshot(self) -> Tuple[Tuple, Tuple]:
+        """
+        Returns items and slot states of the belt in slot order as a hashable tuple.
+        """
+        return tuple(self.items), tuple(self._slot_states.values())
+
+    def restore(self, snapshot: Tuple[Tuple, Tuple]):
+        """
+        Sets items and slot states of the belt from a snapshot.
+        """
+        items, slot_states = snapshot
+        self.clear()
+        for item in reversed(items):
+            self.enqueue(item)
+        self._slot_states = dict(enumerate(slot_states))
+
+    def fork(self) -> 'ConveyorBelt':
+        """
+        Returns a new belt with the same items and slot states, independent of this one.
+
+        The buffer is copied eagerly rather than on the first write: every tick moves the whole belt, so a fork which
+        is run at all would copy it in its first tick anyway. The copy is a single list copy of the buffer.
+        """
+        conveyor_belt = copy.copy(self)
+        conveyor_belt._buffer = list(self._buffer)
+        conveyor_belt._slot_states = dict(self._slot_states)
+        return conveyor_belt
+
     def _set_slot_states_to_free(self):
         for slot_number in range(self._config.conveyor_belt_slots):
             self._slot_states[slot_number] = ConveyorBeltState.FREE
@@ -133,3 +179,340 @@ class ConveyorBelt(Queue, BaseModel):
 
     def _get_slot_state(self, slot_number: int) -> Union[str, None]:
         return self._slot_states.get(slot_number)
+
+
+class CompactConveyorBelt(BaseModel):
+    """
+    Fixed length conveyor belt with the same methods as ConveyorBelt, taking a few bytes per slot.
+
+    Items are kept as codes in a ring buffer of unsigned bytes, widened to larger integers only if more than 256
+    distinct items show up. Slot states are packed one bit per slot, set when the slot is busy. If config is interned
+    the items already are codes, otherwise the belt encodes items on the way in and decodes them on the way out.
+    """
+    def __init__(self, config: FactoryFloorConfig):
+        self._config = config
+        self._item_codes = None if config.item_codes is not None else ItemCodes(config)
+        self._max_size = config.conveyor_belt_slots
+        self._empty = self._encode(config.empty_code)
+        self._codes = array('B', [self._empty]) * self._max_size
+        self._busy = bytearray((self._max_size + 7) // 8)
+        self._head = 0
+        self._size = self._max_size
+
+    @property
+    def config(self):
+        return self._config
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def is_empty(self) -> bool:
+        return self._size == 0
+
+    @property
+    def is_full(self) -> bool:
+        return self._size == self._max_size
+
+    @property
+    def slot_states(self) -> Dict[int, str]:
+        """
+        Returns state of every slot keyed by slot number. This is a copy built on every call.
+        """
+        return {
+            slot_number: ConveyorBeltState.BUSY if self.is_slot_busy(slot_number) else ConveyorBeltState.FREE
+            for slot_number in range(self._max_size)
+        }
+
+    @property
+    def items(self) -> List[Any]:
+        """
+        Returns items of the belt in slot order. This is a copy.
+        """
+        return [self._decode(self._codes[(self._head + position) % self._max_size]) for position in range(self._size)]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, position: int) -> Any:
+        return self._decode(self._codes[self._index(position)])
+
+    def __setitem__(self, position: int, item):
+        self._store(self._index(position), self._encode(item))
+
+    def enqueue(self, item) -> Any:
+        """
+        Puts item in slot 0. If the belt is full the item in the last slot is pushed off the belt and returned.
+        """
+        dropped_item = self.dequeue() if self._size == self._max_size else None
+        self._head = (self._head - 1) % self._max_size
+        self._size += 1
+        self._store(self._head, self._encode(item))
+        return dropped_item
+
+    def dequeue(self) -> Any:
+        """
+        Removes and returns item in the last occupied slot.
+        """
+        if self._size == 0:
+            raise QueueEmptyError(EMPTY_QUEUE)
+        self._size -= 1
+        return self._decode(self._codes[(self._head + self._size) % self._max_size])
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def check_item_at_slot(self, slot_number: int) -> Any:
+        return self[slot_number]
+
+    def put_item_in_slot(self, slot_number: int, item: str):
+        self._set_busy(slot_number)
+        self[slot_number] = item
+
+    def confirm_operation_at_slot_finished(self, slot_number: int):
+        self._busy[slot_number >> 3] &= ~(1 << (slot_number & 7))
+
+    def is_slot_busy(self, slot_number: int) -> bool:
+        return bool(self._busy[slot_number >> 3] >> (slot_number & 7) & 1)
+
+    def is_slot_empty(self, slot_number: int) -> bool:
+        return self._codes[self._index(slot_number)] == self._empty
+
+    def is_slot_free(self, slot_number: int) -> bool:
+        return not self._busy[slot_number >> 3] >> (slot_number & 7) & 1
+
+    def busy_bitmap(self) -> bytes:
+        """
+        Returns busy slots as a bitmap in the layout of ConveyorBelt.busy_bitmap, a copy of the slot states.
+        """
+        return bytes(self._busy)
+
+    def retrieve_item_from_slot(self, slot_number: int) -> Any:
+        self._set_busy(slot_number)
+        index = self._index(slot_number)
+        item = self._decode(self._codes[index])
+        self._codes[index] = self._empty
+        return item
+
+    def snapshot(self) -> Tuple[Tuple, Tuple]:
+        """
+        Returns items and slot states of the belt in slot order as a hashable tuple, the same as ConveyorBelt.
+        """
+        return tuple(self.items), tuple(self.slot_states.values())
+
+    def restore(self, snapshot: Tuple[Tuple, Tuple]):
+        items, slot_states = snapshot
+        self.clear()
+        for item in reversed(items):
+            self.enqueue(item)
+        self._busy = bytearray(len(self._busy))
+        for slot_number, slot_state in enumerate(slot_states):
+            if slot_state == ConveyorBeltState.BUSY:
+                self._set_busy(slot_number)
+
+    def fork(self) -> 'CompactConveyorBelt':
+        """
+        Returns a new belt with the same items and slot states, independent of this one. Like ConveyorBelt.fork the
+        buffers are copied eagerly, a few bytes per slot.
+        """
+        conveyor_belt = copy.copy(self)
+        conveyor_belt._codes = array(self._codes.typecode, self._codes)
+        conveyor_belt._busy = bytearray(self._busy)
+        return conveyor_belt
+
+    def _index(self, position: int) -> int:
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError(INVALID_QUEUE_POSITION.format(position=position, size=self._size))
+        return (self._head + position) % self._max_size
+
+    def _set_busy(self, slot_number: int):
+        self._busy[slot_number >> 3] |= 1 << (slot_number & 7)
+
+    def _store(self, index: int, code: int):
+        try:
+            self._codes[index] = code
+        except OverflowError:
+            self._codes = array('L', self._codes)
+            self._codes[index] = code
+
+    def _encode(self, item) -> int:
+        return self._item_codes.encode(item) if self._item_codes is not None else item
+
+    def _decode(self, code: int) -> Any:
+        return self._item_codes.decode(code) if self._item_codes is not None else code
+
+
+class SparseConveyorBelt(BaseModel):
+    """
+    Fixed length conveyor belt with the same methods as ConveyorBelt which stores only slots not holding the empty code
+    and only busy slot states, so memory follows the occupied slots rather than the length of the belt.
+
+    Items are keyed by their position in the stream of enqueued items. Slot slot_number holds the item at position
+    offset - slot_number, so moving the belt only moves the offset and costs O(1) however long the belt is.
+    """
+    def __init__(self, config: FactoryFloorConfig):
+        self._config = config
+        self._empty = config.empty_code
+        self._max_size = config.conveyor_belt_slots
+        self._items: Dict[int, Any] = {}
+        self._busy_slots: Set[int] = set()
+        self._offset = 0
+        self._size = self._max_size
+
+    @property
+    def config(self):
+        return self._config
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def is_empty(self) -> bool:
+        return self._size == 0
+
+    @property
+    def is_full(self) -> bool:
+        return self._size == self._max_size
+
+    @property
+    def num_occupied_slots(self) -> int:
+        return len(self._items)
+
+    @property
+    def slot_states(self) -> Dict[int, str]:
+        """
+        Returns state of every slot keyed by slot number. This is a copy built on every call.
+        """
+        return {
+            slot_number: ConveyorBeltState.BUSY if slot_number in self._busy_slots else ConveyorBeltState.FREE
+            for slot_number in range(self._max_size)
+        }
+
+    @property
+    def items(self) -> List[Any]:
+        """
+        Returns items of the belt in slot order. This is a copy.
+        """
+        return [self._items.get(self._offset - position, self._empty) for position in range(self._size)]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, position: int) -> Any:
+        return self._items.get(self._key(position), self._empty)
+
+    def __setitem__(self, position: int, item):
+        key = self._key(position)
+        if item == self._empty:
+            self._items.pop(key, None)
+        else:
+            self._items[key] = item
+
+    def enqueue(self, item) -> Any:
+        """
+        Puts item in slot 0. If the belt is full the item in the last slot is pushed off the belt and returned.
+        """
+        dropped_item = self.dequeue() if self._size == self._max_size else None
+        self._offset += 1
+        self._size += 1
+        if item != self._empty:
+            self._items[self._offset] = item
+        return dropped_item
+
+    def dequeue(self) -> Any:
+        """
+        Removes and returns item in the last occupied slot.
+        """
+        if self._size == 0:
+            raise QueueEmptyError(EMPTY_QUEUE)
+        self._size -= 1
+        return self._items.pop(self._offset - self._size, self._empty)
+
+    def clear(self):
+        self._items = {}
+        self._size = 0
+
+    def check_item_at_slot(self, slot_number: int) -> Any:
+        return self[slot_number]
+
+    def put_item_in_slot(self, slot_number: int, item: str):
+        self._busy_slots.add(slot_number)
+        self[slot_number] = item
+
+    def confirm_operation_at_slot_finished(self, slot_number: int):
+        self._busy_slots.discard(slot_number)
+
+    def is_slot_busy(self, slot_number: int) -> bool:
+        return slot_number in self._busy_slots
+
+    def is_slot_empty(self, slot_number: int) -> bool:
+        return self._key(slot_number) not in self._items
+
+    def is_slot_free(self, slot_number: int) -> bool:
+        return slot_number not in self._busy_slots
+
+    def busy_bitmap(self) -> bytes:
+        """
+        Returns busy slots as a bitmap in the layout of ConveyorBelt.busy_bitmap. Costs O(busy slots) besides
+        allocating the bitmap.
+        """
+        bitmap = bytearray((self._max_size + 7) // 8)
+        for slot_number in self._busy_slots:
+            bitmap[slot_number >> 3] |= 1 << (slot_number & 7)
+        return bytes(bitmap)
+
+    def retrieve_item_from_slot(self, slot_number: int) -> Any:
+        self._busy_slots.add(slot_number)
+        return self._items.pop(self._key(slot_number), self._empty)
+
+    def snapshot(self) -> Tuple[Tuple, Tuple]:
+        """
+        Returns items and slot states of the belt in slot order as a hashable tuple, the same as ConveyorBelt.
+        """
+        return tuple(self.items), tuple(self.slot_states.values())
+
+    def restore(self, snapshot: Tuple[Tuple, Tuple]):
+        items, slot_states = snapshot
+        self.clear()
+        for item in reversed(items):
+            self.enqueue(item)
+        self._busy_slots = {
+            slot_number for slot_number, slot_state in enumerate(slot_states) if slot_state == ConveyorBeltState.BUSY
+        }
+
+    def fork(self) -> 'SparseConveyorBelt':
+        """
+        Returns a new belt with the same items and slot states, independent of this one. Costs O(occupied slots).
+        """
+        conveyor_belt = SparseConveyorBelt(config=self._config)
+        conveyor_belt._items = dict(self._items)
+        conveyor_belt._busy_slots = set(self._busy_slots)
+        conveyor_belt._offset = self._offset
+        conveyor_belt._size = self._size
+        return conveyor_belt
+
+    def _key(self, position: int) -> int:
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError(INVALID_QUEUE_POSITION.format(position=position, size=self._size))
+        return self._offset - position
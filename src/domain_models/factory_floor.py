@@ -1,19 +1,67 @@
-from typing import List
+import itertools
+import os
+import pickle
+from typing import Any, Callable, Dict, Hashable, Iterator, List, NamedTuple, Optional, Tuple, Type, Union
 
 from src.domain_models.common import BaseModel
-from src.domain_models.conveyor_belt import ConveyorBelt
+from src.domain_models.conveyor_belt import CompactConveyorBelt, ConveyorBelt, SparseConveyorBelt
 from src.domain_models.feeder import Feeder
+from src.domain_models.intents import ConflictPolicy, TickMode, policy_phase, resolve_intents, validate_tick_mode
+from src.domain_models.profiler import FloorProfiler, perf_counter_ns
 from src.domain_models.receiver import Receiver
-from src.domain_models.worker import Worker, WorkerOperationTimes
-from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig
-from src.exceptions.exceptions import FactoryConfigError
-from src.exceptions.messages import WRONG_FACTORY_CONFIG, INSUFFICIENT_FEED_INPUT
+from src.domain_models.scheduler import WorkerScheduler
+from src.domain_models.trace import TraceRecorder
+from src.domain_models.utilization import Utilization
+from src.domain_models.worker import OperationCounts, Worker, WorkerOperationTimes
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig, ItemCodes
+from src.exceptions.exceptions import CheckpointError, FactoryConfigError
+from src.exceptions.messages import (
+    WRONG_FACTORY_CONFIG, INSUFFICIENT_FEED_INPUT, UNKNOWN_FEED_PERIOD, INVALID_CHECKPOINT_VERSION,
+    CHECKPOINT_CONFIG_MISMATCH, EVENT_DRIVEN_TWO_PHASE, FAST_FORWARD_UTILIZATION,
+)
+
+CHECKPOINT_VERSION = 1
+
+
+class FloorSnapshot(NamedTuple):
+    time: int
+    conveyor_belt: Tuple
+    workers: Tuple
+    feeder: Tuple
+    receiver: Tuple
+
+
+class StepEvent(NamedTuple):
+    """
+    What happened in a tick: the item delivered to the receiver and the number of components picked up, products
+    dropped and products built by the workers.
+    """
+    tick: int
+    delivered_item: Any
+    pickups: int
+    drops: int
+    builds: int
 
 
 class FactoryFloor(BaseModel):
     """
     This is the controller of the entire operation. It will navigate the production line.
     By default the number of pairs matches the number of slots on the belt.
+
+    The belt is a conveyor_belt_class, e.g. CompactConveyorBelt for long belts or SparseConveyorBelt for long, mostly
+    empty ones, unless conveyor_belt is given.
+
+    If config.intern_items is True the belt and the workers are built from config.interned() and work with integer
+    item codes. Items are encoded when they come from the feeder and decoded when they leave for the receiver.
+    Interning pays off only with CompiledWorker, which keeps components as a bitmask over the codes, and with
+    CompactConveyorBelt, which stores the codes directly. Worker keeps components in a list and checks them by
+    membership whether items are codes or not, so with Worker and ConveyorBelt the encoding at the edges makes an
+    interned run slightly slower.
+
+    With tick_mode=TickMode.TWO_PHASE workers do not work one after another. They all declare what they want to do
+    against the belt as it was at the start of the tick, conflict_policy decides who gets a contended slot and then all
+    changes are made together. Results differ from the sequential mode where workers at a slot used to see each other's
+    changes within a tick, e.g. a product can no longer be dropped into a slot emptied by a pick up in the same tick.
     """
     def __init__(self,
                  config: FactoryFloorConfig = None,
@@ -21,27 +69,51 @@ class FactoryFloor(BaseModel):
                  receiver: Receiver = None,
                  conveyor_belt: ConveyorBelt = None,
                  workers: List[Worker] = None,
+                 worker_class: Type[Worker] = Worker,
+                 conveyor_belt_class: Type[Union[ConveyorBelt, CompactConveyorBelt, SparseConveyorBelt]] = ConveyorBelt,
+                 tick_mode: str = TickMode.SEQUENTIAL,
+                 conflict_policy: str = ConflictPolicy.LOWEST_PAIR,
                  ):
+        validate_tick_mode(tick_mode, conflict_policy)
 
         self.config = config if config else FactoryFloorConfig()
+        self._floor_config = self.config.interned() if self.config.intern_items else self.config
+        self._item_codes = self._floor_config.item_codes
         self.feeder = feeder if feeder else Feeder()
-        self.receiver = receiver if receiver else Receiver()
-        self.conveyor_belt = conveyor_belt if conveyor_belt else ConveyorBelt(config=self.config)
+        self.receiver = receiver if receiver else Receiver(config=self.config)
+        self.conveyor_belt = conveyor_belt if conveyor_belt else conveyor_belt_class(config=self._floor_config)
         self.num_pairs = self.config.num_pairs or self.conveyor_belt.config.conveyor_belt_slots
         if self.num_pairs > self.conveyor_belt.config.conveyor_belt_slots:
             raise FactoryConfigError(WRONG_FACTORY_CONFIG)
         self.time = 0
+        self.worker_class = worker_class
         self.workers = workers if workers else self.add_workers()
+        self.operation_counts = OperationCounts()
+        for worker in self.workers:
+            worker.operation_counts = self.operation_counts
+        self.tick_mode = tick_mode
+        self.conflict_policy = conflict_policy
+        self._scheduler: Optional[WorkerScheduler] = None
+        self._profiler: Optional[FloorProfiler] = None
+        self.utilization: Optional[Utilization] = None
+
+    @property
+    def item_codes(self) -> Optional[ItemCodes]:
+        """
+        Returns codes of items on the belt if items are interned, None otherwise.
+        """
+        return self._item_codes
 
     def add_workers(self):
         """
-        Creates a pair of workers per num_pairs. Each worker pair is assigned to a slot_number on the conveyor belt.
+        Creates a pair of workers of worker_class per num_pairs, e.g. CompiledWorker for a faster, table driven
+        implementation. Each worker pair is assigned to a slot_number on the conveyor belt.
         """
         workers = []
         for slot_number in range(self.num_pairs):
             for pair_number in range(2):
-                worker = Worker(
-                        config=self.config,
+                worker = self.worker_class(
+                        config=self._floor_config,
                         name=f'slot={slot_number}, pair={pair_number}',
                         conveyor_belt=self.conveyor_belt,
                         operation_times=WorkerOperationTimes,
@@ -50,33 +122,333 @@ class FactoryFloor(BaseModel):
                 workers.append(worker)
         return workers
 
-    def push_item_to_receiver(self):
+    def track_utilization(self) -> Utilization:
+        """
+        Starts accounting the ticks every worker spends in each state and the products waiting to be dropped, from the
+        current time on, see Utilization. Call utilization.summary(factory_floor.time) for the results.
+        """
+        self._sync_workers()
+        self.utilization = Utilization(self.workers, self._floor_config.product_code, self.time)
+        return self.utilization
+
+    def push_item_to_receiver(self) -> Any:
         """
         Moves last item on the belt to the receiver.
         """
         item_to_receive = self.conveyor_belt.dequeue()
+        if self._item_codes is not None:
+            item_to_receive = self._item_codes.decode(item_to_receive)
         self.receiver.receive(item_to_receive)
+        return item_to_receive
 
     def add_new_item_to_belt(self):
         """
         Adds new item to the conveyor belt.
         """
         new_belt_item = self.feeder.feed()
+        if self._item_codes is not None:
+            new_belt_item = self._item_codes.encode(new_belt_item)
         self.conveyor_belt.enqueue(new_belt_item)
 
-    def run(self):
+    def tick(self) -> Any:
         """
-        Main event loop.
+        Advances the floor by one unit of time.
+
+        Returns
+        -------
+            Item delivered to the receiver.
         """
-        for step in range(self.config.num_steps):
-            self.push_item_to_receiver()
+        # Sampled ticks of a profiled run are timed phase by phase, other ticks only test the flag.
+        profiled = self._profiler is not None and self._profiler.sample()
+        if profiled:
+            started = perf_counter_ns()
+        delivered_item = self.push_item_to_receiver()
+        if profiled:
+            received = perf_counter_ns()
 
-            try:
-                self.add_new_item_to_belt()
-            except StopIteration:
-                raise FactoryConfigError(INSUFFICIENT_FEED_INPUT)
+        try:
+            self.add_new_item_to_belt()
+        except StopIteration:
+            raise FactoryConfigError(INSUFFICIENT_FEED_INPUT)
+        if profiled:
+            fed = perf_counter_ns()
 
-            # make each pair work
+        if self.utilization is not None:
+            self.utilization.time = self.time
+        # make each pair work
+        if self._scheduler is not None:
+            self._scheduler.work(self.time)
+        elif self.tick_mode == TickMode.TWO_PHASE:
+            self._work_in_two_phases()
+        else:
             for worker in self.workers:
                 worker.work()
-            self.time += 1
+        if profiled:
+            self._profiler.record(received - started, fed - received, perf_counter_ns() - fed)
+        self.time += 1
+        return delivered_item
+
+    def run(
+            self,
+            fast_forward: bool = False,
+            trace_recorder: TraceRecorder = None,
+            checkpoint_path: str = None,
+            checkpoint_interval: int = 10000,
+            event_driven: bool = False,
+            profiler: FloorProfiler = None,
+    ):
+        """
+        Main event loop.
+
+        Parameters
+        ----------
+        fast_forward
+            If True the state of the floor is recorded every tick. As soon as a state repeats itself the remaining
+            whole cycles are not simulated - items they would deliver are handed to the receiver straight away.
+            Requires a periodic feeder (Feeder with repeat=True).
+        trace_recorder
+            If given, the state of the floor before the first tick (unless the recorder already holds records of an
+            earlier run) and after every tick is written to it. Ticks skipped by fast_forward are recorded as copies
+            of the repeating cycle.
+        checkpoint_path
+            If given, a checkpoint of the floor is saved there every checkpoint_interval ticks. If the file already
+            exists the floor is restored from it first and the interrupted run continues where the checkpoint was
+            taken, so the floor has to be created with the same arguments as the interrupted one. The checkpoint is
+            removed once the run finishes.
+        checkpoint_interval
+            Number of ticks between checkpoints.
+        event_driven
+            If True only workers with something to do work in a tick, see WorkerScheduler. The results are the same.
+            Workers must not be added or removed during the run. Requires TickMode.SEQUENTIAL.
+        profiler
+            If given, phases of ticks are timed and worker state transitions counted into it, see FloorProfiler.
+        """
+        if event_driven and self.tick_mode != TickMode.SEQUENTIAL:
+            raise FactoryConfigError(EVENT_DRIVEN_TWO_PHASE)
+        if fast_forward and self.utilization is not None:
+            raise FactoryConfigError(FAST_FORWARD_UTILIZATION)
+        end_time = self.time + self.config.num_steps
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            end_time = self.load_checkpoint(checkpoint_path)
+
+        def after_tick():
+            if trace_recorder is not None:
+                self._sync_workers()
+                trace_recorder.record(self)
+            if checkpoint_path is not None and self.time % checkpoint_interval == 0:
+                self.save_checkpoint(checkpoint_path, end_time)
+
+        # A recorder used for an earlier run already holds the state at the start of this one.
+        if trace_recorder is not None and not trace_recorder.num_records:
+            trace_recorder.record(self)
+
+        if event_driven:
+            self._scheduler = WorkerScheduler(self.workers, self.conveyor_belt, self.time)
+        if profiler is not None:
+            self._profiler = profiler
+            profiler.start(self)
+        try:
+            if fast_forward:
+                self._run_with_fast_forward(end_time, after_tick, trace_recorder)
+            else:
+                while self.time < end_time:
+                    self.tick()
+                    after_tick()
+        finally:
+            self._sync_workers()
+            self._scheduler = None
+            if profiler is not None:
+                profiler.stop(self)
+                self._profiler = None
+
+        # The run is complete, a later run with the same path starts afresh.
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+    def iter_steps(self, num_steps: int = None) -> Iterator[StepEvent]:
+        """
+        Advances the floor a tick at a time, only when asked for the next event, and yields a StepEvent per tick. Runs
+        num_steps ticks or, if num_steps is None, until the consumer stops asking (or the feed runs out).
+        """
+        operation_counts = self.operation_counts
+        steps = itertools.count() if num_steps is None else range(num_steps)
+        for _ in steps:
+            tick = self.time
+            pickups, drops, builds = operation_counts.pickups, operation_counts.drops, operation_counts.builds
+            delivered_item = self.tick()
+            yield StepEvent(
+                tick=tick,
+                delivered_item=delivered_item,
+                pickups=operation_counts.pickups - pickups,
+                drops=operation_counts.drops - drops,
+                builds=operation_counts.builds - builds,
+            )
+
+    def run_until(self, predicate: Callable[['FactoryFloor', StepEvent], bool], max_steps: int = None) -> int:
+        """
+        Runs the floor until predicate, called with the floor and the StepEvent after every tick, returns True or
+        max_steps ticks have been run. See src.domain_models.stop_conditions for ready made predicates.
+
+        Returns
+        -------
+            Number of ticks run.
+        """
+        num_steps = 0
+        for step_event in self.iter_steps(max_steps):
+            num_steps += 1
+            if predicate(self, step_event):
+                break
+        return num_steps
+
+    def snapshot(self) -> FloorSnapshot:
+        """
+        Returns everything needed to continue the simulation later: time, state of the belt, every worker, the feeder
+        and the receiver statistics. Items on the belt of an interned floor are decoded, as codes of items which are
+        not in the config depend on the order they were first seen in.
+        """
+        self._sync_workers()
+        items, slot_states = self.conveyor_belt.snapshot()
+        if self._item_codes is not None:
+            items = tuple(self._item_codes.decode(item) for item in items)
+        return FloorSnapshot(
+            time=self.time,
+            conveyor_belt=(items, slot_states),
+            workers=tuple(worker.snapshot() for worker in self.workers),
+            feeder=self.feeder.snapshot(),
+            receiver=self.receiver.snapshot(),
+        )
+
+    def restore(self, snapshot: FloorSnapshot):
+        """
+        Sets the state of the floor from a snapshot taken of a floor created with the same arguments.
+        """
+        self.time = snapshot.time
+        items, slot_states = snapshot.conveyor_belt
+        if self._item_codes is not None:
+            items = tuple(self._item_codes.encode(item) for item in items)
+        self.conveyor_belt.restore((items, slot_states))
+        for worker, worker_snapshot in zip(self.workers, snapshot.workers):
+            worker.restore(worker_snapshot)
+        self.feeder.restore(snapshot.feeder)
+        self.receiver.restore(snapshot.receiver)
+
+    def fork(self, feeder: Feeder = None, operation_times: Type[WorkerOperationTimes] = None) -> 'FactoryFloor':
+        """
+        Returns an independent copy of the floor for exploring what happens next. Only the belt and the workers, which
+        change every tick, are copied. Config and feed items are shared with this floor.
+
+        Parameters
+        ----------
+        feeder
+            Feed of the new floor. By default it continues the feed of this floor.
+        operation_times
+            Operation times of workers of the new floor. By default they are the same as on this floor.
+        """
+        self._sync_workers()
+        conveyor_belt = self.conveyor_belt.fork()
+        factory_floor = FactoryFloor(
+            config=self.config,
+            feeder=feeder if feeder else self.feeder.fork(),
+            receiver=self.receiver.fork(),
+            conveyor_belt=conveyor_belt,
+            workers=[worker.fork(conveyor_belt, operation_times) for worker in self.workers],
+            worker_class=self.worker_class,
+            tick_mode=self.tick_mode,
+            conflict_policy=self.conflict_policy,
+        )
+        factory_floor.time = self.time
+        return factory_floor
+
+    def save_checkpoint(self, path: str, end_time: int = None):
+        """
+        Writes a versioned snapshot of the floor to path. The file is replaced atomically, so an interrupted write
+        leaves the previous checkpoint intact.
+        """
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'wb') as checkpoint_file:
+            checkpoint = (CHECKPOINT_VERSION, end_time, self._config_key(), tuple(self.snapshot()))
+            pickle.dump(checkpoint, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    def load_checkpoint(self, path: str) -> int:
+        """
+        Restores the floor from a checkpoint written by save_checkpoint. The checkpoint has to be saved by a floor with
+        the same config.
+
+        Returns
+        -------
+            Time at which the checkpointed run was due to finish.
+        """
+        with open(path, 'rb') as checkpoint_file:
+            checkpoint = pickle.load(checkpoint_file)
+        version = checkpoint[0]
+        if version != CHECKPOINT_VERSION:
+            raise CheckpointError(INVALID_CHECKPOINT_VERSION.format(version=version, expected=CHECKPOINT_VERSION))
+        _, end_time, config_key, snapshot = checkpoint
+        if config_key != self._config_key():
+            raise CheckpointError(CHECKPOINT_CONFIG_MISMATCH.format(path=path))
+        self.restore(FloorSnapshot(*snapshot))
+        return end_time if end_time is not None else self.time + self.config.num_steps
+
+    def _config_key(self) -> Tuple:
+        config = self.config
+        return (
+            tuple(config.required_items), config.product_code, config.num_steps, config.empty_code,
+            config.conveyor_belt_slots, config.num_pairs, config.intern_items,
+        )
+
+    def state_key(self) -> Hashable:
+        """
+        Returns hashable representation of everything which decides how the floor behaves from now on: contents and
+        slot states of the belt, state of every worker, the phase of a periodic feeder and, in the two phase tick mode,
+        the phase of the conflict policy.
+        """
+        self._sync_workers()
+        key = (
+            self.conveyor_belt.snapshot(),
+            tuple(worker.snapshot() for worker in self.workers),
+            self.feeder.phase,
+        )
+        if self.tick_mode == TickMode.TWO_PHASE:
+            key += (policy_phase(self.workers, self.conflict_policy, self.time),)
+        return key
+
+    def _work_in_two_phases(self):
+        intents = [worker.declare_intent() for worker in self.workers]
+        granted_actions = resolve_intents(self.workers, intents, self.conflict_policy, self.time)
+        for worker, action in zip(self.workers, granted_actions):
+            worker.commit_intent(action)
+
+    def _sync_workers(self):
+        if self._scheduler is not None:
+            self._scheduler.sync(self.time)
+
+    def _run_with_fast_forward(
+            self, end_time: int, after_tick: Callable[[], None], trace_recorder: TraceRecorder = None
+    ):
+        if self.feeder.period is None:
+            raise FactoryConfigError(UNKNOWN_FEED_PERIOD)
+
+        seen_states: Dict[Hashable, int] = {}
+        delivered_items = []
+        remaining_steps = end_time - self.time
+        while remaining_steps:
+            state_key = self.state_key()
+            cycle_start = seen_states.get(state_key)
+            if cycle_start is not None:
+                cycle_items = delivered_items[cycle_start:]
+                repetitions, remaining_steps = divmod(remaining_steps, len(cycle_items))
+                self.receiver.receive_many(cycle_items, repetitions)
+                self.time += repetitions * len(cycle_items)
+                if trace_recorder is not None:
+                    trace_recorder.repeat(len(cycle_items), repetitions)
+                break
+
+            seen_states[state_key] = len(delivered_items)
+            delivered_items.append(self.tick())
+            after_tick()
+            remaining_steps -= 1
+
+        for step in range(remaining_steps):
+            self.tick()
+            after_tick()
@@ -1,23 +1,244 @@
+import bisect
+import copy
+import itertools
+import math
+import mmap
+import os
 import random
-from typing import Iterable, Union, Sequence, Tuple
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Union, Sequence, Tuple
 
 from src.domain_models.common import BaseModel
 from src.exceptions.exceptions import FeederConfigError
-from src.exceptions.messages import INVALID_FEED_INPUT
+from src.exceptions.messages import (
+    INVALID_BLOCK_SIZE, INVALID_FEED_INPUT, INVALID_FEED_WEIGHTS, INVALID_FEED_WEIGHT_VALUES,
+)
+
+
+class FileFeed(BaseModel):
+    """
+    Iterable over items of a trace file holding one item per line, e.g. one written by FileSink. The file is
+    memory-mapped and decoded chunk_size bytes at a time, so traces much larger than memory can be fed without loading
+    them. Iteration starts at item number offset. Lines are returned as strings unless a decode function is given.
+    """
+    def __init__(
+            self,
+            path: str,
+            offset: int = 0,
+            decode: Callable[[str], Any] = None,
+            encoding: str = 'utf-8',
+            chunk_size: int = 1 << 20,
+    ):
+        self.path = path
+        self.offset = offset
+        self.decode = decode
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+
+    def seek(self, offset: int) -> 'FileFeed':
+        """
+        Sets number of the item iteration starts from.
+        """
+        self.offset = offset
+        return self
+
+    def __iter__(self) -> Iterator:
+        with open(self.path, 'rb') as trace_file:
+            if not os.fstat(trace_file.fileno()).st_size:
+                return
+            with mmap.mmap(trace_file.fileno(), 0, access=mmap.ACCESS_READ) as trace:
+                yield from self.__read_items(trace, self.__find_item(trace, self.offset))
+
+    def __read_items(self, trace: mmap.mmap, position: int) -> Iterator:
+        remainder = b''
+        while position < len(trace):
+            chunk = trace[position:position + self.chunk_size]
+            position += len(chunk)
+            lines = (remainder + chunk).split(b'\n')
+            remainder = lines.pop()
+            yield from self.__decode_lines(lines)
+        if remainder:
+            yield from self.__decode_lines([remainder])
+
+    def __decode_lines(self, lines: List[bytes]) -> Iterator:
+        items = (line.decode(self.encoding) for line in lines)
+        return map(self.decode, items) if self.decode else items
+
+    def __find_item(self, trace: mmap.mmap, item_number: int) -> int:
+        """
+        Returns byte position of the start of line item_number, counting newlines a chunk at a time.
+        """
+        position = 0
+        while item_number:
+            chunk = trace[position:position + self.chunk_size]
+            if not chunk:
+                break
+            newlines = chunk.count(b'\n')
+            if newlines < item_number:
+                item_number -= newlines
+                position += len(chunk)
+                continue
+            for _ in range(item_number):
+                position = trace.find(b'\n', position) + 1
+            item_number = 0
+        return position
 
 
 class Feeder(BaseModel):
     """
     Use to provide feed for the conveyor belt. If no feed function specified will select random item from components
     list and return every time feed() is called on an instance.
+
+    Random items are drawn from the feeder's own random generator seeded with seed, so feeders with the same seed
+    supply the same items no matter what else uses the random module. Components are picked with probabilities
+    proportional to weights (equal by default) and generated block_size at a time.
+
+    With antithetic=True every component is picked with 1 - u in place of the uniform number u the feeder with the same
+    seed uses, so the two feeders supply negatively correlated streams of components with the same distribution.
+    Averaging a simulation over such a pair of antithetic streams reduces the variance of the average.
+
+    With repeat=True the items of feed_input are supplied over and over again. Such a feeder knows its period and
+    phase, which lets FactoryFloor detect when the whole floor starts repeating itself.
+
+    The feeder counts items it has supplied, so a snapshot of it can be restored onto a feeder created with the same
+    arguments: random feeds regenerate their current block, periodic feeds restore their phase, FileFeed seeks and any
+    other feed_input is advanced past the items already supplied.
     """
-    def __init__(self, components: Tuple = ('A', 'B'), feed_input: Union[Iterable, Sequence] = None):
+    def __init__(
+            self,
+            components: Tuple = ('A', 'B'),
+            feed_input: Union[Iterable, Sequence] = None,
+            repeat: bool = False,
+            seed: int = None,
+            weights: Sequence[float] = None,
+            block_size: int = 1024,
+            antithetic: bool = False,
+    ):
+        if weights is not None and len(weights) != len(components):
+            raise FeederConfigError(
+                INVALID_FEED_WEIGHTS.format(num_weights=len(weights), num_components=len(components))
+            )
+        if weights is not None and (
+                not all(0 <= weight < math.inf for weight in weights) or not math.fsum(weights) > 0
+        ):
+            raise FeederConfigError(INVALID_FEED_WEIGHT_VALUES.format(weights=tuple(weights)))
+        if block_size < 1:
+            raise FeederConfigError(INVALID_BLOCK_SIZE.format(block_size=block_size))
         self.components = components
-        self.__feed_input = self.get_feed_input(feed_input) if feed_input else self.__default_feed_input()
+        self.weights = weights
+        self.block_size = block_size
+        self.antithetic = antithetic
+        self.__random = random.Random(seed)
+        self.__source = feed_input if feed_input else None
+        # Item number a FileFeed starts from, positions of the feeder are counted from it.
+        self.__source_offset = getattr(feed_input, 'offset', 0) if hasattr(feed_input, 'seek') else 0
+        self.__position = 0
+        self.__block_start = (0, self.__random.getstate())
+        self.__period = None
+        self.__phase = 0
+        self.__feed_items = None
+        if feed_input and repeat:
+            self.__feed_items = list(self.get_feed_input(feed_input))
+            self.__period = len(self.__feed_items)
+            self.__feed_input = self.__repeated_feed_input(self.__feed_items)
+        else:
+            self.__feed_input = self.get_feed_input(feed_input) if feed_input else self.__default_feed_input()
+
+    @property
+    def period(self) -> Optional[int]:
+        """
+        Returns number of items after which the feed repeats itself or None if the feed is not periodic.
+        """
+        return self.__period
+
+    @property
+    def phase(self) -> int:
+        """
+        Returns position within the period of the next item to be fed. Always 0 for a feed which is not periodic.
+        """
+        return self.__phase
+
+    def snapshot(self) -> Tuple[int, int, Tuple[int, Any]]:
+        """
+        Returns number of items supplied so far, phase and the position and random state at the start of the current
+        block of random items.
+        """
+        return self.__position, self.__phase, self.__block_start
+
+    def restore(self, snapshot: Tuple[int, int, Tuple[int, Any]]):
+        """
+        Continues the feed from a snapshot taken of a feeder created with the same arguments.
+        """
+        position, phase, block_start = snapshot
+        if self.__period is not None:
+            self.__phase = phase
+        elif self.__source is None:
+            block_position, random_state = block_start
+            self.__random.setstate(random_state)
+            self.__position = block_position
+            self.__feed_input = self.__default_feed_input()
+            self.__skip(position - block_position)
+        elif hasattr(self.__source, 'seek'):
+            self.__feed_input = self.__seek_source(position)
+        elif hasattr(self.__source, '__next__'):
+            self.__skip(position - self.__position)
+        else:
+            self.__feed_input = iter(self.__source)
+            self.__skip(position)
+        self.__position = position
+
+    def fork(self) -> 'Feeder':
+        """
+        Returns a feeder which supplies the same items as this one from now on, independently of it. Components and
+        periodic feed items are shared. Items of an iterator feed_input are buffered only until both feeders have
+        supplied them.
+        """
+        feeder = copy.copy(self)
+        feeder.__random = random.Random()
+        if self.__period is not None:
+            feeder.__feed_input = feeder.__repeated_feed_input(self.__feed_items)
+        elif self.__source is None:
+            feeder.restore(self.snapshot())
+        elif hasattr(self.__source, 'seek'):
+            feeder.__feed_input = self.__seek_source(self.__position)
+        else:
+            self.__feed_input, feeder.__feed_input = itertools.tee(self.__feed_input)
+        return feeder
+
+    def __seek_source(self, position: int) -> Iterator:
+        """
+        Returns items of a seekable feed_input from position on. The feed_input itself is left as it was given.
+        """
+        return iter(copy.copy(self.__source).seek(self.__source_offset + position))
+
+    def __skip(self, num_items: int):
+        next(itertools.islice(self.__feed_input, num_items, num_items), None)
 
     def __default_feed_input(self):
         while True:
-            yield random.choice(self.components)
+            self.__block_start = (self.__position, self.__random.getstate())
+            if self.antithetic:
+                yield from self.__antithetic_block()
+            else:
+                yield from self.__random.choices(self.components, weights=self.weights, k=self.block_size)
+
+    def __antithetic_block(self) -> List:
+        """
+        Returns a block of components picked the same way as random.choices does, from 1 - u instead of u.
+        """
+        cumulative_weights = list(itertools.accumulate(self.weights or [1] * len(self.components)))
+        total = cumulative_weights[-1]
+        last = len(self.components) - 1
+        uniform = self.__random.random
+        return [
+            self.components[bisect.bisect(cumulative_weights, (1.0 - uniform()) * total, 0, last)]
+            for _ in range(self.block_size)
+        ]
+
+    def __repeated_feed_input(self, feed_items: List):
+        while True:
+            item = feed_items[self.__phase]
+            self.__phase = (self.__phase + 1) % self.__period
+            yield item
 
     @staticmethod
     def get_feed_input(feed_input: Union[Iterable, Sequence]):
@@ -33,4 +254,6 @@ class Feeder(BaseModel):
             raise FeederConfigError(INVALID_FEED_INPUT.format(object_type=feed_input.__class__.__name__))
 
     def feed(self):
-        return next(self.__feed_input)
+        item = next(self.__feed_input)
+        self.__position += 1
+        return item
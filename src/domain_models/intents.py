@@ -0,0 +1,90 @@
+import functools
+import math
+from typing import Dict, List, Optional, Sequence
+
+from src.domain_models.worker import Worker, WorkerAction
+from src.exceptions.messages import INVALID_CONFLICT_POLICY, INVALID_TICK_MODE
+
+
+class TickMode:
+    """
+    How workers of a FactoryFloor work in a tick:
+        - TickMode.SEQUENTIAL: workers work one after another, each seeing the changes made by the workers before it.
+        - TickMode.TWO_PHASE: every worker declares an intent against the belt as it was at the start of the tick,
+          conflicting intents are resolved by a ConflictPolicy and then all workers commit their granted intents. The
+          outcome does not depend on the order workers are processed in within a phase.
+    """
+    SEQUENTIAL = 'sequential'
+    TWO_PHASE = 'two_phase'
+
+
+class ConflictPolicy:
+    """
+    Decides which of the workers declaring a belt operation (picking up or dropping) at the same slot in the same tick
+    gets the slot. The others stay idle for the tick and declare again in the next one.
+        - ConflictPolicy.LOWEST_PAIR: the worker listed first on the floor, i.e. the one with the lowest pair number.
+        - ConflictPolicy.ROTATE: contenders take turns - in tick t contender number t modulo number of contenders wins.
+    """
+    LOWEST_PAIR = 'lowest_pair'
+    ROTATE = 'rotate'
+
+
+BELT_ACTIONS = (WorkerAction.PICK_UP_COMPONENT, WorkerAction.DROP_PRODUCT)
+
+
+def validate_tick_mode(tick_mode: str, conflict_policy: str):
+    if tick_mode not in (TickMode.SEQUENTIAL, TickMode.TWO_PHASE):
+        raise ValueError(INVALID_TICK_MODE.format(tick_mode=tick_mode))
+    if conflict_policy not in (ConflictPolicy.LOWEST_PAIR, ConflictPolicy.ROTATE):
+        raise ValueError(INVALID_CONFLICT_POLICY.format(conflict_policy=conflict_policy))
+
+
+def resolve_intents(workers: Sequence[Worker], intents: Sequence[int], conflict_policy: str, tick: int) -> List[int]:
+    """
+    Returns the granted action of every worker: its intent, or WorkerAction.NONE if it lost the slot to another worker.
+    Building does not use the belt, so it is always granted.
+
+    Parameters
+    ----------
+    workers
+        Workers of the floor in floor order.
+    intents
+        WorkerAction declared by each worker.
+    conflict_policy
+        ConflictPolicy deciding between workers contending for a slot.
+    tick
+        Tick the intents were declared in.
+    """
+    granted = list(intents)
+    contenders: Dict[int, List[int]] = {}
+    for index, (worker, action) in enumerate(zip(workers, intents)):
+        if action in BELT_ACTIONS:
+            contenders.setdefault(worker.slot_number, []).append(index)
+
+    for indexes in contenders.values():
+        if len(indexes) == 1:
+            continue
+        if conflict_policy == ConflictPolicy.ROTATE:
+            winner = indexes[tick % len(indexes)]
+        else:
+            winner = indexes[0]
+        for index in indexes:
+            if index != winner:
+                granted[index] = WorkerAction.NONE
+    return granted
+
+
+def policy_phase(workers: Sequence[Worker], conflict_policy: str, tick: int) -> Optional[int]:
+    """
+    Returns the part of tick the conflict policy depends on, None if it does not depend on the tick. Two floors in the
+    same state behave the same from then on only if this matches too.
+    """
+    if conflict_policy != ConflictPolicy.ROTATE:
+        return None
+    workers_per_slot: Dict[int, int] = {}
+    for worker in workers:
+        workers_per_slot[worker.slot_number] = workers_per_slot.get(worker.slot_number, 0) + 1
+    least_common_multiple = functools.reduce(
+        lambda first, second: first * second // math.gcd(first, second), workers_per_slot.values(), 1
+    )
+    return tick % least_common_multiple
@@ -0,0 +1,143 @@
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+from src.domain_models.worker import WorkerState
+
+
+class Phase:
+    RECEIVE = 'push_item_to_receiver'
+    FEED = 'add_new_item_to_belt'
+    WORK = 'work'
+
+
+PHASES = (Phase.RECEIVE, Phase.FEED, Phase.WORK)
+OTHER = 'other'
+
+
+def perf_counter_ns() -> int:
+    """
+    Returns time.perf_counter() in nanoseconds. time.perf_counter_ns is only available from Python 3.7.
+    """
+    return int(time.perf_counter() * 1e9)
+
+
+class ProfileSummary(NamedTuple):
+    num_ticks: int
+    elapsed_seconds: float
+    ticks_per_second: float
+    # Estimated share of the elapsed time spent in each of PHASES and in everything else (OTHER).
+    phase_shares: Dict[str, float]
+    # Mean nanoseconds per tick of each of PHASES, measured on sampled ticks.
+    phase_ns_per_tick: Dict[str, float]
+    transitions: Dict[Tuple[str, str], int]
+
+    def format(self) -> str:
+        lines = [f'{self.num_ticks} ticks in {self.elapsed_seconds:.3f} s ({self.ticks_per_second:.0f} ticks/s)']
+        for phase, share in self.phase_shares.items():
+            ns_per_tick = self.phase_ns_per_tick.get(phase)
+            per_tick = f', {ns_per_tick:.0f} ns/tick' if ns_per_tick is not None else ''
+            lines.append(f'  {phase}: {share:.1%}{per_tick}')
+        for (from_state, to_state), count in self.transitions.items():
+            lines.append(f'  {from_state} -> {to_state}: {count}')
+        return '\n'.join(lines)
+
+
+class FloorProfiler:
+    """
+    Collects timings of the phases of FactoryFloor ticks and counts of worker state transitions during
+    FactoryFloor.run(profiler=...). Runs profiled with the same profiler add up.
+
+    Only every sample_every-th tick is timed with perf_counter_ns, the time of a phase over all ticks is estimated from
+    the sampled ones. Transitions are not counted as they happen - they follow from the OperationCounts of the floor
+    and states of the workers at the start and the end of a run, so workers do no extra work.
+    """
+    def __init__(self, sample_every: int = 1):
+        self.sample_every = max(sample_every, 1)
+        self.num_ticks = 0
+        self.num_sampled_ticks = 0
+        self.phase_ns: List[int] = [0] * len(PHASES)
+        self.elapsed_ns = 0
+        self.transitions: Dict[Tuple[str, str], int] = {}
+        self._countdown = 1
+        self._start_ns = 0
+        self._start_counts: Tuple[int, int, int] = (0, 0, 0)
+        self._start_states: Dict[str, int] = {}
+
+    def sample(self) -> bool:
+        """
+        Counts a tick and returns True if it should be timed.
+        """
+        self.num_ticks += 1
+        self._countdown -= 1
+        if self._countdown:
+            return False
+        self._countdown = self.sample_every
+        self.num_sampled_ticks += 1
+        return True
+
+    def record(self, receive_ns: int, feed_ns: int, work_ns: int):
+        phase_ns = self.phase_ns
+        phase_ns[0] += receive_ns
+        phase_ns[1] += feed_ns
+        phase_ns[2] += work_ns
+
+    def start(self, factory_floor):
+        operation_counts = factory_floor.operation_counts
+        self._start_counts = (operation_counts.pickups, operation_counts.drops, operation_counts.builds)
+        self._start_states = self._count_states(factory_floor)
+        self._start_ns = perf_counter_ns()
+
+    def stop(self, factory_floor):
+        self.elapsed_ns += perf_counter_ns() - self._start_ns
+        operation_counts = factory_floor.operation_counts
+        pickups, drops, builds = (
+            count - start_count for count, start_count in zip(
+                (operation_counts.pickups, operation_counts.drops, operation_counts.builds), self._start_counts
+            )
+        )
+        states = self._count_states(factory_floor)
+
+        def in_progress_change(state: str) -> int:
+            return states.get(state, 0) - self._start_states.get(state, 0)
+
+        transitions = {
+            (WorkerState.IDLE, WorkerState.PICKING_UP): pickups,
+            (WorkerState.PICKING_UP, WorkerState.IDLE): pickups - in_progress_change(WorkerState.PICKING_UP),
+            (WorkerState.IDLE, WorkerState.DROPPING): drops,
+            (WorkerState.DROPPING, WorkerState.IDLE): drops - in_progress_change(WorkerState.DROPPING),
+            (WorkerState.IDLE, WorkerState.BUILDING): builds + in_progress_change(WorkerState.BUILDING),
+            (WorkerState.BUILDING, WorkerState.IDLE): builds,
+        }
+        for transition, count in transitions.items():
+            self.transitions[transition] = self.transitions.get(transition, 0) + count
+
+    def summary(self) -> ProfileSummary:
+        elapsed_seconds = self.elapsed_ns / 1e9
+        phase_ns_per_tick = {
+            phase: ns / self.num_sampled_ticks if self.num_sampled_ticks else 0.0
+            for phase, ns in zip(PHASES, self.phase_ns)
+        }
+        phase_shares = {}
+        if self.elapsed_ns:
+            estimated_ns = {phase: ns_per_tick * self.num_ticks for phase, ns_per_tick in phase_ns_per_tick.items()}
+            # Estimates from a sample can add up to more than the elapsed time, shares are kept summing up to 1.
+            total_ns = max(self.elapsed_ns, sum(estimated_ns.values()))
+            for phase, ns in estimated_ns.items():
+                phase_shares[phase] = ns / total_ns
+            phase_shares[OTHER] = max(1.0 - sum(phase_shares.values()), 0.0)
+        return ProfileSummary(
+            num_ticks=self.num_ticks,
+            elapsed_seconds=elapsed_seconds,
+            ticks_per_second=self.num_ticks / elapsed_seconds if elapsed_seconds else 0.0,
+            phase_shares=phase_shares,
+            phase_ns_per_tick=phase_ns_per_tick,
+            transitions=dict(self.transitions),
+        )
+
+    @staticmethod
+    def _count_states(factory_floor) -> Dict[str, int]:
+        states: Dict[str, int] = {}
+        for worker in factory_floor.workers:
+            state = worker.snapshot()[0]
+            states[state] = states.get(state, 0) + 1
+        return states
@@ -1,19 +1,203 @@
-from typing import List, Any
+from typing import List, Any, Dict, Sequence, Iterable, Tuple
 
 from src.domain_models.common import BaseModel
+from src.exceptions.exceptions import ReceiverConfigError
+from src.exceptions.messages import RECEIVED_ITEMS_NOT_KEPT
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig
+from src.helpers.data_structures import MaxSizeQueue, OverflowPolicy
 
 
-class Receiver(BaseModel):
+class ReceiverSink:
+    """
+    Destination of items received from the conveyor belt.
+    """
+    def receive(self, item):
+        raise NotImplementedError
+
+    def receive_many(self, items: Sequence, repetitions: int = 1):
+        """
+        Receives items in order, repetitions times over.
+        """
+        for _ in range(repetitions):
+            for item in items:
+                self.receive(item)
+
+    def close(self):
+        pass
+
+
+class ListSink(ReceiverSink):
     """
-    Use to receive items from the conveyor belt. Stores items in order of appearance and provides methods to obtain
-    efficiency statistics for the plant operation.
+    Keeps every received item in a list. Memory grows with the number of ticks.
     """
     def __init__(self):
-        self.__received_items: List[Any] = []
+        self.items: List[Any] = []
+
+    def receive(self, item):
+        self.items.append(item)
+
+    def receive_many(self, items: Sequence, repetitions: int = 1):
+        self.items.extend(list(items) * repetitions)
+
+
+class StatisticsSink(ReceiverSink, BaseModel):
+    """
+    Keeps running counts of received items in constant memory: products, empty slots and unused components per type,
+    plus number of products in a sliding window of the last window_size ticks.
+    """
+    def __init__(self, config: FactoryFloorConfig = None, window_size: int = 100):
+        config = config if config else FactoryFloorConfig()
+        self._product_code = config.product_code
+        self._empty_code = config.empty_code
+        self.received = 0
+        self.products = 0
+        self.empty_slots = 0
+        self.unused_components: Dict[Any, int] = {}
+        self._window = MaxSizeQueue(max_size=window_size, overflow_policy=OverflowPolicy.DROP_OLDEST)
+        self._window_products = 0
+
+    @property
+    def products_per_tick(self) -> float:
+        """
+        Returns average number of products received per tick over the sliding window.
+        """
+        return self._window_products / self._window.size if self._window.size else 0.0
+
+    def receive(self, item):
+        self._count(item, times=1)
+        self._push_to_window(item == self._product_code)
+
+    def receive_many(self, items: Sequence, repetitions: int = 1):
+        """
+        Counts each of items once and multiplies the counts by repetitions, so the cost does not depend on
+        repetitions.
+        """
+        items = list(items)
+        if not items or repetitions < 1:
+            return
+        for item in items:
+            self._count(item, times=repetitions)
+
+        # Only the most recent window_size items can still be in the window.
+        tail_length = min(self._window.max_size, len(items) * repetitions)
+        tail = (items * (tail_length // len(items) + 1))[-tail_length:]
+        for item in tail:
+            self._push_to_window(item == self._product_code)
+
+    def snapshot(self) -> Tuple[int, int, int, Dict[Any, int], Tuple[bool, ...]]:
+        """
+        Returns counts and contents of the sliding window.
+        """
+        return self.received, self.products, self.empty_slots, dict(self.unused_components), tuple(self._window.items)
+
+    def restore(self, snapshot: Tuple[int, int, int, Dict[Any, int], Tuple[bool, ...]]):
+        """
+        Sets counts and contents of the sliding window from a snapshot.
+        """
+        self.received, self.products, self.empty_slots, unused_components, window = snapshot
+        self.unused_components = dict(unused_components)
+        self._window.clear()
+        for is_product in reversed(window):
+            self._window.enqueue(is_product)
+        self._window_products = sum(window)
+
+    def _count(self, item, times: int):
+        self.received += times
+        if item == self._product_code:
+            self.products += times
+        elif item == self._empty_code:
+            self.empty_slots += times
+        else:
+            self.unused_components[item] = self.unused_components.get(item, 0) + times
+
+    def _push_to_window(self, is_product: bool):
+        self._window_products += is_product
+        dropped = self._window.enqueue(is_product)
+        if dropped:
+            self._window_products -= 1
+
+
+class FileSink(ReceiverSink):
+    """
+    Writes received items to a text file, one item per line. Items are buffered and written batch_size at a time.
+    """
+    def __init__(self, path: str, batch_size: int = 4096):
+        self._file = open(path, 'w')
+        self._batch_size = batch_size
+        self._batch: List[str] = []
+
+    def receive(self, item):
+        self._batch.append(str(item))
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            self._file.write('\n'.join(self._batch) + '\n')
+            self._batch = []
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class Receiver(BaseModel):
+    """
+    Use to receive items from the conveyor belt. Efficiency statistics for the plant operation are always kept in
+    statistics. Received items are passed on to any additional sinks and are stored in order of appearance only if
+    keep_items is True.
+    """
+    def __init__(self, config: FactoryFloorConfig = None, sinks: Iterable[ReceiverSink] = None, keep_items=False):
+        self.__config = config
+        self.statistics = StatisticsSink(config=config)
+        self.__items_sink = ListSink() if keep_items else None
+        self.__sinks: List[ReceiverSink] = [self.statistics] + list(sinks or [])
+        if self.__items_sink is not None:
+            self.__sinks.append(self.__items_sink)
+
+    @property
+    def sinks(self) -> List[ReceiverSink]:
+        return self.__sinks
 
     @property
     def received_items(self):
-        return self.__received_items
+        if self.__items_sink is None:
+            raise ReceiverConfigError(RECEIVED_ITEMS_NOT_KEPT)
+        return self.__items_sink.items
+
+    def snapshot(self) -> Tuple:
+        """
+        Returns state of the statistics. Items kept with keep_items and additional sinks are not part of the snapshot.
+        """
+        return self.statistics.snapshot()
+
+    def restore(self, snapshot: Tuple):
+        self.statistics.restore(snapshot)
+
+    def fork(self) -> 'Receiver':
+        """
+        Returns a new receiver starting from the same statistics. Items received so far and additional sinks are not
+        carried over, a forked receiver keeps only items it receives itself.
+        """
+        receiver = Receiver(config=self.__config, keep_items=self.__items_sink is not None)
+        receiver.restore(self.snapshot())
+        return receiver
 
     def receive(self, item):
-        self.__received_items.append(item)
+        for sink in self.__sinks:
+            sink.receive(item)
+
+    def receive_many(self, items: Sequence, repetitions: int = 1):
+        """
+        Receives items in order, repetitions times over.
+        """
+        for sink in self.__sinks:
+            sink.receive_many(items, repetitions)
+
+    def close(self):
+        """
+        Closes all sinks, i.e. writes out any buffered items.
+        """
+        for sink in self.__sinks:
+            sink.close()
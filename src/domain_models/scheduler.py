@@ -0,0 +1,130 @@
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from src.domain_models.common import BaseModel
+from src.domain_models.conveyor_belt import ConveyorBelt
+from src.domain_models.worker import Worker
+from src.helpers.data_structures import TimingWheel
+
+
+class WorkerScheduler(BaseModel):
+    """
+    Decides which workers have to work in a tick, so that a tick costs time proportional to the number of active
+    workers rather than all of them.
+
+    A worker which is in the middle of an operation after its work would only count down its remaining time until the
+    tick the operation finishes in. Such a worker is parked on a timing wheel under that tick and skipped until then.
+
+    Every other worker is idle and waits for one of its wanted items (see Worker.wanted_items) to reach its slot. The
+    scheduler keeps an index from slot to the items wanted by its idle workers, updated whenever a worker works. Every
+    tick the item which has just arrived at each slot of the index is looked up in it, a single peek and dict lookup
+    per waiting slot however many items are wanted there. A slot is only visited when that item is wanted, or when a
+    worker there is ready to build.
+
+    Workers interact only with workers at the same slot, so workers of a visited slot are always handled in their
+    original order while slots may be handled in any order. Remaining times of parked workers are only brought up to
+    date by sync().
+    """
+    def __init__(self, workers: List[Worker], conveyor_belt: ConveyorBelt, time: int, num_buckets: int = 64):
+        self._conveyor_belt = conveyor_belt
+        self._workers_by_slot: Dict[int, List[Worker]] = {}
+        for worker in workers:
+            self._workers_by_slot.setdefault(worker.slot_number, []).append(worker)
+        self._wheel = TimingWheel(num_buckets=num_buckets)
+        # Parked worker -> last tick its remaining time accounts for.
+        self._parked: Dict[Worker, int] = {}
+        # Slot -> item -> number of idle workers at the slot wanting the item.
+        self._demand: Dict[int, Dict[Any, int]] = {}
+        # Slot -> number of idle workers at the slot ready to build.
+        self._ready_slots: Dict[int, int] = {}
+        # Idle worker -> items it is registered in the demand index for, None if ready to build.
+        self._wanted_items: Dict[Worker, Optional[FrozenSet]] = {}
+        for worker in workers:
+            if worker.remaining_time_of_operation > 0:
+                self._park(worker, time - 1)
+            else:
+                self._register(worker)
+
+    @property
+    def num_parked(self) -> int:
+        return len(self._parked)
+
+    def work(self, tick: int):
+        """
+        Makes every worker which has something to do in tick work, in the same order FactoryFloor would.
+        """
+        due_workers = set(self._wheel.pop_due(tick))
+        slots = dict.fromkeys(self._ready_slots)
+        slots.update(dict.fromkeys(worker.slot_number for worker in due_workers))
+        for slot in self._waiting_slots():
+            slots[slot] = None
+
+        for slot in slots:
+            for worker in self._workers_by_slot[slot]:
+                parked_at = self._parked.get(worker)
+                if parked_at is not None:
+                    if worker not in due_workers:
+                        continue
+                    worker.wait(tick - parked_at - 1)
+                    del self._parked[worker]
+                elif not worker.has_work():
+                    continue
+
+                worker.work()
+                if worker.remaining_time_of_operation > 0:
+                    self._unregister(worker)
+                    self._park(worker, tick)
+                elif self._wanted_items.get(worker, False) != worker.wanted_items():
+                    self._unregister(worker)
+                    self._register(worker)
+
+    def sync(self, time: int):
+        """
+        Brings remaining times of parked workers up to date with a floor at time, i.e. after tick time - 1.
+        """
+        for worker, parked_at in self._parked.items():
+            worker.wait(time - 1 - parked_at)
+            self._parked[worker] = time - 1
+
+    def _waiting_slots(self):
+        """
+        Yields slots at which an item wanted by an idle worker has just arrived.
+        """
+        check_item_at_slot = self._conveyor_belt.check_item_at_slot
+        for slot, items in self._demand.items():
+            if check_item_at_slot(slot) in items:
+                yield slot
+
+    def _park(self, worker: Worker, tick: int):
+        self._parked[worker] = tick
+        self._wheel.schedule(worker, tick + worker.remaining_time_of_operation)
+
+    def _register(self, worker: Worker):
+        wanted_items = worker.wanted_items()
+        self._wanted_items[worker] = wanted_items
+        slot = worker.slot_number
+        if wanted_items is None:
+            self._ready_slots[slot] = self._ready_slots.get(slot, 0) + 1
+            return
+        items = self._demand.setdefault(slot, {})
+        for item in wanted_items:
+            items[item] = items.get(item, 0) + 1
+
+    def _unregister(self, worker: Worker):
+        if worker not in self._wanted_items:
+            return
+        wanted_items = self._wanted_items.pop(worker)
+        slot = worker.slot_number
+        if wanted_items is None:
+            self._decrement(self._ready_slots, slot)
+            return
+        items = self._demand[slot]
+        for item in wanted_items:
+            self._decrement(items, item)
+        if not items:
+            del self._demand[slot]
+
+    @staticmethod
+    def _decrement(counts: Dict[Any, int], key: Any):
+        counts[key] -= 1
+        if not counts[key]:
+            del counts[key]
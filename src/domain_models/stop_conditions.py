@@ -0,0 +1,73 @@
+import time
+from typing import Callable, Optional, Tuple
+
+from src.domain_models.factory_floor import FactoryFloor, StepEvent
+
+StopCondition = Callable[[FactoryFloor, StepEvent], bool]
+
+
+def products_reached(num_products: int) -> StopCondition:
+    """
+    Stops once the receiver has received num_products products in total.
+    """
+    def condition(factory_floor: FactoryFloor, step_event: StepEvent) -> bool:
+        return factory_floor.receiver.statistics.products >= num_products
+
+    return condition
+
+
+def time_budget(seconds: float) -> StopCondition:
+    """
+    Stops after seconds of wall clock time, counted from the first tick the condition is checked after.
+    """
+    deadline: Optional[float] = None
+
+    def condition(factory_floor: FactoryFloor, step_event: StepEvent) -> bool:
+        nonlocal deadline
+        now = time.perf_counter()
+        if deadline is None:
+            deadline = now + seconds
+        return now >= deadline
+
+    return condition
+
+
+def throughput_converged(tolerance: float = 0.01, check_every: int = 1000) -> StopCondition:
+    """
+    Stops once the products per tick received change by no more than tolerance (relative) between two checks made
+    every check_every ticks.
+
+    Products are counted from the first tick after the floor has run for as many ticks as the belt has slots, the same
+    warm up estimate_products_per_tick discards, as products dropped before need that long to reach the receiver. A
+    rate of zero never counts as converged, so a floor which delivers nothing stops only at max_steps of run_until.
+    """
+    num_steps = 0
+    start: Optional[Tuple[int, int]] = None
+    previous_rate: Optional[float] = None
+
+    def condition(factory_floor: FactoryFloor, step_event: StepEvent) -> bool:
+        nonlocal num_steps, start, previous_rate
+        statistics = factory_floor.receiver.statistics
+        num_steps += 1
+        if start is None:
+            if num_steps < factory_floor.config.conveyor_belt_slots:
+                return False
+            start = (statistics.received, statistics.products)
+        if num_steps % check_every or statistics.received == start[0]:
+            return False
+        rate = (statistics.products - start[1]) / (statistics.received - start[0])
+        converged = bool(previous_rate) and abs(rate - previous_rate) <= tolerance * previous_rate
+        previous_rate = rate
+        return converged
+
+    return condition
+
+
+def any_of(*conditions: StopCondition) -> StopCondition:
+    """
+    Stops as soon as one of conditions does. Every condition is checked after every tick.
+    """
+    def condition(factory_floor: FactoryFloor, step_event: StepEvent) -> bool:
+        return any([stop_condition(factory_floor, step_event) for stop_condition in conditions])
+
+    return condition
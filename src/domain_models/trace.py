@@ -0,0 +1,224 @@
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from src.domain_models.worker import WORKER_STATE_CODES, WORKER_STATES_BY_CODE
+from src.exceptions.exceptions import TraceError
+from src.exceptions.messages import (
+    INVALID_TRACE_FILE, INVALID_TRACE_VERSION, TICK_NOT_IN_TRACE, TRACE_VALUE_OUT_OF_RANGE,
+)
+
+MAGIC = b'FFTR'
+VERSION = 1
+PREFIX = struct.Struct('<4sH')
+# magic, version, num_slots, num_workers, capacity, num_records, first_tick, item table offset
+HEADER = struct.Struct('<4sHIIQQQQ')
+
+
+class TraceRecord(NamedTuple):
+    tick: int
+    items: Tuple
+    busy_slots: Tuple[bool, ...]
+    worker_states: Tuple[str, ...]
+    remaining_times: Tuple[int, ...]
+
+
+def _record_struct(num_slots: int, num_workers: int) -> struct.Struct:
+    """
+    Returns layout of a single record: item code per slot, bitmap of busy slots, state code per worker and remaining
+    time of operation per worker.
+    """
+    return struct.Struct(f'<{num_slots}I{(num_slots + 7) // 8}s{num_workers}B{num_workers}I')
+
+
+class TraceRecorder:
+    """
+    Writes the state of a factory floor at every tick into a preallocated, memory-mapped file of fixed-width binary
+    records. The file is sized for capacity records (num_steps + 1 of the first recorded floor by default) and doubles
+    when it runs out of space.
+
+    Items are stored as 32 bit codes, so belts of any practical length and any number of distinct items fit. The table
+    mapping codes back to items is written at close(), so the recorder has to be closed before the trace can be read
+    with TraceReader.
+    """
+    def __init__(self, path: str, capacity: int = None):
+        self.path = path
+        self.capacity = capacity
+        self.num_records = 0
+        self.first_tick = 0
+        self._file = None
+        self._trace = None
+        self._record = None
+        self._codes: Dict[Any, int] = {}
+        self._items: List[Any] = []
+
+    def record(self, factory_floor):
+        """
+        Appends the current state of factory_floor. The first record also fixes the layout of the file.
+        """
+        conveyor_belt = factory_floor.conveyor_belt
+        if self._trace is None:
+            self._open(factory_floor)
+        if self.num_records == self.capacity:
+            self._grow()
+
+        states, remaining_times = [], []
+        for worker in factory_floor.workers:
+            state, _, remaining_time = worker.snapshot()
+            states.append(WORKER_STATE_CODES[state])
+            remaining_times.append(remaining_time)
+
+        items = conveyor_belt.items
+        if factory_floor.item_codes is not None:
+            items = [factory_floor.item_codes.decode(item) for item in items]
+
+        try:
+            self._record.pack_into(
+                self._trace,
+                self._offset(self.num_records),
+                *[self._encode(item) for item in items],
+                conveyor_belt.busy_bitmap(),
+                *states,
+                *remaining_times,
+            )
+        except struct.error as error:
+            raise TraceError(TRACE_VALUE_OUT_OF_RANGE.format(error=error))
+        self.num_records += 1
+
+    def repeat(self, cycle_length: int, repetitions: int):
+        """
+        Appends the last cycle_length records repetitions times over. Used when a repeating stretch of ticks is not
+        simulated.
+        """
+        if not cycle_length or repetitions < 1:
+            return
+        while self.num_records + cycle_length * repetitions > self.capacity:
+            self._grow()
+        cycle = self._trace[self._offset(self.num_records - cycle_length):self._offset(self.num_records)]
+        for _ in range(repetitions):
+            start = self._offset(self.num_records)
+            self._trace[start:start + len(cycle)] = cycle
+            self.num_records += cycle_length
+
+    def close(self):
+        """
+        Writes the header and the item table and truncates the file to the records written.
+        """
+        if self._trace is None:
+            return
+        item_table_offset = self._offset(self.num_records)
+        self._write_header(item_table_offset)
+        self._trace.close()
+        self._file.truncate(item_table_offset)
+        self._file.seek(item_table_offset)
+        self._file.write(json.dumps(self._items).encode())
+        self._file.close()
+        self._trace = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _open(self, factory_floor):
+        self._num_slots = factory_floor.conveyor_belt.config.conveyor_belt_slots
+        self._num_workers = len(factory_floor.workers)
+        self._record = _record_struct(self._num_slots, self._num_workers)
+        self.capacity = self.capacity or factory_floor.config.num_steps + 1
+        self.first_tick = factory_floor.time
+        config = factory_floor.config
+        for item in [config.empty_code, config.product_code] + list(config.required_items):
+            self._encode(item)
+
+        self._file = open(self.path, 'w+b')
+        self._file.truncate(self._offset(self.capacity))
+        self._trace = mmap.mmap(self._file.fileno(), 0)
+
+    def _grow(self):
+        self.capacity *= 2
+        self._trace.resize(self._offset(self.capacity))
+
+    def _offset(self, record_number: int) -> int:
+        return HEADER.size + record_number * self._record.size
+
+    def _encode(self, item) -> int:
+        code = self._codes.get(item)
+        if code is None:
+            code = self._codes[item] = len(self._items)
+            self._items.append(item)
+        return code
+
+    def _write_header(self, item_table_offset: int):
+        HEADER.pack_into(
+            self._trace, 0, MAGIC, VERSION, self._num_slots, self._num_workers, self.capacity, self.num_records,
+            self.first_tick, item_table_offset,
+        )
+
+
+class TraceReader:
+    """
+    Random access to the records of a file written by TraceRecorder. Records are decoded only when asked for, so
+    reading tick T costs the same no matter how long the trace is.
+    """
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        if not os.fstat(self._file.fileno()).st_size:
+            self._file.close()
+            raise TraceError(INVALID_TRACE_FILE.format(path=path))
+        self._trace = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version = PREFIX.unpack_from(self._trace, 0)
+        except struct.error:
+            magic = version = None
+        if magic != MAGIC:
+            self.close()
+            raise TraceError(INVALID_TRACE_FILE.format(path=path))
+        if version != VERSION:
+            self.close()
+            raise TraceError(INVALID_TRACE_VERSION.format(version=version, expected=VERSION))
+        (
+            _, _, self.num_slots, self.num_workers, _, self.num_records, self.first_tick, item_table_offset
+        ) = HEADER.unpack_from(self._trace, 0)
+        self._items = json.loads(self._trace[item_table_offset:].decode())
+        self._record = _record_struct(self.num_slots, self.num_workers)
+
+    def __len__(self) -> int:
+        return self.num_records
+
+    def __getitem__(self, tick: int) -> TraceRecord:
+        """
+        Returns state of the floor at tick.
+        """
+        record_number = tick - self.first_tick
+        if not 0 <= record_number < self.num_records:
+            raise TraceError(TICK_NOT_IN_TRACE.format(tick=tick))
+        fields = self._record.unpack_from(self._trace, HEADER.size + record_number * self._record.size)
+        items = fields[:self.num_slots]
+        busy_bitmap = fields[self.num_slots]
+        states = fields[self.num_slots + 1:self.num_slots + 1 + self.num_workers]
+        return TraceRecord(
+            tick=tick,
+            items=tuple(self._items[code] for code in items),
+            busy_slots=tuple(
+                bool(busy_bitmap[slot_number >> 3] >> (slot_number & 7) & 1) for slot_number in range(self.num_slots)
+            ),
+            worker_states=tuple(WORKER_STATES_BY_CODE[code] for code in states),
+            remaining_times=fields[self.num_slots + 1 + self.num_workers:],
+        )
+
+    def __iter__(self):
+        for record_number in range(self.num_records):
+            yield self[self.first_tick + record_number]
+
+    def close(self):
+        self._trace.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,153 @@
+from array import array
+from typing import Dict, List, NamedTuple, Sequence
+
+from src.domain_models.worker import WORKER_STATE_CODES, Worker, WorkerStateCode
+
+NUM_STATES = 4
+
+
+class StateTicks(NamedTuple):
+    """
+    Number of ticks spent in each WorkerState.
+    """
+    idle: int
+    picking_up: int
+    dropping: int
+    building: int
+
+    @property
+    def total(self) -> int:
+        return self.idle + self.picking_up + self.dropping + self.building
+
+    @property
+    def busy_share(self) -> float:
+        """
+        Returns share of the ticks spent in an operation rather than idle.
+        """
+        return 1 - self.idle / self.total if self.total else 0.0
+
+
+class BlockedDrops(NamedTuple):
+    """
+    Products which could not be dropped straight away because the slot was busy or not empty, and the ticks they
+    waited for. Ticks of products still waiting are included, the products are counted once they are dropped.
+    """
+    drops: int
+    ticks: int
+
+
+class UtilizationSummary(NamedTuple):
+    workers: List[StateTicks]
+    slots: Dict[int, StateTicks]
+    floor: StateTicks
+    worker_blocked_drops: List[BlockedDrops]
+    slot_blocked_drops: Dict[int, BlockedDrops]
+    floor_blocked_drops: BlockedDrops
+
+
+class Utilization:
+    """
+    Accounts where the time of every worker goes: ticks spent idle, picking up, dropping and building, and how often
+    and for how long a finished product waited because it could not be dropped.
+
+    Workers report the start and the end of every operation, see Worker.utilization. The ticks of the state a worker
+    leaves are added to preallocated arrays per worker, per slot and for the whole floor, so the cost is constant per
+    state change and nothing is done for ticks in which a worker keeps its state. The floor keeps time up to date.
+
+    An operation started in tick t counts from t, an operation finished in tick t counts until the end of t. Worker
+    states changed other than by working, e.g. by restore(), are not accounted for.
+    """
+    def __init__(self, workers: Sequence[Worker], product_code: str, time: int = 0):
+        num_workers = len(workers)
+        self.time = time
+        self.start_time = time
+        self._slot_numbers = array('q', [worker.slot_number for worker in workers])
+        self._slots = sorted(set(self._slot_numbers))
+        slot_indices = {slot_number: index for index, slot_number in enumerate(self._slots)}
+        self._slot_indices = array('q', [slot_indices[slot_number] for slot_number in self._slot_numbers])
+        self._states = array('b', bytes(num_workers))
+        self._since = array('q', [time]) * num_workers
+        self._worker_ticks = array('q', bytes(8 * num_workers * NUM_STATES))
+        self._slot_ticks = array('q', bytes(8 * len(self._slots) * NUM_STATES))
+        self._floor_ticks = array('q', bytes(8 * NUM_STATES))
+        # Tick from which the product of a worker waits to be dropped, -1 if the worker holds no product.
+        self._blocked_since = array('q', [-1]) * num_workers
+        self._blocked_drops = array('q', bytes(8 * num_workers))
+        self._blocked_ticks = array('q', bytes(8 * num_workers))
+
+        for index, worker in enumerate(workers):
+            worker.utilization = self
+            worker.utilization_index = index
+            state, components, _ = worker.snapshot()
+            self._states[index] = WORKER_STATE_CODES[state]
+            if self._states[index] == WorkerStateCode.IDLE and product_code in components:
+                self._blocked_since[index] = time
+
+    def start_operation(self, index: int, state_code: int):
+        """
+        Called by the worker with utilization_index index when it starts an operation in the current tick.
+        """
+        self._change_state(index, state_code, self.time)
+        if state_code == WorkerStateCode.DROPPING:
+            blocked_since = self._blocked_since[index]
+            if 0 <= blocked_since < self.time:
+                self._blocked_drops[index] += 1
+                self._blocked_ticks[index] += self.time - blocked_since
+            self._blocked_since[index] = -1
+
+    def finish_operation(self, index: int, product_built: bool):
+        """
+        Called by the worker with utilization_index index when its operation finishes at the end of the current tick.
+        """
+        self._change_state(index, WorkerStateCode.IDLE, self.time + 1)
+        if product_built:
+            self._blocked_since[index] = self.time + 1
+
+    def summary(self, time: int) -> UtilizationSummary:
+        """
+        Returns ticks per state and blocked drops per worker, per slot and for the whole floor from start_time until
+        time, e.g. the time of the floor.
+        """
+        worker_ticks = array('q', self._worker_ticks)
+        slot_ticks = array('q', self._slot_ticks)
+        floor_ticks = array('q', self._floor_ticks)
+        blocked_ticks = array('q', self._blocked_ticks)
+        for index, state in enumerate(self._states):
+            elapsed = time - self._since[index]
+            worker_ticks[index * NUM_STATES + state] += elapsed
+            slot_ticks[self._slot_indices[index] * NUM_STATES + state] += elapsed
+            floor_ticks[state] += elapsed
+            if self._blocked_since[index] >= 0:
+                blocked_ticks[index] += max(time - self._blocked_since[index], 0)
+
+        slot_blocked_drops = array('q', bytes(8 * len(self._slots)))
+        slot_blocked_ticks = array('q', bytes(8 * len(self._slots)))
+        for index, slot_index in enumerate(self._slot_indices):
+            slot_blocked_drops[slot_index] += self._blocked_drops[index]
+            slot_blocked_ticks[slot_index] += blocked_ticks[index]
+        return UtilizationSummary(
+            workers=[
+                StateTicks(*worker_ticks[index * NUM_STATES:(index + 1) * NUM_STATES])
+                for index in range(len(self._states))
+            ],
+            slots={
+                slot_number: StateTicks(*slot_ticks[index * NUM_STATES:(index + 1) * NUM_STATES])
+                for index, slot_number in enumerate(self._slots)
+            },
+            floor=StateTicks(*floor_ticks),
+            worker_blocked_drops=[BlockedDrops(*counts) for counts in zip(self._blocked_drops, blocked_ticks)],
+            slot_blocked_drops={
+                slot_number: BlockedDrops(slot_blocked_drops[index], slot_blocked_ticks[index])
+                for index, slot_number in enumerate(self._slots)
+            },
+            floor_blocked_drops=BlockedDrops(sum(self._blocked_drops), sum(blocked_ticks)),
+        )
+
+    def _change_state(self, index: int, state_code: int, time: int):
+        state = self._states[index]
+        elapsed = time - self._since[index]
+        self._worker_ticks[index * NUM_STATES + state] += elapsed
+        self._slot_ticks[self._slot_indices[index] * NUM_STATES + state] += elapsed
+        self._floor_ticks[state] += elapsed
+        self._states[index] = state_code
+        self._since[index] = time
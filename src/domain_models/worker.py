@@ -1,4 +1,4 @@
-from typing import Type
+from typing import Dict, FrozenSet, Optional, Tuple, Type
 
 from src.domain_models.common import BaseModel
 from src.domain_models.conveyor_belt import ConveyorBelt
@@ -12,12 +12,45 @@ class WorkerState:
     BUILDING = 'building'
 
 
+class WorkerStateCode:
+    """
+    Integer codes of WorkerState used by array based and compiled implementations of the worker.
+    """
+    IDLE = 0
+    PICKING_UP = 1
+    DROPPING = 2
+    BUILDING = 3
+
+
 class WorkerOperationTimes:
     PICKING_UP = 1
     DROPPING = 1
     BUILDING = 4
 
 
+class WorkerAction:
+    """
+    Side effects of transitions of CompiledWorker. The first three are also the intents an idle worker declares in a
+    two phase tick, see Worker.declare_intent.
+    """
+    NONE = 0
+    PICK_UP_COMPONENT = 1
+    DROP_PRODUCT = 2
+    START_BUILDING = 3
+    FINISH_MOVING_GOODS = 4
+    FINISH_BUILDING = 5
+
+
+class OperationCounts:
+    """
+    Running totals of components picked up, products dropped and products built by the workers sharing it.
+    """
+    def __init__(self):
+        self.pickups = 0
+        self.drops = 0
+        self.builds = 0
+
+
 class Worker(BaseModel):
     def __init__(self,
                  config: FactoryFloorConfig,
@@ -34,6 +67,10 @@ class Worker(BaseModel):
         self._components = []
         self._state = WorkerState.IDLE
         self._remaining_time_of_operation = 0
+        self.operation_counts = OperationCounts()
+        # Set by Utilization to report operations to, see FactoryFloor.track_utilization.
+        self.utilization = None
+        self.utilization_index = 0
 
     def work(self):
         """
@@ -90,6 +127,111 @@ class Worker(BaseModel):
     def components(self):
         return self._components
 
+    @property
+    def slot_number(self) -> int:
+        return self._slot_number
+
+    @property
+    def remaining_time_of_operation(self) -> int:
+        return self._remaining_time_of_operation
+
+    def has_work(self) -> bool:
+        """
+        Returns False if the worker is idle and calling work() now would leave it idle, True otherwise.
+        """
+        if self._state != WorkerState.IDLE:
+            return True
+        return (
+            (self._can_pickup_component() and self._is_component_required()) or
+            (self._has_product() and self._can_drop_product()) or
+            self._is_ready_for_building()
+        )
+
+    def declare_intent(self) -> int:
+        """
+        Returns the WorkerAction an idle worker would start with if it worked now: picking up a component, dropping a
+        product or building. WorkerAction.NONE for a worker which is busy or has nothing to do. Neither the worker nor
+        the belt is changed.
+        """
+        if self._state != WorkerState.IDLE:
+            return WorkerAction.NONE
+        if self._can_pickup_component() and self._is_component_required():
+            return WorkerAction.PICK_UP_COMPONENT
+        if self._has_product() and self._can_drop_product():
+            return WorkerAction.DROP_PRODUCT
+        if self._is_ready_for_building():
+            return WorkerAction.START_BUILDING
+        return WorkerAction.NONE
+
+    def commit_intent(self, action: int):
+        """
+        Works for a tick like work(), except that an idle worker starts the operation given by action, as granted after
+        declare_intent, instead of checking the belt again. A worker whose intent was not granted stays idle.
+        """
+        if action == WorkerAction.PICK_UP_COMPONENT:
+            self._state = WorkerState.PICKING_UP
+            self._on_picking_up_component()
+        elif action == WorkerAction.DROP_PRODUCT:
+            self._state = WorkerState.DROPPING
+            self._on_dropping_product()
+        elif action == WorkerAction.START_BUILDING:
+            self._state = WorkerState.BUILDING
+            self._on_building_product()
+
+        if self._is_operating():
+            self._update_operation_time()
+
+        if self._state != WorkerState.IDLE:
+            self._update_state()
+
+    def wanted_items(self) -> Optional[FrozenSet]:
+        """
+        Returns items which make an idle worker work when they reach its free slot: the missing components or the empty
+        code if the worker holds a product. None if the worker is ready to build and does not wait for any item.
+        """
+        if self._is_ready_for_building():
+            return None
+        if self._has_product():
+            return frozenset([self._config.empty_code])
+        return frozenset(self._config.required_items).difference(self._components)
+
+    def wait(self, num_ticks: int):
+        """
+        Advances the current operation by num_ticks ticks. The same as calling work() num_ticks times, provided the
+        operation does not finish within them.
+        """
+        self._remaining_time_of_operation -= num_ticks
+
+    def snapshot(self) -> Tuple[str, Tuple, int]:
+        """
+        Returns state, components and remaining time of operation of the worker as a hashable tuple.
+        """
+        return self._state, tuple(self._components), self._remaining_time_of_operation
+
+    def restore(self, snapshot: Tuple[str, Tuple, int]):
+        """
+        Sets state, components and remaining time of operation from a snapshot.
+        """
+        state, components, remaining_time_of_operation = snapshot
+        self._state = state
+        self._components = list(components)
+        self._remaining_time_of_operation = remaining_time_of_operation
+
+    def fork(self, conveyor_belt: ConveyorBelt, operation_times: Type[WorkerOperationTimes] = None) -> 'Worker':
+        """
+        Returns a new worker in the same state working at the same slot of conveyor_belt. Config is shared, operation
+        times are shared unless replaced with operation_times.
+        """
+        worker = type(self)(
+            config=self._config,
+            conveyor_belt=conveyor_belt,
+            slot_number=self._slot_number,
+            operation_times=operation_times if operation_times else self._operation_times,
+            name=self.name,
+        )
+        worker.restore(self.snapshot())
+        return worker
+
     def _can_pickup_component(self):
         return self._conveyor_belt.is_slot_free(self._slot_number)
 
@@ -121,23 +263,230 @@ class Worker(BaseModel):
 
     def _on_picking_up_component(self):
         self._remaining_time_of_operation = self._operation_times.PICKING_UP
+        self.operation_counts.pickups += 1
+        if self.utilization is not None:
+            self.utilization.start_operation(self.utilization_index, WorkerStateCode.PICKING_UP)
 
         item_at_slot = self._conveyor_belt.retrieve_item_from_slot(slot_number=self._slot_number)
         self._components.append(item_at_slot)
 
     def _on_dropping_product(self):
         self._remaining_time_of_operation = self._operation_times.DROPPING
+        self.operation_counts.drops += 1
+        if self.utilization is not None:
+            self.utilization.start_operation(self.utilization_index, WorkerStateCode.DROPPING)
         self._conveyor_belt.put_item_in_slot(slot_number=self._slot_number, item=self._components.pop())
 
     def _on_building_product(self):
-        self._remaining_time_of_operation = WorkerOperationTimes.BUILDING
+        self._remaining_time_of_operation = self._operation_times.BUILDING
+        if self.utilization is not None:
+            self.utilization.start_operation(self.utilization_index, WorkerStateCode.BUILDING)
 
     def _on_finished_moving_goods(self):
         self._conveyor_belt.confirm_operation_at_slot_finished(slot_number=self._slot_number)
+        if self.utilization is not None:
+            self.utilization.finish_operation(self.utilization_index, product_built=False)
 
     def _on_finished_building_product(self):
         self._components = []
         self._components.append(self._config.product_code)
+        self.operation_counts.builds += 1
+        if self.utilization is not None:
+            self.utilization.finish_operation(self.utilization_index, product_built=True)
 
     def _update_operation_time(self):
         self._remaining_time_of_operation -= 1
+
+
+# Conditions of an idle worker, combined into the lower bits of a transition table index.
+CAN_PICK_UP = 1
+CAN_DROP = 2
+READY_FOR_BUILDING = 4
+# Condition of a worker in any other state.
+NOT_OPERATING = 1
+
+NUM_CONDITIONS = 8
+WORKER_STATES_BY_CODE = (WorkerState.IDLE, WorkerState.PICKING_UP, WorkerState.DROPPING, WorkerState.BUILDING)
+WORKER_STATE_CODES = {state: code for code, state in enumerate(WORKER_STATES_BY_CODE)}
+
+
+def _build_transition_table() -> Tuple[Tuple[int, int], ...]:
+    """
+    Returns (next state, action) for every state code and combination of conditions, indexed by
+    state code * NUM_CONDITIONS + conditions. The same rules as Worker._update_state.
+    """
+    table = []
+    for state in range(len(WORKER_STATES_BY_CODE)):
+        for conditions in range(NUM_CONDITIONS):
+            if state == WorkerStateCode.IDLE:
+                if conditions & CAN_PICK_UP:
+                    transition = (WorkerStateCode.PICKING_UP, WorkerAction.PICK_UP_COMPONENT)
+                elif conditions & CAN_DROP:
+                    transition = (WorkerStateCode.DROPPING, WorkerAction.DROP_PRODUCT)
+                elif conditions & READY_FOR_BUILDING:
+                    transition = (WorkerStateCode.BUILDING, WorkerAction.START_BUILDING)
+                else:
+                    transition = (WorkerStateCode.IDLE, WorkerAction.NONE)
+            elif not conditions & NOT_OPERATING:
+                transition = (state, WorkerAction.NONE)
+            elif state == WorkerStateCode.BUILDING:
+                transition = (WorkerStateCode.IDLE, WorkerAction.FINISH_BUILDING)
+            else:
+                transition = (WorkerStateCode.IDLE, WorkerAction.FINISH_MOVING_GOODS)
+            table.append(transition)
+    return tuple(table)
+
+
+TRANSITIONS = _build_transition_table()
+# State code an idle worker moves to when it starts the operation of an intent.
+INTENT_STATE_CODES = {
+    WorkerAction.PICK_UP_COMPONENT: WorkerStateCode.PICKING_UP,
+    WorkerAction.DROP_PRODUCT: WorkerStateCode.DROPPING,
+    WorkerAction.START_BUILDING: WorkerStateCode.BUILDING,
+}
+
+
+class CompiledWorker(Worker):
+    """
+    Behaves exactly like Worker but is driven by TRANSITIONS, a table over integer state codes and condition bits,
+    instead of a chain of comparisons of WorkerState strings.
+
+    Required items are mapped to bits once, so held components are a bitmask and checking whether an item is needed is
+    a single dict lookup. Components are reported in the order of config.required_items rather than the order they
+    were picked up in.
+    """
+    def __init__(self,
+                 config: FactoryFloorConfig,
+                 conveyor_belt: ConveyorBelt,
+                 slot_number: int,
+                 operation_times: Type[WorkerOperationTimes],
+                 name: str = '',
+                 ):
+        super().__init__(
+            config=config,
+            conveyor_belt=conveyor_belt,
+            slot_number=slot_number,
+            operation_times=operation_times,
+            name=name,
+        )
+        self._required_items = list(dict.fromkeys(config.required_items))
+        self._item_bits = {item: 1 << bit_number for bit_number, item in enumerate(self._required_items)}
+        self._num_required_items = len(config.required_items)
+        self._durations = (0, operation_times.PICKING_UP, operation_times.DROPPING, operation_times.BUILDING)
+        self._wanted_items_by_bits: Dict[int, FrozenSet] = {}
+        self._state_code = WorkerStateCode.IDLE
+        self._component_bits = 0
+        self._has_product_held = False
+        self._num_components = 0
+
+    def work(self):
+        """
+        Same as Worker.work: a transition, a tick of the current operation and another transition.
+        """
+        self._transition()
+        if self._remaining_time_of_operation > 0:
+            self._remaining_time_of_operation -= 1
+        self._transition()
+
+    def declare_intent(self) -> int:
+        if self._state_code != WorkerStateCode.IDLE:
+            return WorkerAction.NONE
+        return TRANSITIONS[self._idle_conditions()][1]
+
+    def commit_intent(self, action: int):
+        if action:
+            next_state_code = INTENT_STATE_CODES[action]
+            self._perform(action, next_state_code)
+            self._state_code = next_state_code
+        if self._remaining_time_of_operation > 0:
+            self._remaining_time_of_operation -= 1
+        if self._state_code != WorkerStateCode.IDLE:
+            self._transition()
+
+    def _transition(self):
+        state_code = self._state_code
+        if state_code == WorkerStateCode.IDLE:
+            conditions = self._idle_conditions()
+        else:
+            conditions = NOT_OPERATING if self._remaining_time_of_operation == 0 else 0
+        next_state_code, action = TRANSITIONS[state_code * NUM_CONDITIONS + conditions]
+        if action:
+            self._perform(action, next_state_code)
+        self._state_code = next_state_code
+
+    def _idle_conditions(self) -> int:
+        conveyor_belt = self._conveyor_belt
+        slot_number = self._slot_number
+        conditions = READY_FOR_BUILDING if self._num_components == self._num_required_items else 0
+        if not conveyor_belt.is_slot_free(slot_number):
+            return conditions
+        item = conveyor_belt.check_item_at_slot(slot_number)
+        if self._has_product_held:
+            if item == self._config.empty_code:
+                conditions |= CAN_DROP
+        else:
+            bit = self._item_bits.get(item, 0)
+            if bit and not self._component_bits & bit:
+                conditions |= CAN_PICK_UP
+        return conditions
+
+    def _perform(self, action: int, next_state_code: int):
+        self._remaining_time_of_operation = self._durations[next_state_code]
+        if action == WorkerAction.PICK_UP_COMPONENT:
+            item = self._conveyor_belt.retrieve_item_from_slot(slot_number=self._slot_number)
+            self._component_bits |= self._item_bits[item]
+            self._num_components += 1
+            self.operation_counts.pickups += 1
+        elif action == WorkerAction.DROP_PRODUCT:
+            self._conveyor_belt.put_item_in_slot(slot_number=self._slot_number, item=self._config.product_code)
+            self._has_product_held = False
+            self._num_components = 0
+            self.operation_counts.drops += 1
+        elif action == WorkerAction.FINISH_MOVING_GOODS:
+            self._conveyor_belt.confirm_operation_at_slot_finished(slot_number=self._slot_number)
+        elif action == WorkerAction.FINISH_BUILDING:
+            self._component_bits = 0
+            self._has_product_held = True
+            self._num_components = 1
+            self.operation_counts.builds += 1
+        if self.utilization is not None:
+            if next_state_code == WorkerStateCode.IDLE:
+                self.utilization.finish_operation(
+                    self.utilization_index, product_built=action == WorkerAction.FINISH_BUILDING
+                )
+            else:
+                self.utilization.start_operation(self.utilization_index, next_state_code)
+
+    @property
+    def components(self):
+        if self._has_product_held:
+            return [self._config.product_code]
+        return [item for item in self._required_items if self._component_bits & self._item_bits[item]]
+
+    def snapshot(self) -> Tuple[str, Tuple, int]:
+        return WORKER_STATES_BY_CODE[self._state_code], tuple(self.components), self._remaining_time_of_operation
+
+    def restore(self, snapshot: Tuple[str, Tuple, int]):
+        state, components, remaining_time_of_operation = snapshot
+        self._state_code = WORKER_STATE_CODES[state]
+        self._has_product_held = self._config.product_code in components
+        self._component_bits = 0
+        for item in components:
+            self._component_bits |= self._item_bits.get(item, 0)
+        self._num_components = len(components)
+        self._remaining_time_of_operation = remaining_time_of_operation
+
+    def has_work(self) -> bool:
+        return self._state_code != WorkerStateCode.IDLE or bool(self._idle_conditions())
+
+    def wanted_items(self) -> Optional[FrozenSet]:
+        if self._num_components == self._num_required_items:
+            return None
+        if self._has_product_held:
+            return frozenset([self._config.empty_code])
+        wanted_items = self._wanted_items_by_bits.get(self._component_bits)
+        if wanted_items is None:
+            wanted_items = self._wanted_items_by_bits[self._component_bits] = frozenset(
+                item for item in self._required_items if not self._component_bits & self._item_bits[item]
+            )
+        return wanted_items
@@ -0,0 +1,92 @@
+from typing import NamedTuple, Sequence, Type
+
+import numpy as np
+
+from src.domain_models.common import BaseModel
+from src.domain_models.worker import WorkerOperationTimes
+from src.engines.vectorized import FloorArrays
+from src.exceptions.exceptions import FactoryConfigError
+from src.exceptions.messages import NOT_ENOUGH_REPLICAS, WRONG_FACTORY_CONFIG
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig, ItemCodes
+from src.helpers.statistics import ConfidenceInterval, mean_confidence_interval
+
+
+class MonteCarloResult(NamedTuple):
+    product_counts: np.ndarray
+    num_steps: int
+    confidence_interval: ConfidenceInterval
+
+    @property
+    def mean_product_count(self) -> float:
+        return self.confidence_interval.mean
+
+    @property
+    def products_per_tick(self) -> float:
+        return self.confidence_interval.mean / self.num_steps
+
+
+class BatchFactoryFloor(BaseModel):
+    """
+    Runs num_replicas independent factory floors side by side. Every floor gets a random feed drawn uniformly from
+    components, the same as the default Feeder, and all of them are stepped together along the batch axis of
+    FloorArrays.
+
+    Only the number of products received by each floor is kept, so memory does not grow with num_steps.
+    """
+    FEED_BLOCK_SIZE = 1024
+
+    def __init__(self,
+                 config: FactoryFloorConfig = None,
+                 num_replicas: int = 100,
+                 components: Sequence = ('A', 'B'),
+                 seed: int = None,
+                 operation_times: Type[WorkerOperationTimes] = WorkerOperationTimes,
+                 ):
+        if num_replicas < 2:
+            raise FactoryConfigError(NOT_ENOUGH_REPLICAS.format(num_replicas=num_replicas))
+        self.config = config if config else FactoryFloorConfig()
+        self.num_replicas = num_replicas
+        self.components = tuple(components)
+        self.num_pairs = self.config.num_pairs or self.config.conveyor_belt_slots
+        if self.num_pairs > self.config.conveyor_belt_slots:
+            raise FactoryConfigError(WRONG_FACTORY_CONFIG)
+        self.time = 0
+        self.item_codes = ItemCodes(self.config)
+        self.arrays = FloorArrays(
+            config=self.config,
+            item_codes=self.item_codes,
+            num_pairs=self.num_pairs,
+            operation_times=operation_times,
+            batch_shape=(num_replicas,),
+        )
+        self.product_counts = np.zeros(num_replicas, dtype=np.int64)
+        self._random = np.random.default_rng(seed)
+        self._component_codes = np.array([self.item_codes.encode(item) for item in self.components], dtype=np.int64)
+
+    def run(self, confidence: float = 0.95) -> MonteCarloResult:
+        """
+        Runs all replicas for config.num_steps ticks.
+
+        Parameters
+        ----------
+        confidence
+            Confidence level of the interval for the mean number of products.
+        """
+        remaining_steps = self.config.num_steps
+        while remaining_steps:
+            block_size = min(remaining_steps, self.FEED_BLOCK_SIZE)
+            feed_block = self._component_codes[
+                self._random.integers(len(self._component_codes), size=(block_size, self.num_replicas))
+            ]
+            for new_items in feed_block:
+                leaving_items = self.arrays.move_belt(new_items)
+                self.product_counts += leaving_items == ItemCodes.PRODUCT
+                self.arrays.work()
+            self.time += block_size
+            remaining_steps -= block_size
+
+        return MonteCarloResult(
+            product_counts=self.product_counts.copy(),
+            num_steps=self.time,
+            confidence_interval=mean_confidence_interval(self.product_counts.tolist(), confidence=confidence),
+        )
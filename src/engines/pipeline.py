@@ -0,0 +1,327 @@
+import copy
+import functools
+import multiprocessing
+import threading
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
+
+from src.domain_models.common import BaseModel
+from src.domain_models.conveyor_belt import CompactConveyorBelt, ConveyorBelt, SparseConveyorBelt
+from src.domain_models.factory_floor import FactoryFloor
+from src.domain_models.feeder import Feeder
+from src.domain_models.intents import ConflictPolicy, TickMode
+from src.domain_models.receiver import Receiver
+from src.domain_models.worker import Worker, WorkerOperationTimes
+from src.exceptions.exceptions import FactoryConfigError, PipelineError
+from src.exceptions.messages import (
+    FEEDING_STOPPED, INSUFFICIENT_FEED_INPUT, INVALID_NUM_SEGMENTS, PIPELINE_FAILED, SEGMENT_FAILED,
+    WRONG_FACTORY_CONFIG,
+)
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig, ItemCodes
+
+
+class ItemRing:
+    """
+    Single producer, single consumer queue of item codes in shared memory for passing items between processes.
+
+    Codes are written and read a chunk of up to chunk_size codes at a time. The ring holds num_chunks chunks, after that
+    the producer waits for the consumer. Producer and consumer keep their own position, so each of them has to use its
+    own copy of the ring, i.e. the one inherited by its process.
+    """
+    POLL_SECONDS = 1.0
+
+    def __init__(self, context, chunk_size: int = 256, num_chunks: int = 4):
+        self.chunk_size = chunk_size
+        self.num_chunks = num_chunks
+        self._codes = context.RawArray('q', chunk_size * num_chunks)
+        self._filled = context.Semaphore(0)
+        self._free = context.Semaphore(num_chunks)
+        self._next_chunk = 0
+
+    def put(self, codes: Sequence[int]):
+        """
+        Writes a chunk of at most chunk_size codes, waiting for a free chunk if the ring is full.
+        """
+        self._free.acquire()
+        start = self._next_chunk * self.chunk_size
+        self._codes[start:start + len(codes)] = codes
+        self._next_chunk = (self._next_chunk + 1) % self.num_chunks
+        self._filled.release()
+
+    def get(self, num_codes: int, on_wait: Callable[[], None] = None) -> List[int]:
+        """
+        Reads the next chunk, which has to hold num_codes codes. While waiting for it on_wait is called every
+        POLL_SECONDS, so the consumer can give up by raising.
+        """
+        while not self._filled.acquire(timeout=self.POLL_SECONDS):
+            if on_wait is not None:
+                on_wait()
+        start = self._next_chunk * self.chunk_size
+        codes = self._codes[start:start + num_codes]
+        self._next_chunk = (self._next_chunk + 1) % self.num_chunks
+        self._free.release()
+        return codes
+
+
+class Segment(NamedTuple):
+    first_slot: int
+    end_slot: int
+
+    @property
+    def num_slots(self) -> int:
+        return self.end_slot - self.first_slot
+
+
+# Items and slot states of the belt and snapshots of the workers of a segment.
+SegmentState = Tuple[Tuple, Tuple[Tuple, ...]]
+
+
+class PipelineFactoryFloor(BaseModel):
+    """
+    Alternative to FactoryFloor for very long belts. The belt is split into num_segments contiguous ranges of slots,
+    each simulated together with its workers by a FactoryFloor of its own in a separate process.
+
+    Workers only ever touch their own slot, so a segment depends on the rest of the floor only through the items
+    entering it: the item leaving the last slot of one segment in a tick enters slot 0 of the next segment in the same
+    tick. Segments therefore run as a pipeline - the feeder feeds the first segment, every segment feeds the items it
+    pushes off its end to the next one through an ItemRing and the items leaving the last segment go to the receiver.
+    A segment works on tick t as soon as the segment before it has finished tick t, in chunks of chunk_size ticks to
+    keep synchronisation cheap (chunk_size=1 makes segments exactly one tick apart).
+
+    Items travel between processes as codes of config.interned(). For the same feed the receiver gets exactly the same
+    items as with FactoryFloor, and the state of the belt and the workers is kept between runs.
+    """
+    def __init__(self,
+                 config: FactoryFloorConfig = None,
+                 feeder: Feeder = None,
+                 receiver: Receiver = None,
+                 num_segments: int = None,
+                 chunk_size: int = 256,
+                 num_chunks: int = 4,
+                 worker_class: Type[Worker] = Worker,
+                 conveyor_belt_class: Type[Union[ConveyorBelt, CompactConveyorBelt, SparseConveyorBelt]] = ConveyorBelt,
+                 operation_times: Type[WorkerOperationTimes] = WorkerOperationTimes,
+                 tick_mode: str = TickMode.SEQUENTIAL,
+                 conflict_policy: str = ConflictPolicy.LOWEST_PAIR,
+                 ):
+        self.config = config if config else FactoryFloorConfig()
+        self.feeder = feeder if feeder else Feeder()
+        self.receiver = receiver if receiver else Receiver(config=self.config)
+        num_slots = self.config.conveyor_belt_slots
+        self.num_pairs = self.config.num_pairs or num_slots
+        if self.num_pairs > num_slots:
+            raise FactoryConfigError(WRONG_FACTORY_CONFIG)
+        self.num_segments = num_segments or min(multiprocessing.cpu_count(), num_slots)
+        if not 1 <= self.num_segments <= num_slots:
+            raise FactoryConfigError(INVALID_NUM_SEGMENTS.format(num_slots=num_slots, num_segments=num_segments))
+        self.segments = [
+            Segment(first_slot=num_slots * index // self.num_segments,
+                    end_slot=num_slots * (index + 1) // self.num_segments)
+            for index in range(self.num_segments)
+        ]
+        self.chunk_size = chunk_size
+        self.num_chunks = num_chunks
+        self.worker_class = worker_class
+        self.conveyor_belt_class = conveyor_belt_class
+        self.operation_times = operation_times
+        self.tick_mode = tick_mode
+        self.conflict_policy = conflict_policy
+        self.item_codes: ItemCodes = self.config.interned().item_codes
+        self.time = 0
+        self._segment_states: List[Optional[SegmentState]] = [None] * self.num_segments
+        self._failed_tick: Optional[int] = None
+        self._feed_error: Optional[Exception] = None
+        self._feeding_done = False
+        # Time at which a run failed. Segment states are then older than time and the receiver.
+        self._failed_at: Optional[int] = None
+
+    @property
+    def belt_items(self) -> List[Any]:
+        """
+        Returns items on the belt in slot order.
+        """
+        items = []
+        for segment, segment_state in zip(self.segments, self._segment_states):
+            if segment_state is None:
+                items.extend([self.config.empty_code] * segment.num_slots)
+            else:
+                items.extend(self.item_codes.decode(code) for code in segment_state[0][0])
+        return items
+
+    def run(self):
+        """
+        Main event loop. Starts a process per segment, runs config.num_steps ticks and collects the state of every
+        segment for the next run.
+
+        If the feeder raises, the receiver gets the items of the ticks before and the exception is raised again here,
+        FactoryConfigError if the feed ran out. After a failed run the segments are not in the state of the floor at
+        time, so any later run raises PipelineError.
+        """
+        if self._failed_at is not None:
+            raise PipelineError(PIPELINE_FAILED.format(time=self._failed_at))
+        num_steps = self.config.num_steps
+        chunk_sizes = [min(self.chunk_size, num_steps - start) for start in range(0, num_steps, self.chunk_size)]
+        context = multiprocessing.get_context()
+        rings = [ItemRing(context, self.chunk_size, self.num_chunks) for _ in range(self.num_segments + 1)]
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=_run_segment,
+                kwargs=dict(
+                    index=index,
+                    segment=segment,
+                    pipeline=self._segment_arguments(),
+                    segment_state=self._segment_states[index],
+                    chunk_sizes=chunk_sizes,
+                    input_ring=rings[index],
+                    output_ring=rings[index + 1],
+                    results=results,
+                ),
+                daemon=True,
+            )
+            for index, segment in enumerate(self.segments)
+        ]
+        # Processes are started before the feeding thread, so none of them is forked with it running.
+        for process in processes:
+            process.start()
+        self._failed_tick = None
+        self._feed_error = None
+        self._feeding_done = False
+        feeding_thread = threading.Thread(target=self._feed, args=(rings[0], chunk_sizes), daemon=True)
+        feeding_thread.start()
+        check_segments = functools.partial(self._check_segments, processes, feeding_thread)
+        # Cleared only once the state of every segment has been collected.
+        self._failed_at = self.time
+        try:
+            for chunk_size in chunk_sizes:
+                codes = rings[-1].get(chunk_size, on_wait=check_segments)
+                if self._failed_tick is not None:
+                    codes = codes[:max(self._failed_tick - self.time + 1, 0)]
+                for code in codes:
+                    self.receiver.receive(self.item_codes.decode(code))
+                self.time += len(codes)
+
+            segment_states = [None] * self.num_segments
+            for _ in processes:
+                index, segment_state = results.get()
+                segment_states[index] = segment_state
+            for process in processes:
+                process.join()
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            feeding_thread.join(timeout=ItemRing.POLL_SECONDS)
+
+        if self._failed_tick is not None:
+            self.time = self._failed_at = self._failed_tick
+            if self._feed_error is not None:
+                raise self._feed_error
+            raise FactoryConfigError(INSUFFICIENT_FEED_INPUT)
+        self._segment_states = segment_states
+        self._failed_at = None
+
+    def _segment_arguments(self) -> dict:
+        return dict(
+            config=self.config.interned(),
+            num_pairs=self.num_pairs,
+            time=self.time,
+            worker_class=self.worker_class,
+            conveyor_belt_class=self.conveyor_belt_class,
+            operation_times=self.operation_times,
+            tick_mode=self.tick_mode,
+            conflict_policy=self.conflict_policy,
+        )
+
+    def _feed(self, ring: ItemRing, chunk_sizes: List[int]):
+        """
+        Writes feed items to the first ring. If the feed runs out or raises, the tick and the exception are noted and
+        the remaining ticks are fed empty slots, so that the pipeline still drains.
+        """
+        tick = self.time
+        for chunk_size in chunk_sizes:
+            codes = []
+            for _ in range(chunk_size):
+                if self._failed_tick is None:
+                    try:
+                        codes.append(self.item_codes.encode(self.feeder.feed()))
+                    except StopIteration:
+                        self._failed_tick = tick
+                    except Exception as error:
+                        self._feed_error = error
+                        self._failed_tick = tick
+                if self._failed_tick is not None:
+                    codes.append(ItemCodes.EMPTY)
+                tick += 1
+            ring.put(codes)
+        self._feeding_done = True
+
+    def _check_segments(self, processes: List[multiprocessing.Process], feeding_thread: threading.Thread):
+        for index, process in enumerate(processes):
+            if process.exitcode not in (None, 0):
+                raise PipelineError(SEGMENT_FAILED.format(segment=index, exit_code=process.exitcode))
+        if not feeding_thread.is_alive() and not self._feeding_done:
+            raise PipelineError(FEEDING_STOPPED)
+
+
+def _segment_floor(segment: Segment, config: FactoryFloorConfig, num_pairs: int, time: int, worker_class: Type[Worker],
+                   conveyor_belt_class: Type, operation_times: Type[WorkerOperationTimes], tick_mode: str,
+                   conflict_policy: str, feeder: Feeder) -> FactoryFloor:
+    """
+    Returns a floor simulating the slots of segment of a pipeline and the workers at them. config has to be interned
+    already, so the floor works with the codes travelling through the rings.
+    """
+    segment_config = copy.copy(config)
+    segment_config.intern_items = False
+    segment_config.item_codes = None
+    segment_config.conveyor_belt_slots = segment.num_slots
+    segment_config.num_pairs = segment.num_slots
+    conveyor_belt = conveyor_belt_class(config=segment_config)
+    workers = [
+        worker_class(
+            config=segment_config,
+            name=f'slot={slot_number}, pair={pair_number}',
+            conveyor_belt=conveyor_belt,
+            operation_times=operation_times,
+            slot_number=slot_number - segment.first_slot,
+        )
+        for slot_number in range(segment.first_slot, min(segment.end_slot, num_pairs))
+        for pair_number in range(2)
+    ]
+    factory_floor = FactoryFloor(
+        config=segment_config,
+        feeder=feeder,
+        conveyor_belt=conveyor_belt,
+        workers=workers,
+        tick_mode=tick_mode,
+        conflict_policy=conflict_policy,
+    )
+    # A segment past the last pair has no workers, which FactoryFloor would take as a request for the default ones.
+    factory_floor.workers = workers
+    factory_floor.time = time
+    return factory_floor
+
+
+def _run_segment(index: int, segment: Segment, pipeline: dict, segment_state: Optional[SegmentState],
+                 chunk_sizes: List[int], input_ring: ItemRing, output_ring: ItemRing, results):
+    """
+    Runs in the process of a segment: takes the items entering the segment from input_ring, passes the items leaving
+    it on to output_ring and reports the final state of the segment to results.
+    """
+    def entering_items():
+        for chunk_size in chunk_sizes:
+            yield from input_ring.get(chunk_size)
+
+    factory_floor = _segment_floor(segment=segment, feeder=Feeder(feed_input=entering_items()), **pipeline)
+    if segment_state is not None:
+        conveyor_belt_state, worker_states = segment_state
+        factory_floor.conveyor_belt.restore(conveyor_belt_state)
+        for worker, worker_state in zip(factory_floor.workers, worker_states):
+            worker.restore(worker_state)
+
+    for chunk_size in chunk_sizes:
+        output_ring.put([factory_floor.tick() for _ in range(chunk_size)])
+
+    results.put((
+        index,
+        (factory_floor.conveyor_belt.snapshot(), tuple(worker.snapshot() for worker in factory_floor.workers)),
+    ))
@@ -0,0 +1,201 @@
+from typing import Any, List, Tuple, Type
+
+import numpy as np
+
+from src.domain_models.common import BaseModel
+from src.domain_models.feeder import Feeder
+from src.domain_models.receiver import Receiver
+from src.domain_models.worker import WorkerOperationTimes, WorkerStateCode
+from src.exceptions.exceptions import FactoryConfigError
+from src.exceptions.messages import WRONG_FACTORY_CONFIG, INSUFFICIENT_FEED_INPUT, TOO_MANY_REQUIRED_ITEMS
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig, ItemCodes
+
+PAIR_SIZE = 2
+MAX_REQUIRED_ITEMS = 63
+
+
+class FloorArrays:
+    """
+    State of the conveyor belt and of all workers kept in NumPy arrays.
+
+    All arrays share an optional leading batch shape so that many independent floors can be stepped at once. For a
+    batch shape of (n,) the belt has shape (n, conveyor_belt_slots) and the worker arrays have shape
+    (n, 2, num_pairs) - the middle axis is the pair number of the worker at a slot.
+
+    The belt is a ring buffer: slot 0 is at index head and moving the belt only moves head.
+    Held components are a bitmask over the required items.
+    """
+    def __init__(
+            self,
+            config: FactoryFloorConfig,
+            item_codes: ItemCodes,
+            num_pairs: int,
+            operation_times: Type[WorkerOperationTimes] = WorkerOperationTimes,
+            batch_shape: Tuple[int, ...] = (),
+    ):
+        distinct_required_items = list(dict.fromkeys(config.required_items))
+        if len(distinct_required_items) > MAX_REQUIRED_ITEMS:
+            raise FactoryConfigError(TOO_MANY_REQUIRED_ITEMS.format(max_items=MAX_REQUIRED_ITEMS))
+
+        self.num_slots = config.conveyor_belt_slots
+        self.num_pairs = num_pairs
+        self.batch_shape = batch_shape
+        self._operation_times = operation_times
+        self._num_required_items = len(config.required_items)
+
+        required_codes = [item_codes.encode(item) for item in distinct_required_items]
+        # The last entry is 0 and stands for every item which is not required.
+        self._required_bits = np.zeros(max(required_codes, default=0) + 2, dtype=np.int64)
+        for bit_number, code in enumerate(required_codes):
+            self._required_bits[code] = 1 << bit_number
+
+        self.head = 0
+        self.belt = np.full(batch_shape + (self.num_slots,), ItemCodes.EMPTY, dtype=np.int64)
+        self.slot_busy = np.zeros(batch_shape + (num_pairs,), dtype=bool)
+
+        worker_shape = batch_shape + (PAIR_SIZE, num_pairs)
+        self.states = np.full(worker_shape, WorkerStateCode.IDLE, dtype=np.int8)
+        self.remaining_times = np.zeros(worker_shape, dtype=np.int64)
+        self.components = np.zeros(worker_shape, dtype=np.int64)
+        self.component_counts = np.zeros(worker_shape, dtype=np.int64)
+        self.has_product = np.zeros(worker_shape, dtype=bool)
+        self._slot_offsets = np.arange(num_pairs)
+
+    @property
+    def last_slot_index(self) -> int:
+        """
+        Returns index of the last slot of the belt in the belt array.
+        """
+        return (self.head + self.num_slots - 1) % self.num_slots
+
+    def move_belt(self, new_items: np.ndarray) -> np.ndarray:
+        """
+        Removes items from the last slot of the belt and puts new_items in slot 0.
+
+        Parameters
+        ----------
+        new_items
+            Codes of items to put in slot 0, one per floor in the batch.
+
+        Returns
+        -------
+            Codes of items which left the belt.
+        """
+        leaving_items = self.belt[..., self.last_slot_index].copy()
+        self.head = self.last_slot_index
+        self.belt[..., self.head] = new_items
+        return leaving_items
+
+    def work(self):
+        """
+        Makes all workers work for one tick. Workers at different slots never touch each other's slot so every slot
+        is processed at once. At a single slot pair 0 works before pair 1, the same as in FactoryFloor.
+        """
+        slot_indices = (self.head + self._slot_offsets) % self.num_slots
+        for pair_number in range(PAIR_SIZE):
+            self._update_state(pair_number, slot_indices)
+            remaining_times = self.remaining_times[..., pair_number, :]
+            remaining_times -= remaining_times > 0
+            self._update_state(pair_number, slot_indices)
+
+    def _update_state(self, pair_number: int, slot_indices: np.ndarray):
+        """
+        Array version of Worker._update_state. All conditions are evaluated against the state at the start of the
+        call so each worker changes its state at most once.
+        """
+        states = self.states[..., pair_number, :]
+        remaining_times = self.remaining_times[..., pair_number, :]
+        components = self.components[..., pair_number, :]
+        component_counts = self.component_counts[..., pair_number, :]
+        has_product = self.has_product[..., pair_number, :]
+
+        items = self.belt[..., slot_indices]
+        item_bits = self._required_bits[np.minimum(items, self._required_bits.size - 1)]
+        slot_free = ~self.slot_busy
+        idle = states == WorkerStateCode.IDLE
+        not_operating = remaining_times == 0
+
+        picking_up = idle & slot_free & ~has_product & (item_bits != 0) & ((components & item_bits) == 0)
+        dropping = idle & ~picking_up & has_product & slot_free & (items == ItemCodes.EMPTY)
+        building = idle & ~picking_up & ~dropping & (component_counts == self._num_required_items)
+        finished_moving = (
+            ((states == WorkerStateCode.PICKING_UP) | (states == WorkerStateCode.DROPPING)) & not_operating
+        )
+        finished_building = (states == WorkerStateCode.BUILDING) & not_operating
+
+        states[picking_up] = WorkerStateCode.PICKING_UP
+        remaining_times[picking_up] = self._operation_times.PICKING_UP
+        components[picking_up] |= item_bits[picking_up]
+        component_counts[picking_up] += 1
+
+        states[dropping] = WorkerStateCode.DROPPING
+        remaining_times[dropping] = self._operation_times.DROPPING
+        component_counts[dropping] = 0
+        has_product[dropping] = False
+
+        states[building] = WorkerStateCode.BUILDING
+        remaining_times[building] = self._operation_times.BUILDING
+
+        states[finished_moving | finished_building] = WorkerStateCode.IDLE
+        components[finished_building] = 0
+        component_counts[finished_building] = 1
+        has_product[finished_building] = True
+
+        if picking_up.any() or dropping.any():
+            items = np.where(picking_up, ItemCodes.EMPTY, np.where(dropping, ItemCodes.PRODUCT, items))
+            self.belt[..., slot_indices] = items
+        self.slot_busy |= picking_up | dropping
+        self.slot_busy &= ~finished_moving
+
+
+class VectorizedFactoryFloor(BaseModel):
+    """
+    Drop in alternative to FactoryFloor for large floors. Workers are not separate objects - their state lives in
+    FloorArrays and all workers of a tick are stepped with a handful of array operations.
+
+    For the same feed input the receiver gets exactly the same items as with FactoryFloor.
+    """
+    def __init__(self,
+                 config: FactoryFloorConfig = None,
+                 feeder: Feeder = None,
+                 receiver: Receiver = None,
+                 operation_times: Type[WorkerOperationTimes] = WorkerOperationTimes,
+                 ):
+        self.config = config if config else FactoryFloorConfig()
+        self.feeder = feeder if feeder else Feeder()
+        self.receiver = receiver if receiver else Receiver(config=self.config)
+        self.num_pairs = self.config.num_pairs or self.config.conveyor_belt_slots
+        if self.num_pairs > self.config.conveyor_belt_slots:
+            raise FactoryConfigError(WRONG_FACTORY_CONFIG)
+        self.time = 0
+        self.item_codes = ItemCodes(self.config)
+        self.arrays = FloorArrays(
+            config=self.config,
+            item_codes=self.item_codes,
+            num_pairs=self.num_pairs,
+            operation_times=operation_times,
+        )
+
+    @property
+    def belt_items(self) -> List[Any]:
+        """
+        Returns items on the belt in slot order.
+        """
+        slot_indices = (self.arrays.head + np.arange(self.arrays.num_slots)) % self.arrays.num_slots
+        return [self.item_codes.decode(code) for code in self.arrays.belt[slot_indices].tolist()]
+
+    def run(self):
+        """
+        Main event loop.
+        """
+        for step in range(self.config.num_steps):
+            self.receiver.receive(self.item_codes.decode(int(self.arrays.belt[self.arrays.last_slot_index])))
+
+            try:
+                new_item = self.item_codes.encode(self.feeder.feed())
+            except StopIteration:
+                raise FactoryConfigError(INSUFFICIENT_FEED_INPUT)
+
+            self.arrays.move_belt(new_item)
+            self.arrays.work()
+            self.time += 1
@@ -9,3 +9,35 @@ class FactoryConfigError(ConfigError):
 
 class FeederConfigError(ConfigError):
     pass
+
+
+class QueueError(Exception):
+    def __init__(self, msg, *args):
+        super().__init__(msg, *args)
+
+
+class QueueEmptyError(QueueError, IndexError):
+    pass
+
+
+class QueueFullError(QueueError):
+    pass
+
+
+class ReceiverConfigError(ConfigError):
+    pass
+
+
+class TraceError(Exception):
+    def __init__(self, msg, *args):
+        super().__init__(msg, *args)
+
+
+class CheckpointError(Exception):
+    def __init__(self, msg, *args):
+        super().__init__(msg, *args)
+
+
+class PipelineError(Exception):
+    def __init__(self, msg, *args):
+        super().__init__(msg, *args)
@@ -8,3 +8,40 @@ INSUFFICIENT_FEED_INPUT = (
 WRONG_FACTORY_CONFIG = 'Improperly configured FactoryFloor - num_pairs cannot exceed num_slots.'
 
 INVALID_SLOT_NUMBER = "Slot number exceeding conveyor belt's maximum number of slots."
+
+EMPTY_QUEUE = 'Unable to dequeue from an empty queue.'
+FULL_QUEUE = 'Unable to enqueue - the queue is full (max_size={max_size}).'
+INVALID_QUEUE_POSITION = 'Position {position} out of range for a queue of size {size}.'
+INVALID_OVERFLOW_POLICY = 'Unknown overflow policy: {overflow_policy}.'
+INVALID_MAX_SIZE = 'Max size of a queue must be at least 1, got {max_size}.'
+TOO_MANY_REQUIRED_ITEMS = 'Array based engines support at most {max_items} distinct required items.'
+NOT_ENOUGH_SAMPLES = 'At least 2 samples are required to estimate a confidence interval, got {num_samples}.'
+NOT_ENOUGH_REPLICAS = 'At least 2 replicas are required to estimate a confidence interval, got {num_replicas}.'
+UNKNOWN_FEED_PERIOD = 'Fast forward requires a periodic feed. Please use a Feeder with repeat=True.'
+RECEIVED_ITEMS_NOT_KEPT = 'Received items are not kept. Please create the Receiver with keep_items=True.'
+INVALID_FEED_WEIGHTS = (
+    'Got {num_weights} weights for {num_components} components. Please supply one weight per component.'
+)
+INVALID_FEED_WEIGHT_VALUES = 'Weights must be finite and non-negative with a positive sum, got {weights}.'
+INVALID_BLOCK_SIZE = 'Block size of a feeder must be at least 1, got {block_size}.'
+INVALID_TRACE_FILE = 'File {path} is not a factory floor trace or the recorder writing it was not closed.'
+TICK_NOT_IN_TRACE = 'Tick {tick} is not recorded in the trace.'
+INVALID_TRACE_VERSION = 'Unsupported trace version {version}, expected version {expected}.'
+TRACE_VALUE_OUT_OF_RANGE = 'Unable to record the floor, a value does not fit in the trace: {error}.'
+INVALID_CHECKPOINT_VERSION = 'Unsupported checkpoint version {version}, expected version {expected}.'
+CHECKPOINT_CONFIG_MISMATCH = 'Checkpoint {path} was saved by a floor with a different config.'
+INVALID_TICK_MODE = 'Unknown tick mode: {tick_mode}.'
+INVALID_CONFLICT_POLICY = 'Unknown conflict policy: {conflict_policy}.'
+EVENT_DRIVEN_TWO_PHASE = 'Event driven runs support only the sequential tick mode.'
+FAST_FORWARD_UTILIZATION = 'Utilization can not be tracked in runs with fast_forward.'
+INVALID_NUM_SEGMENTS = 'Number of segments must be between 1 and the number of slots ({num_slots}), got {num_segments}.'
+SEGMENT_FAILED = 'Segment {segment} of the pipeline stopped with exit code {exit_code}.'
+FEEDING_STOPPED = 'The thread feeding the pipeline stopped before feeding every tick.'
+PIPELINE_FAILED = (
+    'A run of the pipeline failed at time {time}, so its belt no longer matches time and the receiver. Please create a'
+    ' new PipelineFactoryFloor.'
+)
+NOT_ENOUGH_BATCHES = (
+    'Unable to split {num_observations} observations into {num_batches} batches. At least 2 non-empty batches are'
+    ' required.'
+)
@@ -0,0 +1,53 @@
+from typing import Callable, Dict, Mapping, NamedTuple
+
+from src.domain_models.factory_floor import FactoryFloor
+
+
+class BranchResult(NamedTuple):
+    name: str
+    time: int
+    products: int
+    products_per_tick: float
+
+
+def run_branches(
+        factory_floor: FactoryFloor,
+        branches: Mapping[str, Callable[[FactoryFloor], FactoryFloor]],
+        num_steps: int,
+) -> Dict[str, BranchResult]:
+    """
+    Creates every branch from factory_floor and advances all of them num_steps ticks in lockstep.
+
+    Parameters
+    ----------
+    factory_floor
+        Warmed-up floor all branches start from.
+    branches
+        Maps name of a branch to a function creating it from factory_floor. It should call factory_floor.fork() and
+        may change the fork, e.g. remove a worker, so that factory_floor itself is left untouched.
+    num_steps
+        Number of ticks every branch runs for.
+
+    Returns
+    -------
+        Results of branches by name. Products are counted from the start of factory_floor, products_per_tick is the
+        average over the ticks run by the branch.
+    """
+    forks = {name: make_branch(factory_floor) for name, make_branch in branches.items()}
+
+    for step in range(num_steps):
+        for fork in forks.values():
+            fork.tick()
+
+    products_before = factory_floor.receiver.statistics.products
+    return {
+        name: BranchResult(
+            name=name,
+            time=fork.time,
+            products=fork.receiver.statistics.products,
+            products_per_tick=(
+                (fork.receiver.statistics.products - products_before) / num_steps if num_steps else 0.0
+            ),
+        )
+        for name, fork in forks.items()
+    }
@@ -0,0 +1,266 @@
+import functools
+import operator
+from typing import Any, Dict, Hashable, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from src.domain_models.factory_floor import FactoryFloor
+from src.domain_models.feeder import Feeder
+from src.domain_models.worker import CompiledWorker
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig
+
+
+class EstimationMethod:
+    MARKOV_CHAIN = 'markov_chain'
+    SIMULATION = 'simulation'
+
+
+class ThroughputEstimate(NamedTuple):
+    products_per_tick: float
+    method: str
+    num_states: int
+    # False if power iteration ran out of iterations before the distribution settled to the tolerance.
+    converged: bool = True
+
+
+class _StateSpaceTooLarge(Exception):
+    pass
+
+
+class _SlotModel:
+    """
+    Transitions of a single slot and its pair of workers, computed by loading them into a one slot FactoryFloor and
+    making the workers work once.
+
+    Workers only ever touch their own slot, so a tick of the floor is the tick of every slot applied to the item which
+    arrives at it: the new item at slot 0 and the item the previous slot held at every other slot. The floor uses
+    CompiledWorker, which reports components in the order of config.required_items, so states which differ only in
+    the order components were picked up in are the same state.
+
+    Every local state reachable from the initial one is enumerated up front and indexed, so transitions are table
+    lookups: next_states[item, state], items_left[item, state] and drops[item, state].
+    """
+    def __init__(self, config: FactoryFloorConfig, components: Sequence):
+        self.items = list(dict.fromkeys([config.empty_code, config.product_code] + list(components)))
+        self._floor = FactoryFloor(
+            config=FactoryFloorConfig(
+                required_items=list(config.required_items),
+                product_code=config.product_code,
+                empty_code=config.empty_code,
+                conveyor_belt_slots=1,
+                num_pairs=1,
+            ),
+            feeder=Feeder(feed_input=[None]),
+            worker_class=CompiledWorker,
+        )
+        initial_state = self._state()
+        states: Dict[Hashable, int] = {initial_state: 0}
+        unexplored: List[Hashable] = [initial_state]
+        transitions: Dict[Tuple[int, int], Tuple[int, int, int]] = {}
+        item_indices = {item: index for index, item in enumerate(self.items)}
+        while unexplored:
+            state = unexplored.pop()
+            for item_index, item in enumerate(self.items):
+                next_state, item_left, dropped_products = self._step(state, item)
+                if next_state not in states:
+                    states[next_state] = len(states)
+                    unexplored.append(next_state)
+                transitions[item_index, states[state]] = (
+                    states[next_state], item_indices[item_left], dropped_products
+                )
+
+        shape = (len(self.items), len(states))
+        self.next_states = np.zeros(shape, dtype=np.int64)
+        self.items_left = np.zeros(shape, dtype=np.int64)
+        self.drops = np.zeros(shape, dtype=np.int64)
+        for index, (next_state, item_left, dropped_products) in transitions.items():
+            self.next_states[index] = next_state
+            self.items_left[index] = item_left
+            self.drops[index] = dropped_products
+
+    @property
+    def num_states(self) -> int:
+        return self.next_states.shape[1]
+
+    def _step(self, state: Hashable, item) -> Tuple[Hashable, Any, int]:
+        """
+        Returns state after the workers worked with item at the slot, item left at the slot and number of products
+        dropped.
+        """
+        slot_state, worker_snapshots = state
+        conveyor_belt = self._floor.conveyor_belt
+        conveyor_belt.restore(((item,), (slot_state,)))
+        for worker, worker_snapshot in zip(self._floor.workers, worker_snapshots):
+            worker.restore(worker_snapshot)
+        drops_before = self._floor.operation_counts.drops
+        for worker in self._floor.workers:
+            worker.work()
+        return self._state(), conveyor_belt.check_item_at_slot(0), self._floor.operation_counts.drops - drops_before
+
+    def _state(self) -> Hashable:
+        _, slot_states = self._floor.conveyor_belt.snapshot()
+        return slot_states[0], tuple(worker.snapshot() for worker in self._floor.workers)
+
+
+def estimate_throughput(
+        config: FactoryFloorConfig = None,
+        components: Sequence = ('A', 'B'),
+        weights: Sequence[float] = None,
+        max_states: int = 200000,
+        simulation_steps: int = 100000,
+        tolerance: float = 1e-12,
+        seed: int = None,
+        max_iterations: int = 1000000,
+) -> ThroughputEstimate:
+    """
+    Estimates long run products per tick of a floor fed at random from components, the same as the default Feeder.
+
+    The floor is a finite Markov chain. Its states reachable from the initial, empty floor are enumerated and the
+    limiting distribution is found by power iteration. If there are more than max_states reachable states the
+    estimate falls back to simulating simulation_steps ticks of a FactoryFloor.
+
+    Parameters
+    ----------
+    config
+        Configuration of the floor, num_steps is ignored.
+    components
+        Items supplied by the feeder.
+    weights
+        Relative probabilities of components, equal by default.
+    max_states
+        Largest state space solved analytically.
+    simulation_steps
+        Number of ticks simulated by the fallback.
+    tolerance
+        Power iteration stops once the distribution changes by less than tolerance (L1 norm) in an iteration.
+    seed
+        Seed of the random feed used by the fallback.
+    max_iterations
+        Largest number of power iterations. If the tolerance is not reached by then the estimate is returned with
+        converged=False.
+    """
+    config = config if config else FactoryFloorConfig()
+    try:
+        num_states, transitions = _build_state_space(config, components, weights, max_states)
+    except _StateSpaceTooLarge:
+        return _simulate(config, components, weights, simulation_steps, seed)
+
+    distribution, converged = _limiting_distribution(num_states, transitions, tolerance, max_iterations)
+    sources, _, probabilities, products = transitions
+    products_per_tick = float(np.sum(distribution[sources] * probabilities * products))
+    return ThroughputEstimate(
+        products_per_tick=products_per_tick,
+        method=EstimationMethod.MARKOV_CHAIN,
+        num_states=num_states,
+        converged=converged,
+    )
+
+
+def _build_state_space(config: FactoryFloorConfig, components: Sequence, weights: Sequence[float], max_states: int):
+    """
+    Enumerates states reachable from the initial, empty floor breadth first, a whole level at a time.
+
+    Slots without workers only carry items towards the receiver, so they are left out of the state. A state is the
+    local state of every slot with workers and the items left at all of them but the last one - the item at the last
+    slot leaves the belt before any worker sees it again. In the steady state every product dropped on the belt
+    reaches the receiver, so products per tick equal drops per tick.
+
+    States are rows of item and local state indices, identified by a single integer key.
+    """
+    num_slots = config.num_pairs or config.conveyor_belt_slots
+    slot_model = _SlotModel(config, components)
+    weights = weights if weights is not None else [1] * len(components)
+    feed = [
+        (slot_model.items.index(component), weight / sum(weights))
+        for component, weight in zip(components, weights) if weight
+    ]
+    radixes = [len(slot_model.items)] * (num_slots - 1) + [slot_model.num_states] * num_slots
+    if functools.reduce(operator.mul, radixes, 1) > np.iinfo(np.int64).max:
+        raise _StateSpaceTooLarge
+    place_values = np.array([functools.reduce(operator.mul, radixes[index + 1:], 1) for index in range(len(radixes))])
+
+    frontier = np.array([[slot_model.items.index(config.empty_code)] * (num_slots - 1) + [0] * num_slots])
+    frontier_ids = np.zeros(1, dtype=np.int64)
+    keys_by_id = [frontier @ place_values]
+    known_keys = keys_by_id[0]
+    num_states = 1
+    sources, target_keys, probabilities, products = [], [], [], []
+
+    while len(frontier):
+        next_rows, next_keys = [], []
+        for item_index, probability in feed:
+            arriving_items = np.column_stack([np.full(len(frontier), item_index), frontier[:, :num_slots - 1]])
+            local_states = frontier[:, num_slots - 1:]
+            rows = np.column_stack([
+                slot_model.items_left[arriving_items[:, :-1], local_states[:, :-1]],
+                slot_model.next_states[arriving_items, local_states],
+            ])
+            keys = rows @ place_values
+            sources.append(frontier_ids)
+            target_keys.append(keys)
+            probabilities.append(np.full(len(frontier), probability))
+            products.append(slot_model.drops[arriving_items, local_states].sum(axis=1))
+            next_rows.append(rows)
+            next_keys.append(keys)
+
+        unique_keys, first_indices = np.unique(np.concatenate(next_keys), return_index=True)
+        is_new = ~np.isin(unique_keys, known_keys, assume_unique=True)
+        if num_states + np.count_nonzero(is_new) > max_states:
+            raise _StateSpaceTooLarge
+        frontier = np.concatenate(next_rows)[first_indices[is_new]]
+        frontier_ids = np.arange(num_states, num_states + len(frontier))
+        num_states += len(frontier)
+        keys_by_id.append(unique_keys[is_new])
+        known_keys = np.sort(np.concatenate([known_keys, unique_keys[is_new]]))
+
+    keys_by_id = np.concatenate(keys_by_id)
+    ids_by_key = np.argsort(keys_by_id)
+    target_keys = np.concatenate(target_keys)
+    transitions = (
+        np.concatenate(sources),
+        ids_by_key[np.searchsorted(keys_by_id, target_keys, sorter=ids_by_key)],
+        np.concatenate(probabilities),
+        np.concatenate(products).astype(np.float64),
+    )
+    return num_states, transitions
+
+
+def _limiting_distribution(
+        num_states: int, transitions, tolerance: float, max_iterations: int
+) -> Tuple[np.ndarray, bool]:
+    """
+    Power iteration of the lazy chain (stay put with probability 1/2) started from the initial state. The lazy chain
+    has the same limiting distribution but is aperiodic, so the iteration converges even for periodic floors.
+
+    Returns the distribution and whether it changed by less than tolerance in the last of max_iterations.
+    """
+    sources, targets, probabilities, _ = transitions
+    distribution = np.zeros(num_states)
+    distribution[0] = 1.0
+    for _ in range(max_iterations):
+        moved = np.bincount(targets, weights=distribution[sources] * probabilities, minlength=num_states)
+        next_distribution = (distribution + moved) / 2
+        if np.abs(next_distribution - distribution).sum() < tolerance:
+            return next_distribution, True
+        distribution = next_distribution
+    return distribution, False
+
+
+def _simulate(
+        config: FactoryFloorConfig, components: Sequence, weights: Sequence[float], simulation_steps: int, seed: int
+) -> ThroughputEstimate:
+    simulation_config = FactoryFloorConfig(
+        required_items=list(config.required_items),
+        product_code=config.product_code,
+        num_steps=simulation_steps,
+        empty_code=config.empty_code,
+        conveyor_belt_slots=config.conveyor_belt_slots,
+        num_pairs=config.num_pairs,
+    )
+    feeder = Feeder(components=tuple(components), seed=seed, weights=weights)
+    factory_floor = FactoryFloor(config=simulation_config, feeder=feeder)
+    factory_floor.run()
+    products = factory_floor.receiver.statistics.products
+    return ThroughputEstimate(
+        products_per_tick=products / simulation_steps, method=EstimationMethod.SIMULATION, num_states=0
+    )
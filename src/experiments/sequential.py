@@ -0,0 +1,108 @@
+from typing import List, NamedTuple, Optional
+
+from src.domain_models.factory_floor import FactoryFloor
+from src.helpers.statistics import ConfidenceInterval, batch_means_confidence_interval, mser_truncation
+
+
+class SequentialEstimate(NamedTuple):
+    products_per_tick: float
+    confidence_interval: Optional[ConfidenceInterval]
+    warm_up_steps: int
+    num_steps: int
+    converged: bool
+
+
+def estimate_products_per_tick(
+        factory_floor: FactoryFloor,
+        relative_precision: float = 0.05,
+        confidence: float = 0.95,
+        num_batches: int = 20,
+        check_every: int = 1000,
+        max_steps: int = 1000000,
+        block_size: int = 5,
+) -> SequentialEstimate:
+    """
+    Runs factory_floor only until its long run products per tick is known to relative_precision, instead of for a
+    fixed, generously large number of ticks.
+
+    A new floor starts with a belt of empty slots and the receiver gets nothing else until they have all passed it, so
+    those ticks are always dropped. After them products received are counted in blocks of block_size ticks. Every
+    check_every ticks the rest of the warm up transient is found with the MSER rule on the block counts and dropped,
+    and a batch means confidence interval (Student's t with num_batches - 1 degrees of freedom, as the few batch means
+    make the normal interval too narrow) is computed from the remaining blocks. The run stops as soon as the half
+    width of the interval relative to its mean is at most relative_precision, or after max_steps ticks.
+
+    Parameters
+    ----------
+    factory_floor
+        Floor to run, config.num_steps is ignored.
+    relative_precision
+        Target half width of the confidence interval relative to the estimate, i.e. 0.05 for +-5%.
+    confidence
+        Confidence level of the interval.
+    num_batches
+        Number of batches the series after the warm up is split into.
+    check_every
+        Number of ticks between checks of the stopping rule.
+    max_steps
+        Largest number of ticks to run.
+    block_size
+        Number of ticks per block, 5 makes the truncation rule MSER-5.
+    """
+    product_code = factory_floor.config.product_code
+    initial_belt_steps = max(factory_floor.conveyor_belt.config.conveyor_belt_slots - factory_floor.time, 0)
+    block_products: List[int] = []
+    products = 0
+    num_steps = 0
+    estimate = SequentialEstimate(
+        products_per_tick=0.0, confidence_interval=None, warm_up_steps=0, num_steps=0, converged=False
+    )
+    for step_event in factory_floor.iter_steps(max_steps):
+        num_steps += 1
+        if num_steps <= initial_belt_steps:
+            continue
+        products += step_event.delivered_item == product_code
+        if (num_steps - initial_belt_steps) % block_size == 0:
+            block_products.append(products)
+            products = 0
+        if num_steps % check_every == 0 or num_steps == max_steps:
+            estimate = _estimate(block_products, block_size, num_batches, confidence, num_steps, initial_belt_steps)
+            if (
+                    estimate.confidence_interval is not None and
+                    estimate.confidence_interval.relative_half_width <= relative_precision
+            ):
+                return estimate._replace(converged=True)
+    return estimate
+
+
+def _estimate(
+        block_products: List[int],
+        block_size: int,
+        num_batches: int,
+        confidence: float,
+        num_steps: int,
+        initial_belt_steps: int,
+) -> SequentialEstimate:
+    """
+    Returns the estimate from the blocks after the warm up. There is no interval while the truncation point is still
+    at the limit of the MSER search or there are fewer blocks left than batches.
+    """
+    num_warm_up_blocks = mser_truncation(block_products)
+    steady_blocks = block_products[num_warm_up_blocks:]
+    confidence_interval = None
+    if num_warm_up_blocks < len(block_products) // 2 and len(steady_blocks) >= num_batches:
+        interval = batch_means_confidence_interval(steady_blocks, num_batches=num_batches, confidence=confidence)
+        confidence_interval = ConfidenceInterval(
+            mean=interval.mean / block_size, half_width=interval.half_width / block_size, confidence=confidence
+        )
+    if confidence_interval is not None:
+        products_per_tick = confidence_interval.mean
+    else:
+        products_per_tick = sum(steady_blocks) / (len(steady_blocks) * block_size) if steady_blocks else 0.0
+    return SequentialEstimate(
+        products_per_tick=products_per_tick,
+        confidence_interval=confidence_interval,
+        warm_up_steps=initial_belt_steps + num_warm_up_blocks * block_size,
+        num_steps=num_steps,
+        converged=False,
+    )
@@ -0,0 +1,235 @@
+import argparse
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from typing import Iterable, Iterator, NamedTuple, Sequence, Set, Tuple
+
+from src.domain_models.factory_floor import FactoryFloor
+from src.domain_models.feeder import Feeder
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig
+
+
+class SweepPoint(NamedTuple):
+    conveyor_belt_slots: int
+    num_pairs: int
+    num_steps: int
+    required_items: Tuple[str, ...]
+
+    def to_config(self) -> FactoryFloorConfig:
+        return FactoryFloorConfig(
+            required_items=list(self.required_items),
+            num_steps=self.num_steps,
+            conveyor_belt_slots=self.conveyor_belt_slots,
+            num_pairs=self.num_pairs,
+        )
+
+
+class SweepResult(NamedTuple):
+    point: SweepPoint
+    seed: int
+    products: int
+    products_per_tick: float
+    elapsed_seconds: float
+
+    def to_json(self) -> str:
+        record = dict(self.point._asdict(), required_items=list(self.point.required_items))
+        record.update(
+            seed=self.seed,
+            products=self.products,
+            products_per_tick=self.products_per_tick,
+            elapsed_seconds=self.elapsed_seconds,
+        )
+        return json.dumps(record)
+
+    @classmethod
+    def from_json(cls, line: str) -> 'SweepResult':
+        record = json.loads(line)
+        point = SweepPoint(
+            conveyor_belt_slots=record['conveyor_belt_slots'],
+            num_pairs=record['num_pairs'],
+            num_steps=record['num_steps'],
+            required_items=tuple(record['required_items']),
+        )
+        return cls(
+            point=point,
+            seed=record['seed'],
+            products=record['products'],
+            products_per_tick=record['products_per_tick'],
+            elapsed_seconds=record['elapsed_seconds'],
+        )
+
+
+def grid(
+        conveyor_belt_slots: Iterable[int],
+        num_pairs: Iterable[int],
+        num_steps: Iterable[int],
+        required_items: Iterable[Sequence[str]],
+) -> Iterator[SweepPoint]:
+    """
+    Yields every combination of the given values. Combinations with more pairs than slots are skipped as
+    FactoryFloor would reject them.
+    """
+    combinations = itertools.product(conveyor_belt_slots, num_pairs, num_steps, required_items)
+    for slots, pairs, steps, items in combinations:
+        if pairs <= slots:
+            yield SweepPoint(
+                conveyor_belt_slots=slots, num_pairs=pairs, num_steps=steps, required_items=tuple(items)
+            )
+
+
+def point_seed(base_seed: int, point: SweepPoint) -> int:
+    """
+    Returns seed for a grid point. It depends only on base_seed and the point itself, so it does not change with
+    the order in which points run or with the number of processes.
+    """
+    digest = hashlib.sha256(repr((base_seed, tuple(point))).encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def run_point(point: SweepPoint, base_seed: int = 0, components: Sequence = None) -> SweepResult:
+    """
+    Simulates a single grid point with a random feed over components. By default components are the required
+    items of the point plus the empty code.
+    """
+    config = point.to_config()
+    seed = point_seed(base_seed, point)
+    components = tuple(components) if components else tuple(config.required_items) + (config.empty_code,)
+
+    start = time.perf_counter()
+    factory_floor = FactoryFloor(config=config, feeder=Feeder(components=components, seed=seed))
+    factory_floor.run()
+    products = factory_floor.receiver.statistics.products
+
+    return SweepResult(
+        point=point,
+        seed=seed,
+        products=products,
+        products_per_tick=products / config.num_steps,
+        elapsed_seconds=time.perf_counter() - start,
+    )
+
+
+def load_results(results_path: str) -> Iterator[SweepResult]:
+    """
+    Yields results stored in a results file. A trailing line cut short by a killed sweep is ignored.
+    """
+    if not os.path.exists(results_path):
+        return
+    with open(results_path) as results_file:
+        for line in results_file:
+            try:
+                yield SweepResult.from_json(line)
+            except (ValueError, KeyError):
+                continue
+
+
+def sweep(
+        points: Iterable[SweepPoint],
+        base_seed: int = 0,
+        components: Sequence = None,
+        processes: int = None,
+        results_path: str = None,
+) -> Iterator[SweepResult]:
+    """
+    Runs grid points in a process pool and yields results in order of completion. Every point gets its own
+    deterministic seed. When results_path is given each result is appended to it as soon as it arrives, so a sweep
+    which got killed can be resumed by calling sweep again with the same points and results_path.
+
+    Parameters
+    ----------
+    points
+        Grid points to simulate, i.e. from grid().
+    base_seed
+        Seed from which the seed of every point is derived.
+    components
+        Components supplied by the feeder, see run_point.
+    processes
+        Size of the process pool, defaults to the number of CPUs.
+    results_path
+        JSON lines file to which every result is appended as it arrives. Points already present in the file are not
+        simulated again.
+    """
+    done: Set[SweepPoint] = set()
+    if results_path:
+        done = {result.point for result in load_results(results_path)}
+    pending_points = [point for point in points if point not in done]
+    if not pending_points:
+        return
+
+    task = functools.partial(run_point, base_seed=base_seed, components=components)
+    results_file = _open_results_file(results_path) if results_path else None
+    try:
+        with multiprocessing.Pool(processes=processes) as pool:
+            for result in pool.imap_unordered(task, pending_points):
+                if results_file:
+                    results_file.write(result.to_json() + '\n')
+                    results_file.flush()
+                yield result
+    finally:
+        if results_file:
+            results_file.close()
+
+
+def _open_results_file(results_path: str):
+    """
+    Opens results file for appending. A line cut short by a killed sweep is terminated so that it does not swallow
+    the first new result.
+    """
+    results_file = open(results_path, 'a+')
+    if results_file.tell():
+        results_file.seek(results_file.tell() - 1)
+        if results_file.read(1) != '\n':
+            results_file.write('\n')
+    return results_file
+
+
+def parse_arguments(arguments: Sequence[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            'Sweep FactoryFloorConfig parameters over a process pool. Run again with the same arguments and results '
+            'file to resume a killed sweep.'
+        ),
+        epilog=(
+            'example: python -m src.experiments.sweep --conveyor-belt-slots 3 10 --num-pairs 1 2 3 '
+            '--num-steps 1000 --required-items A,B A,B,C --results sweep.jsonl'
+        ),
+    )
+    parser.add_argument('--conveyor-belt-slots', type=int, nargs='+', required=True)
+    parser.add_argument('--num-pairs', type=int, nargs='+', required=True)
+    parser.add_argument('--num-steps', type=int, nargs='+', required=True)
+    parser.add_argument(
+        '--required-items', nargs='+', default=['A,B'], help='Comma separated required items, i.e. A,B A,B,C'
+    )
+    parser.add_argument('--components', help='Comma separated components supplied by the feeder.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--results', help='JSON lines results file, also used to resume a killed sweep.')
+    return parser.parse_args(arguments)
+
+
+def main(arguments: Sequence[str] = None):
+    options = parse_arguments(arguments)
+    points = grid(
+        conveyor_belt_slots=options.conveyor_belt_slots,
+        num_pairs=options.num_pairs,
+        num_steps=options.num_steps,
+        required_items=[items.split(',') for items in options.required_items],
+    )
+    components = options.components.split(',') if options.components else None
+    results = sweep(
+        points,
+        base_seed=options.seed,
+        components=components,
+        processes=options.processes,
+        results_path=options.results,
+    )
+    for result in results:
+        print(result.to_json(), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
-from typing import List
+import copy
+from typing import Any, Dict, List, Optional
 
 
 class FactoryFloorConfig:
+    """
+    With intern_items=True the factory floor works with items interned as small integers, see interned().
+    """
     def __init__(
             self,
             required_items: List[str] = None,
@@ -9,7 +13,8 @@ class FactoryFloorConfig:
             num_steps: int = None,
             empty_code: str = None,
             conveyor_belt_slots: int = None,
-            num_pairs: int = None
+            num_pairs: int = None,
+            intern_items: bool = False,
     ):
         self.required_items = required_items or ['A', 'B']
         self.product_code = product_code or 'P'
@@ -17,3 +22,47 @@ class FactoryFloorConfig:
         self.empty_code = empty_code or 'E'
         self.conveyor_belt_slots = conveyor_belt_slots or 3
         self.num_pairs = num_pairs or 3
+        self.intern_items = intern_items
+        self.item_codes: Optional[ItemCodes] = None
+        self._interned: Optional[FactoryFloorConfig] = None
+
+    def interned(self) -> 'FactoryFloorConfig':
+        """
+        Returns a copy of the config in which the empty code, the product code and the required items are replaced by
+        their codes in item_codes, so that belt and workers compare small integers. The copy is created on first use
+        and shared afterwards, so everything built from it agrees on the codes.
+        """
+        if self._interned is None:
+            item_codes = ItemCodes(self)
+            interned = copy.copy(self)
+            interned.required_items = [item_codes.encode(item) for item in self.required_items]
+            interned.product_code = item_codes.encode(self.product_code)
+            interned.empty_code = item_codes.encode(self.empty_code)
+            interned.item_codes = item_codes
+            self._interned = interned
+        return self._interned
+
+
+class ItemCodes:
+    """
+    Maps items to small integers so they can be stored in arrays. The empty code, the product code and the required
+    items are registered up front, any other item gets the next free code the first time it is seen.
+    """
+    EMPTY = 0
+    PRODUCT = 1
+
+    def __init__(self, config: FactoryFloorConfig):
+        self._codes: Dict[Any, int] = {}
+        self._items: List[Any] = []
+        for item in [config.empty_code, config.product_code] + list(config.required_items):
+            self.encode(item)
+
+    def encode(self, item) -> int:
+        code = self._codes.get(item)
+        if code is None:
+            code = self._codes[item] = len(self._items)
+            self._items.append(item)
+        return code
+
+    def decode(self, code: int) -> Any:
+        return self._items[code]
@@ -1,10 +1,31 @@
-from typing import List, Any
+from typing import List, Any, Tuple
+
+from src.exceptions.exceptions import QueueEmptyError, QueueFullError
+from src.exceptions.messages import (
+    EMPTY_QUEUE, FULL_QUEUE, INVALID_QUEUE_POSITION, INVALID_OVERFLOW_POLICY, INVALID_MAX_SIZE,
+)
+
+
+class OverflowPolicy:
+    RAISE = 'raise'
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
 
 
 class Queue:
+    """
+    First in first out queue backed by a ring buffer.
+
+    New items are inserted at the beginning of the queue (position 0) and leave it from the end (position size - 1).
+    Enqueue, dequeue and access by position are O(1). When the buffer fills up its capacity is doubled.
+    """
+    INITIAL_CAPACITY = 8
 
-    def __init__(self):
-        self._items = []
+    def __init__(self, capacity: int = None):
+        self._capacity = max(self.INITIAL_CAPACITY if capacity is None else capacity, 1)
+        self._buffer: List[Any] = [None] * self._capacity
+        self._head = 0
+        self._size = 0
 
     def enqueue(self, item):
         """
@@ -15,35 +36,203 @@ class Queue:
         item
             Item to insert.
         """
-        self._items.insert(0, item)
+        if self._size == self._capacity:
+            self._grow()
+        self._push_front(item)
 
     def dequeue(self):
         """
         Returns last item in the queue.
         """
-        return self._items.pop()
+        if self._size == 0:
+            raise QueueEmptyError(EMPTY_QUEUE)
+        index = (self._head + self._size - 1) % self._capacity
+        item = self._buffer[index]
+        self._buffer[index] = None
+        self._size -= 1
+        return item
+
+    def clear(self):
+        """
+        Removes all items from the queue.
+        """
+        self._buffer = [None] * self._capacity
+        self._head = 0
+        self._size = 0
 
     @property
     def is_empty(self) -> bool:
         """
         Returns true if queue is empty, false otherwise.
         """
-        return len(self._items) == 0
+        return self._size == 0
 
     @property
     def size(self) -> int:
         """
         Returns number of items in the queue.
         """
-        return len(self._items)
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """
+        Returns number of items the queue can hold before it has to grow (or overflow for MaxSizeQueue).
+        """
+        return self._capacity
 
     @property
     def items(self) -> List[Any]:
         """
-        Returns contents of the queue as a list.
+        Returns contents of the queue as a list, starting with the most recently enqueued item.
+        This is a copy - modifying it does not change the queue.
         """
-        return self._items
+        end = self._head + self._size
+        if end <= self._capacity:
+            return self._buffer[self._head:end]
+        return self._buffer[self._head:] + self._buffer[:end - self._capacity]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, position: int) -> Any:
+        """
+        Returns item at position counted from the beginning of the queue. Negative positions count from the end.
+        """
+        return self._buffer[self._index(position)]
+
+    def __setitem__(self, position: int, item):
+        """
+        Replaces item at position counted from the beginning of the queue. Negative positions count from the end.
+        """
+        self._buffer[self._index(position)] = item
+
+    def _index(self, position: int) -> int:
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError(INVALID_QUEUE_POSITION.format(position=position, size=self._size))
+        return (self._head + position) % self._capacity
+
+    def _push_front(self, item):
+        self._head = (self._head - 1) % self._capacity
+        self._buffer[self._head] = item
+        self._size += 1
+
+    def _grow(self):
+        items = self.items
+        self._capacity *= 2
+        self._buffer = items + [None] * (self._capacity - len(items))
+        self._head = 0
 
 
 class MaxSizeQueue(Queue):
-    pass
+    """
+    Queue with a fixed, preallocated capacity of max_size items.
+
+    What happens when an item is enqueued into a full queue is decided by the overflow_policy:
+        - OverflowPolicy.RAISE: QueueFullError is raised and the queue is left unchanged.
+        - OverflowPolicy.DROP_OLDEST: the last item is pushed out of the queue to make room for the new one.
+        - OverflowPolicy.DROP_NEWEST: the new item is discarded.
+    """
+    def __init__(self, max_size: int, overflow_policy: str = OverflowPolicy.RAISE):
+        if overflow_policy not in (OverflowPolicy.RAISE, OverflowPolicy.DROP_OLDEST, OverflowPolicy.DROP_NEWEST):
+            raise ValueError(INVALID_OVERFLOW_POLICY.format(overflow_policy=overflow_policy))
+        if max_size is None or max_size < 1:
+            raise ValueError(INVALID_MAX_SIZE.format(max_size=max_size))
+        super().__init__(capacity=max_size)
+        self._overflow_policy = overflow_policy
+
+    @property
+    def max_size(self) -> int:
+        return self._capacity
+
+    @property
+    def is_full(self) -> bool:
+        """
+        Returns true if queue holds max_size items, false otherwise.
+        """
+        return self._size == self._capacity
+
+    @property
+    def overflow_policy(self) -> str:
+        return self._overflow_policy
+
+    def enqueue(self, item) -> Any:
+        """
+        Inserts item at the beginning of the queue, applying the overflow policy if the queue is full.
+
+        Parameters
+        ----------
+        item
+            Item to insert.
+
+        Returns
+        -------
+            Item which did not fit in the queue (the oldest or the new one depending on the overflow policy) or None
+            if nothing overflowed.
+        """
+        if self._size < self._capacity:
+            self._push_front(item)
+            return None
+
+        if self._overflow_policy == OverflowPolicy.DROP_OLDEST:
+            dropped_item = self.dequeue()
+            self._push_front(item)
+            return dropped_item
+
+        if self._overflow_policy == OverflowPolicy.DROP_NEWEST:
+            return item
+
+        raise QueueFullError(FULL_QUEUE.format(max_size=self._capacity))
+
+
+class TimingWheel:
+    """
+    Holds items until the tick they are due at. Buckets are indexed by due tick modulo num_buckets, so scheduling and
+    collecting the items due at a tick cost O(1) per item when items are due less than num_buckets ticks ahead. Items
+    due further ahead wait in their bucket for the following rounds of the wheel.
+    """
+    def __init__(self, num_buckets: int = 64):
+        self._buckets: List[List[Tuple[int, Any]]] = [[] for _ in range(max(num_buckets, 1))]
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def schedule(self, item, due: int):
+        """
+        Adds item due at tick due.
+        """
+        self._buckets[due % len(self._buckets)].append((due, item))
+        self._size += 1
+
+    def pop_due(self, tick: int) -> List[Any]:
+        """
+        Removes and returns items due at tick in the order they were scheduled.
+        """
+        index = tick % len(self._buckets)
+        bucket = self._buckets[index]
+        if not bucket:
+            return []
+        due_items = [item for due, item in bucket if due == tick]
+        if len(due_items) < len(bucket):
+            self._buckets[index] = [(due, item) for due, item in bucket if due != tick]
+        else:
+            self._buckets[index] = []
+        self._size -= len(due_items)
+        return due_items
+
+    def items(self) -> List[Tuple[int, Any]]:
+        """
+        Returns all scheduled items with the ticks they are due at.
+        """
+        return [entry for bucket in self._buckets for entry in bucket]
+
+    def clear(self):
+        self._buckets = [[] for _ in self._buckets]
+        self._size = 0
@@ -17,6 +17,7 @@ class FeederFactory(factory.Factory):
 class ReceiverFactory(factory.Factory):
     class Meta:
         model = Receiver
+    keep_items = True
 
 
 class ConveyorBeltFactory(factory.Factory):
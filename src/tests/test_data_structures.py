@@ -1,4 +1,7 @@
-from src.helpers.data_structures import Queue
+import pytest
+
+from src.exceptions.exceptions import QueueEmptyError, QueueFullError
+from src.helpers.data_structures import Queue, MaxSizeQueue, OverflowPolicy, TimingWheel
 
 
 class TestQueue:
@@ -46,3 +49,136 @@ class TestQueue:
         queue.enqueue(3)
 
         assert queue.size == 3
+
+    def test_clear(self):
+        queue = Queue()
+        queue.enqueue(1)
+        queue.clear()
+        assert queue.is_empty
+        assert queue.items == []
+
+    def test_dequeue_from_empty_queue(self):
+        queue = Queue()
+
+        with pytest.raises(QueueEmptyError) as exception:
+            queue.dequeue()
+
+        assert exception.value.args == ('Unable to dequeue from an empty queue.',)
+
+    def test_grows_past_initial_capacity(self):
+        queue = Queue(capacity=2)
+        for i in range(5):
+            queue.enqueue(i)
+
+        assert queue.capacity == 8
+        assert queue.items == [4, 3, 2, 1, 0]
+        assert [queue.dequeue() for _ in range(5)] == [0, 1, 2, 3, 4]
+
+    def test_zero_capacity_is_not_default(self):
+        queue = Queue(capacity=0)
+        queue.enqueue(1)
+
+        assert queue.capacity == 1
+        assert queue.items == [1]
+
+    def test_wraps_around_buffer(self):
+        queue = Queue(capacity=3)
+        for i in range(10):
+            queue.enqueue(i)
+            if queue.size == 3:
+                queue.dequeue()
+
+        assert queue.capacity == 3
+        assert queue.items == [9, 8]
+
+    def test_get_and_set_item_by_position(self):
+        queue = Queue(capacity=3)
+        for i in range(4):
+            queue.enqueue(i)
+        queue.dequeue()
+
+        assert [queue[i] for i in range(3)] == [3, 2, 1]
+        assert queue[-1] == 1
+
+        queue[1] = 'X'
+        assert queue.items == [3, 'X', 1]
+
+    def test_position_out_of_range(self):
+        queue = Queue()
+        queue.enqueue(1)
+
+        with pytest.raises(IndexError) as exception:
+            queue[1]
+
+        assert exception.value.args == ('Position 1 out of range for a queue of size 1.',)
+
+
+class TestMaxSizeQueue:
+    def test_init(self):
+        queue = MaxSizeQueue(max_size=3)
+        assert queue.max_size == 3
+        assert queue.overflow_policy == OverflowPolicy.RAISE
+        assert queue.is_empty
+        assert not queue.is_full
+
+    def test_init_invalid_overflow_policy(self):
+        with pytest.raises(ValueError) as exception:
+            MaxSizeQueue(max_size=3, overflow_policy='grow')
+
+        assert exception.value.args == ('Unknown overflow policy: grow.',)
+
+    @pytest.mark.parametrize('max_size', [0, -1])
+    def test_init_invalid_max_size(self, max_size):
+        with pytest.raises(ValueError) as exception:
+            MaxSizeQueue(max_size=max_size)
+
+        assert exception.value.args == (f'Max size of a queue must be at least 1, got {max_size}.',)
+
+    def test_enqueue_when_full_raises(self):
+        queue = MaxSizeQueue(max_size=2)
+        queue.enqueue(1)
+        queue.enqueue(2)
+        assert queue.is_full
+
+        with pytest.raises(QueueFullError) as exception:
+            queue.enqueue(3)
+
+        assert exception.value.args == ('Unable to enqueue - the queue is full (max_size=2).',)
+        assert queue.items == [2, 1]
+
+    def test_enqueue_when_full_drops_oldest(self):
+        queue = MaxSizeQueue(max_size=2, overflow_policy=OverflowPolicy.DROP_OLDEST)
+        assert queue.enqueue(1) is None
+        assert queue.enqueue(2) is None
+        assert queue.enqueue(3) == 1
+        assert queue.items == [3, 2]
+        assert queue.capacity == 2
+
+    def test_enqueue_when_full_drops_newest(self):
+        queue = MaxSizeQueue(max_size=2, overflow_policy=OverflowPolicy.DROP_NEWEST)
+        queue.enqueue(1)
+        queue.enqueue(2)
+        assert queue.enqueue(3) == 3
+        assert queue.items == [2, 1]
+
+
+class TestTimingWheel:
+    def test_pop_due(self):
+        wheel = TimingWheel(num_buckets=4)
+        wheel.schedule('a', due=3)
+        wheel.schedule('b', due=7)
+        wheel.schedule('c', due=3)
+        assert wheel.size == 3
+
+        assert wheel.pop_due(2) == []
+        assert wheel.pop_due(3) == ['a', 'c']
+        assert wheel.items() == [(7, 'b')]
+        assert wheel.pop_due(7) == ['b']
+        assert wheel.size == 0
+
+    def test_clear(self):
+        wheel = TimingWheel(num_buckets=2)
+        wheel.schedule('a', due=1)
+        wheel.clear()
+        assert wheel.size == 0
+        assert wheel.pop_due(1) == []
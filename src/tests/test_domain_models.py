@@ -1,13 +1,26 @@
+import multiprocessing
+import os
+import pickle
+
 import pytest
 
 from unittest import mock
 
 from src.domain_models.common import BaseModel
-from src.domain_models.conveyor_belt import ConveyorBelt
+from src.domain_models.conveyor_belt import CompactConveyorBelt, ConveyorBelt, SparseConveyorBelt
 from src.domain_models.factory_floor import FactoryFloor
-from src.domain_models.feeder import Feeder
-from src.domain_models.worker import Worker
-from src.exceptions.exceptions import FactoryConfigError, FeederConfigError
+from src.domain_models.feeder import Feeder, FileFeed
+from src.domain_models.intents import ConflictPolicy, TickMode, policy_phase
+from src.domain_models.profiler import FloorProfiler, Phase
+from src.domain_models.receiver import FileSink, Receiver, StatisticsSink
+from src.domain_models.stop_conditions import any_of, products_reached, throughput_converged, time_budget
+from src.domain_models.trace import TraceReader, TraceRecorder
+from src.domain_models.utilization import BlockedDrops, StateTicks
+from src.domain_models.worker import CompiledWorker, Worker, WorkerState
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig
+from src.exceptions.exceptions import (
+    CheckpointError, FactoryConfigError, FeederConfigError, ReceiverConfigError, TraceError,
+)
 
 
 @pytest.fixture
@@ -58,14 +71,162 @@ class TestFeeder:
             ),
         )
 
+    def test_feed_repeated(self, feeder_factory):
+        feeder = feeder_factory(feed_input=(item for item in [1, 2, 3]), repeat=True)
+        assert feeder.period == 3
+        assert [feeder.feed() for _ in range(7)] == [1, 2, 3, 1, 2, 3, 1]
+        assert feeder.phase == 1
+
+    def test_feed_not_repeated_has_no_period(self, basic_feeder):
+        assert basic_feeder.period is None
+        assert basic_feeder.phase == 0
+
     @mock.patch('src.domain_models.feeder.random')
     def test_default_feed(self, mock_random):
-        mock_random.choice.side_effect = ['E', 'E', 'A', 'B']
-        feeder = Feeder(('A', 'B', 'E'))
+        mock_random.Random.return_value.choices.side_effect = [['E', 'E'], ['A', 'B']]
+        feeder = Feeder(('A', 'B', 'E'), block_size=2)
         result = []
         for i in range(4):
             result.append(feeder.feed())
         assert result == ['E', 'E', 'A', 'B']
+        mock_random.Random.return_value.choices.assert_called_with(('A', 'B', 'E'), weights=None, k=2)
+
+    def test_default_feed_is_reproducible(self):
+        feeder = Feeder(('A', 'B', 'E'), seed=3, block_size=4)
+        other_feeder = Feeder(('A', 'B', 'E'), seed=3, block_size=4)
+        assert [feeder.feed() for _ in range(10)] == [other_feeder.feed() for _ in range(10)]
+
+    def test_default_feed_weights(self):
+        feeder = Feeder(('A', 'B', 'E'), seed=3, weights=(0, 1, 0))
+        assert [feeder.feed() for _ in range(5)] == ['B'] * 5
+
+    @pytest.mark.parametrize('weights, mirrored_components', [
+        (None, {'A': 'E', 'B': 'B', 'E': 'A'}),
+        ((1, 2, 1), {'A': 'E', 'B': 'B', 'E': 'A'}),
+    ])
+    def test_antithetic_feed(self, weights, mirrored_components):
+        feeder = Feeder(('A', 'B', 'E'), seed=4, weights=weights, block_size=16)
+        antithetic_feeder = Feeder(('A', 'B', 'E'), seed=4, weights=weights, block_size=16, antithetic=True)
+        items = [feeder.feed() for _ in range(1000)]
+        antithetic_items = [antithetic_feeder.feed() for _ in range(1000)]
+
+        assert antithetic_items == [mirrored_components[item] for item in items]
+
+    def test_default_feed_invalid_weights(self):
+        with pytest.raises(FeederConfigError) as exception:
+            Feeder(('A', 'B', 'E'), weights=(1, 2))
+
+        assert exception.value.args == (
+            'Got 2 weights for 3 components. Please supply one weight per component.',
+        )
+
+    @pytest.mark.parametrize('weights', [(1, -1), (0, 0), (1, float('inf')), (1, float('nan'))])
+    def test_default_feed_invalid_weight_values(self, weights):
+        with pytest.raises(FeederConfigError):
+            Feeder(('A', 'B'), weights=weights)
+
+    @pytest.mark.parametrize('block_size', [0, -1])
+    def test_default_feed_invalid_block_size(self, block_size):
+        with pytest.raises(FeederConfigError) as exception:
+            Feeder(('A', 'B'), block_size=block_size)
+
+        assert exception.value.args == (f'Block size of a feeder must be at least 1, got {block_size}.',)
+
+    @pytest.mark.parametrize('feeder_kwargs', [
+        {'seed': 5, 'block_size': 4},
+        {'seed': 5, 'block_size': 4, 'antithetic': True},
+        {'feed_input': [1, 2, 3], 'repeat': True},
+        {'feed_input': list(range(40))},
+        {'feed_input': range(40)},
+    ])
+    def test_snapshot_and_restore(self, feeder_kwargs):
+        feeder = Feeder(**feeder_kwargs)
+        for num_items in [4, 3, 2]:
+            for _ in range(num_items):
+                feeder.feed()
+            restored_feeder = Feeder(**feeder_kwargs)
+            restored_feeder.restore(feeder.snapshot())
+            assert [restored_feeder.feed() for _ in range(6)] == [feeder.feed() for _ in range(6)]
+
+    def test_snapshot_and_restore_iterator(self):
+        feeder = Feeder(feed_input=iter(range(20)))
+        for _ in range(5):
+            feeder.feed()
+        restored_feeder = Feeder(feed_input=iter(range(20)))
+        restored_feeder.restore(feeder.snapshot())
+        assert restored_feeder.feed() == feeder.feed() == 5
+
+    def test_snapshot_and_restore_file_feed(self, tmpdir):
+        path = str(tmpdir.join('trace.txt'))
+        tmpdir.join('trace.txt').write(''.join(f'{number}\n' for number in range(10)))
+        feeder = Feeder(feed_input=FileFeed(path, decode=int))
+        for _ in range(6):
+            feeder.feed()
+        restored_feeder = Feeder(feed_input=FileFeed(path, decode=int))
+        restored_feeder.restore(feeder.snapshot())
+        assert restored_feeder.feed() == 6
+
+    def test_snapshot_and_restore_file_feed_from_offset(self, tmpdir):
+        path = str(tmpdir.join('trace.txt'))
+        tmpdir.join('trace.txt').write(''.join(f'{number}\n' for number in range(200)))
+        feeder = Feeder(feed_input=FileFeed(path, offset=100, decode=int))
+        for _ in range(5):
+            feeder.feed()
+        file_feed = FileFeed(path, offset=100, decode=int)
+        restored_feeder = Feeder(feed_input=file_feed)
+        restored_feeder.restore(feeder.snapshot())
+
+        assert restored_feeder.feed() == feeder.feed() == 105
+        assert file_feed.offset == 100
+
+    def test_fork_file_feed_from_offset(self, tmpdir):
+        path = str(tmpdir.join('trace.txt'))
+        tmpdir.join('trace.txt').write(''.join(f'{number}\n' for number in range(200)))
+        feeder = Feeder(feed_input=FileFeed(path, offset=100, decode=int))
+        for _ in range(6):
+            feeder.feed()
+        forked_feeder = feeder.fork()
+
+        assert [forked_feeder.feed() for _ in range(3)] == [feeder.feed() for _ in range(3)] == [106, 107, 108]
+
+    @pytest.mark.parametrize('feed_input, repeat', [
+        (None, False),
+        ([1, 2, 3], True),
+        (iter(range(40)), False),
+    ])
+    def test_fork(self, feed_input, repeat):
+        feeder = Feeder(feed_input=feed_input, repeat=repeat, seed=3, block_size=4)
+        for _ in range(5):
+            feeder.feed()
+        forked_feeder = feeder.fork()
+        assert [forked_feeder.feed() for _ in range(10)] == [feeder.feed() for _ in range(10)]
+
+    def test_file_feed(self, tmpdir, feeder_factory):
+        path = str(tmpdir.join('trace.txt'))
+        tmpdir.join('trace.txt').write('A\nB\nE\nA')
+        feeder = feeder_factory(feed_input=FileFeed(path, chunk_size=3))
+        assert [feeder.feed() for _ in range(4)] == ['A', 'B', 'E', 'A']
+        with pytest.raises(StopIteration):
+            feeder.feed()
+
+    def test_file_feed_from_offset(self, tmpdir):
+        path = str(tmpdir.join('trace.txt'))
+        tmpdir.join('trace.txt').write(''.join(f'{number}\n' for number in range(10)))
+        file_feed = FileFeed(path, offset=7, decode=int, chunk_size=4)
+        assert list(file_feed) == [7, 8, 9]
+        assert list(file_feed.seek(2))[:2] == [2, 3]
+        assert list(file_feed.seek(10)) == []
+
+    def test_file_feed_replays_file_sink(self, tmpdir):
+        path = str(tmpdir.join('received.txt'))
+        receiver = Receiver(sinks=[FileSink(path)])
+        receiver.receive_many(['A', 'P', 'E'], repetitions=2)
+        receiver.close()
+        assert list(FileFeed(path, offset=1)) == ['P', 'E', 'A', 'P', 'E']
+
+    def test_file_feed_empty_file(self, tmpdir):
+        tmpdir.join('trace.txt').write('')
+        assert list(FileFeed(str(tmpdir.join('trace.txt')))) == []
 
 
 class TestReceiver:
@@ -76,6 +237,76 @@ class TestReceiver:
         basic_receiver.receive('A')
         assert basic_receiver.received_items == ['A']
 
+    def test_receive_many(self, basic_receiver):
+        basic_receiver.receive_many(['A', 'B'], repetitions=2)
+        assert basic_receiver.received_items == ['A', 'B', 'A', 'B']
+
+    def test_received_items_not_kept(self, receiver_factory):
+        receiver: Receiver = receiver_factory(keep_items=False)
+        receiver.receive('A')
+
+        with pytest.raises(ReceiverConfigError) as exception:
+            receiver.received_items
+
+        assert exception.value.args == (
+            'Received items are not kept. Please create the Receiver with keep_items=True.',
+        )
+
+    def test_statistics(self, basic_receiver):
+        for item in ['E', 'P', 'A', 'E', 'P', 'B', 'A']:
+            basic_receiver.receive(item)
+
+        statistics = basic_receiver.statistics
+        assert statistics.received == 7
+        assert statistics.products == 2
+        assert statistics.empty_slots == 2
+        assert statistics.unused_components == {'A': 2, 'B': 1}
+        assert statistics.products_per_tick == 2 / 7
+
+    def test_statistics_products_per_tick_over_window(self):
+        statistics = StatisticsSink(window_size=4)
+        for item in ['P', 'P', 'P', 'E', 'E', 'P']:
+            statistics.receive(item)
+
+        assert statistics.products == 4
+        assert statistics.products_per_tick == 2 / 4
+
+    def test_statistics_receive_many_matches_receive(self):
+        statistics = StatisticsSink(window_size=5)
+        many_statistics = StatisticsSink(window_size=5)
+        for _ in range(3):
+            for item in ['P', 'A', 'E']:
+                statistics.receive(item)
+        many_statistics.receive_many(['P', 'A', 'E'], repetitions=3)
+
+        assert many_statistics.received == statistics.received == 9
+        assert many_statistics.products == statistics.products == 3
+        assert many_statistics.empty_slots == statistics.empty_slots == 3
+        assert many_statistics.unused_components == statistics.unused_components == {'A': 3}
+        assert many_statistics.products_per_tick == statistics.products_per_tick == 1 / 5
+
+    def test_statistics_snapshot_and_restore(self):
+        statistics = StatisticsSink(window_size=3)
+        for item in ['P', 'A', 'E', 'P']:
+            statistics.receive(item)
+        restored_statistics = StatisticsSink(window_size=3)
+        restored_statistics.restore(statistics.snapshot())
+        for item in ['E', 'B']:
+            statistics.receive(item)
+            restored_statistics.receive(item)
+
+        assert restored_statistics.snapshot() == statistics.snapshot()
+        assert restored_statistics.products_per_tick == statistics.products_per_tick == 1 / 3
+
+    def test_file_sink(self, tmpdir):
+        path = str(tmpdir.join('received.txt'))
+        receiver = Receiver(sinks=[FileSink(path, batch_size=2)])
+        receiver.receive_many(['A', 'P', 'E'], repetitions=1)
+        assert tmpdir.join('received.txt').read() == 'A\nP\n'
+
+        receiver.close()
+        assert tmpdir.join('received.txt').read() == 'A\nP\nE\n'
+
 
 class TestWorker:
     def test_init(self, basic_worker):
@@ -173,6 +404,41 @@ class TestWorker:
 
         assert worker.components == ['P']
 
+    def test_snapshot_and_restore(self, worker_factory, basic_conveyor_belt):
+        worker: Worker = worker_factory(conveyor_belt=basic_conveyor_belt)
+        basic_conveyor_belt.enqueue('A')
+        worker.work()
+        assert worker.snapshot() == ('idle', ('A',), 0)
+
+        restored_worker: Worker = worker_factory()
+        restored_worker.restore(('building', ('A', 'B'), 3))
+        assert restored_worker.snapshot() == ('building', ('A', 'B'), 3)
+
+    def test_wanted_items(self, worker_factory):
+        worker: Worker = worker_factory()
+        assert worker.wanted_items() == {'A', 'B'}
+
+        worker.restore(('idle', ('A',), 0))
+        assert worker.wanted_items() == {'B'}
+
+        worker.restore(('idle', ('A', 'B'), 0))
+        assert worker.wanted_items() is None
+
+        worker.restore(('idle', ('P',), 0))
+        assert worker.wanted_items() == {'E'}
+
+
+def _interned_floor() -> FactoryFloor:
+    config = FactoryFloorConfig(num_steps=40, conveyor_belt_slots=4, num_pairs=2, intern_items=True)
+    return FactoryFloor(config=config, feeder=Feeder(('X', 'Y', 'Z', 'W', 'A', 'B', 'E'), seed=6))
+
+
+def _save_interned_checkpoint(path: str):
+    factory_floor = _interned_floor()
+    for _ in range(20):
+        factory_floor.tick()
+    factory_floor.save_checkpoint(path, end_time=40)
+
 
 class TestFactoryFloor:
     def test_init_default(self, basic_feeder, basic_receiver):
@@ -322,8 +588,593 @@ class TestFactoryFloor:
             'E', 'E', 'E', 'E', 'E', 'A', 'E', 'E', 'E', 'E', 'E', 'P', 'E'
         ]
 
+    @pytest.mark.parametrize('feed_input, num_steps, num_pairs', [
+        (['A', 'B', 'E', 'E', 'E', 'E', 'E'], 1000, 3),
+        (['A', 'B', 'A', 'E', 'B', 'B'], 997, 2),
+        (['A', 'E', 'E'], 50, 1),
+    ])
+    def test_run_fast_forward_matches_run(
+            self, factory_floor_factory, feeder_factory, factory_floor_config, feed_input, num_steps, num_pairs
+    ):
+        factory_floor_config.num_steps = num_steps
+        factory_floor_config.num_pairs = num_pairs
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=feeder_factory(feed_input=feed_input, repeat=True)
+        )
+        fast_forwarded_factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=feeder_factory(feed_input=feed_input, repeat=True)
+        )
+
+        factory_floor.run()
+        fast_forwarded_factory_floor.run(fast_forward=True)
+
+        assert fast_forwarded_factory_floor.receiver.received_items == factory_floor.receiver.received_items
+        assert fast_forwarded_factory_floor.state_key() == factory_floor.state_key()
+        assert fast_forwarded_factory_floor.time == num_steps
+
+    def test_run_fast_forward_requires_periodic_feed(self, factory_floor_factory, feeder_factory):
+        factory_floor: FactoryFloor = factory_floor_factory(feeder=feeder_factory(feed_input=['A'] * 10))
+
+        with pytest.raises(FactoryConfigError) as exception:
+            factory_floor.run(fast_forward=True)
+
+        assert exception.value.args == (
+            'Fast forward requires a periodic feed. Please use a Feeder with repeat=True.',
+        )
+
+    def test_run_resumes_from_checkpoint(self, tmpdir, factory_floor_factory, factory_floor_config):
+        path = str(tmpdir.join('checkpoint'))
+        factory_floor_config.num_steps = 100
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=Feeder(('A', 'B', 'E'), seed=1, block_size=16)
+        )
+        factory_floor.run()
+
+        interrupted_factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=Feeder(('A', 'B', 'E'), seed=1, block_size=16)
+        )
+        for _ in range(70):
+            interrupted_factory_floor.tick()
+        interrupted_factory_floor.save_checkpoint(path, end_time=100)
+
+        resumed_factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=Feeder(('A', 'B', 'E'), seed=1, block_size=16)
+        )
+        resumed_factory_floor.run(checkpoint_path=path, checkpoint_interval=20)
+
+        assert resumed_factory_floor.time == 100
+        assert resumed_factory_floor.snapshot() == factory_floor.snapshot()
+
+    def test_run_writes_checkpoints(self, tmpdir, factory_floor_factory, factory_floor_config):
+        path = str(tmpdir.join('checkpoint'))
+        factory_floor_config.num_steps = 50
+        feed_input = ['A', 'B', 'E'] * 15
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=Feeder(feed_input=feed_input)
+        )
+        # The feed runs out in tick 45, after the checkpoint of tick 40.
+        with pytest.raises(FactoryConfigError):
+            factory_floor.run(checkpoint_path=path, checkpoint_interval=20)
+
+        restored_factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=Feeder(feed_input=feed_input)
+        )
+        assert restored_factory_floor.load_checkpoint(path) == 50
+        assert restored_factory_floor.time == 40
+
+    @pytest.mark.parametrize('fast_forward', [False, True])
+    def test_run_removes_checkpoint_when_finished(
+            self, tmpdir, factory_floor_factory, factory_floor_config, fast_forward
+    ):
+        path = str(tmpdir.join('checkpoint'))
+        factory_floor_config.num_steps = 50
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=Feeder(feed_input=['A', 'B', 'E'], repeat=True)
+        )
+        factory_floor.run(checkpoint_path=path, checkpoint_interval=20, fast_forward=fast_forward)
+        assert not os.path.exists(path)
+
+        # A new run with the same path starts afresh.
+        factory_floor.run(checkpoint_path=path, checkpoint_interval=20, fast_forward=fast_forward)
+        assert factory_floor.time == 100
+
+    def test_load_checkpoint_of_other_config(self, tmpdir, factory_floor_factory):
+        path = str(tmpdir.join('checkpoint'))
+        factory_floor_factory(config=FactoryFloorConfig(num_pairs=2)).save_checkpoint(path)
+
+        with pytest.raises(CheckpointError) as exception:
+            factory_floor_factory(config=FactoryFloorConfig(num_pairs=3)).load_checkpoint(path)
+
+        assert exception.value.args == (f'Checkpoint {path} was saved by a floor with a different config.',)
+
+    def test_fork_matches_parent(self, factory_floor_factory, factory_floor_config):
+        factory_floor_config.num_steps = 30
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=Feeder(('A', 'B', 'E'), seed=4)
+        )
+        factory_floor.run()
+        forked_factory_floor = factory_floor.fork()
+        assert forked_factory_floor.snapshot() == factory_floor.snapshot()
+
+        factory_floor.run()
+        forked_factory_floor.run()
+        assert forked_factory_floor.snapshot() == factory_floor.snapshot()
+        assert forked_factory_floor.conveyor_belt is not factory_floor.conveyor_belt
+        assert forked_factory_floor.config is factory_floor.config
+
+    def test_fork_with_other_operation_times(self, factory_floor_factory, factory_floor_config, worker_operation_times):
+        factory_floor: FactoryFloor = factory_floor_factory(config=factory_floor_config, feeder=Feeder(seed=4))
+        worker_operation_times.BUILDING = 10
+        forked_factory_floor = factory_floor.fork(operation_times=worker_operation_times)
+        forked_factory_floor.run()
+        factory_floor.run()
+
+        assert forked_factory_floor.workers[0]._operation_times is worker_operation_times
+        assert factory_floor.workers[0]._operation_times is not worker_operation_times
+
+    @pytest.mark.parametrize('picking_up, dropping, building, num_pairs', [
+        (1, 1, 4, 3),
+        (2, 3, 7, 2),
+        (3, 1, 1, 1),
+    ])
+    def test_run_event_driven_matches_run(
+            self, factory_floor_factory, factory_floor_config, picking_up, dropping, building, num_pairs
+    ):
+        class OperationTimes:
+            PICKING_UP = picking_up
+            DROPPING = dropping
+            BUILDING = building
+
+        factory_floor_config.num_steps = 500
+        factory_floor_config.conveyor_belt_slots = 4
+        factory_floor_config.num_pairs = num_pairs
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=Feeder(('A', 'B', 'E'), seed=8)
+        ).fork(operation_times=OperationTimes)
+        event_driven_factory_floor = factory_floor.fork()
+
+        factory_floor.run()
+        event_driven_factory_floor.run(event_driven=True)
+
+        assert event_driven_factory_floor.snapshot() == factory_floor.snapshot()
+
+    @pytest.mark.parametrize('required_items, components, event_driven', [
+        (['A', 'B'], ('A', 'B', 'E'), False),
+        (['A', 'B', 'C'], ('A', 'B', 'C', 'E', 'X'), False),
+        (['A'], ('A', 'E'), False),
+        (['A', 'A', 'B'], ('A', 'B', 'E'), False),
+        (['A', 'B', 'C'], ('A', 'B', 'C', 'E'), True),
+    ])
+    def test_compiled_workers_match_workers(self, required_items, components, event_driven):
+        class OperationTimes:
+            PICKING_UP = 2
+            DROPPING = 1
+            BUILDING = 3
+
+        config = FactoryFloorConfig(required_items=required_items, num_steps=800, conveyor_belt_slots=6, num_pairs=4)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(components, seed=11))
+        compiled_factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(components, seed=11), worker_class=CompiledWorker
+        )
+        factory_floor = factory_floor.fork(operation_times=OperationTimes)
+        compiled_factory_floor = compiled_factory_floor.fork(operation_times=OperationTimes)
+
+        for _ in range(2):
+            factory_floor.run()
+            compiled_factory_floor.run(event_driven=event_driven)
+
+            assert isinstance(compiled_factory_floor.workers[0], CompiledWorker)
+            assert compiled_factory_floor.receiver.snapshot() == factory_floor.receiver.snapshot()
+            assert compiled_factory_floor.conveyor_belt.snapshot() == factory_floor.conveyor_belt.snapshot()
+            for compiled_worker, worker in zip(compiled_factory_floor.workers, factory_floor.workers):
+                state, worker_components, remaining_time = worker.snapshot()
+                assert compiled_worker.snapshot() == (
+                    state, tuple(item for item in dict.fromkeys(required_items) if item in worker_components) or
+                    tuple(worker_components), remaining_time
+                )
+
+    @pytest.mark.parametrize('worker_class, event_driven', [
+        (Worker, False),
+        (CompiledWorker, False),
+        (CompiledWorker, True),
+    ])
+    def test_interned_items_match_items(self, tmpdir, worker_class, event_driven):
+        def make_factory_floor(intern_items):
+            config = FactoryFloorConfig(
+                required_items=['A', 'B', 'C'], num_steps=400, conveyor_belt_slots=5, num_pairs=4,
+                intern_items=intern_items,
+            )
+            return FactoryFloor(
+                config=config,
+                feeder=Feeder(('A', 'B', 'C', 'E', 'X'), seed=12),
+                receiver=Receiver(config=config, keep_items=True),
+                worker_class=worker_class,
+            )
+
+        factory_floor = make_factory_floor(intern_items=False)
+        interned_factory_floor = make_factory_floor(intern_items=True)
+        with TraceRecorder(str(tmpdir.join('trace.bin'))) as trace_recorder:
+            factory_floor.run(trace_recorder=trace_recorder)
+        with TraceRecorder(str(tmpdir.join('interned.bin'))) as trace_recorder:
+            interned_factory_floor.run(trace_recorder=trace_recorder, event_driven=event_driven)
+
+        assert interned_factory_floor.item_codes is not None
+        assert interned_factory_floor.conveyor_belt.items == [
+            interned_factory_floor.item_codes.encode(item) for item in factory_floor.conveyor_belt.items
+        ]
+        assert interned_factory_floor.receiver.received_items == factory_floor.receiver.received_items
+        assert 'X' in interned_factory_floor.receiver.received_items
+        with TraceReader(str(tmpdir.join('trace.bin'))) as trace_reader, \
+                TraceReader(str(tmpdir.join('interned.bin'))) as interned_trace_reader:
+            assert list(interned_trace_reader) == list(trace_reader)
+
+    def test_interned_config(self):
+        config = FactoryFloorConfig(required_items=['A', 'B'], intern_items=True)
+        interned_config = config.interned()
+
+        assert interned_config is config.interned()
+        assert (interned_config.empty_code, interned_config.product_code) == (0, 1)
+        assert interned_config.required_items == [2, 3]
+        assert interned_config.item_codes.decode(3) == 'B'
+        assert config.required_items == ['A', 'B']
+
+    def test_run_event_driven_with_many_components_matches_run(self):
+        config = FactoryFloorConfig(
+            required_items=['A', 'B', 'C', 'D'], num_steps=1000, conveyor_belt_slots=12, num_pairs=10
+        )
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(('A', 'B', 'C', 'D', 'E'), seed=10))
+        event_driven_factory_floor = factory_floor.fork()
+
+        factory_floor.run()
+        event_driven_factory_floor.run(event_driven=True)
+
+        assert factory_floor.receiver.statistics.products > 0
+        assert event_driven_factory_floor.snapshot() == factory_floor.snapshot()
+
+    def test_event_driven_run_peeks_once_per_waiting_slot(self):
+        required_items = [f'C{number}' for number in range(12)]
+        config = FactoryFloorConfig(required_items=required_items, num_steps=10, conveyor_belt_slots=5, num_pairs=5)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(('E',)))
+        conveyor_belt = factory_floor.conveyor_belt
+
+        with mock.patch.object(
+                conveyor_belt, 'check_item_at_slot', wraps=conveyor_belt.check_item_at_slot
+        ) as check_item_at_slot:
+            factory_floor.run(event_driven=True)
+
+        # Not one peek per wanted item, of which every slot has 12.
+        assert check_item_at_slot.call_count == 10 * 5
+
+    def test_event_driven_run_syncs_workers_for_trace(self, tmpdir, factory_floor_factory, factory_floor_config):
+        factory_floor_config.num_steps = 60
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=Feeder(('A', 'B', 'E'), seed=9)
+        )
+        event_driven_factory_floor = factory_floor.fork()
+        with TraceRecorder(str(tmpdir.join('trace.bin'))) as trace_recorder:
+            factory_floor.run(trace_recorder=trace_recorder)
+        with TraceRecorder(str(tmpdir.join('event_driven.bin'))) as trace_recorder:
+            event_driven_factory_floor.run(trace_recorder=trace_recorder, event_driven=True)
+
+        with TraceReader(str(tmpdir.join('trace.bin'))) as trace_reader, \
+                TraceReader(str(tmpdir.join('event_driven.bin'))) as event_driven_trace_reader:
+            assert list(event_driven_trace_reader) == list(trace_reader)
+
+    def test_load_interned_checkpoint_in_another_process(self, tmpdir):
+        path = str(tmpdir.join('checkpoint'))
+        # A new process assigns codes to items which are not in the config in its own order.
+        process = multiprocessing.get_context('spawn').Process(target=_save_interned_checkpoint, args=(path,))
+        process.start()
+        process.join()
+        factory_floor = _interned_floor()
+        reference_factory_floor = _interned_floor()
+
+        factory_floor.run(checkpoint_path=path)
+        reference_factory_floor.run()
+
+        assert process.exitcode == 0
+        assert factory_floor.time == 40
+        assert factory_floor.snapshot() == reference_factory_floor.snapshot()
+        assert set(factory_floor.snapshot().conveyor_belt[0]) <= {'X', 'Y', 'Z', 'W', 'A', 'B', 'E', 'P'}
+
+    def test_load_checkpoint_of_unknown_version(self, tmpdir, factory_floor_factory):
+        path = str(tmpdir.join('checkpoint'))
+        with open(path, 'wb') as checkpoint_file:
+            pickle.dump((0, None, ()), checkpoint_file)
+
+        with pytest.raises(CheckpointError) as exception:
+            factory_floor_factory().load_checkpoint(path)
+
+        assert exception.value.args == ('Unsupported checkpoint version 0, expected version 1.',)
+
+    @pytest.mark.parametrize('tick_mode, conflict_policy, expected_components', [
+        (TickMode.SEQUENTIAL, ConflictPolicy.LOWEST_PAIR, (['A'], [])),
+        (TickMode.TWO_PHASE, ConflictPolicy.LOWEST_PAIR, (['A'], [])),
+        (TickMode.TWO_PHASE, ConflictPolicy.ROTATE, ([], ['A'])),
+    ])
+    def test_two_phase_conflict_policy(self, tick_mode, conflict_policy, expected_components):
+        config = FactoryFloorConfig(num_pairs=1)
+        factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(feed_input=['E', 'A', 'E']), tick_mode=tick_mode,
+            conflict_policy=conflict_policy,
+        )
+        factory_floor.tick()
+        factory_floor.tick()
+
+        assert tuple(worker.components for worker in factory_floor.workers) == expected_components
+        assert factory_floor.conveyor_belt.check_item_at_slot(0) == 'E'
+
+    def test_two_phase_does_not_drop_into_slot_emptied_in_the_same_tick(self):
+        config = FactoryFloorConfig(num_pairs=1)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(feed_input=['B']))
+        two_phase_factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(feed_input=['B']), tick_mode=TickMode.TWO_PHASE
+        )
+        for floor in (factory_floor, two_phase_factory_floor):
+            floor.workers[0].restore(('idle', ('A',), 0))
+            floor.workers[1].restore(('idle', ('P',), 0))
+            floor.tick()
+
+        assert factory_floor.conveyor_belt.check_item_at_slot(0) == 'P'
+        assert two_phase_factory_floor.conveyor_belt.check_item_at_slot(0) == 'E'
+        assert two_phase_factory_floor.workers[1].components == ['P']
+
+    def test_two_phase_without_conflicts_matches_sequential(self):
+        config = FactoryFloorConfig(num_steps=500, conveyor_belt_slots=5, num_pairs=5)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(('A', 'B', 'E'), seed=13))
+        factory_floor.workers = factory_floor.workers[::2]
+        two_phase_factory_floor = factory_floor.fork()
+        two_phase_factory_floor.tick_mode = TickMode.TWO_PHASE
+
+        factory_floor.run()
+        two_phase_factory_floor.run()
+
+        assert factory_floor.receiver.statistics.products > 0
+        assert two_phase_factory_floor.snapshot() == factory_floor.snapshot()
+
+    @pytest.mark.parametrize('conflict_policy', [ConflictPolicy.LOWEST_PAIR, ConflictPolicy.ROTATE])
+    def test_two_phase_compiled_workers_match_workers(self, conflict_policy):
+        config = FactoryFloorConfig(required_items=['A', 'B', 'C'], num_steps=600, conveyor_belt_slots=6, num_pairs=5)
+        factory_floors = [
+            FactoryFloor(
+                config=config, feeder=Feeder(('A', 'B', 'C', 'E'), seed=14), worker_class=worker_class,
+                tick_mode=TickMode.TWO_PHASE, conflict_policy=conflict_policy,
+            )
+            for worker_class in (Worker, CompiledWorker)
+        ]
+        for factory_floor in factory_floors:
+            factory_floor.run()
+
+        factory_floor, compiled_factory_floor = factory_floors
+        assert factory_floor.receiver.statistics.products > 0
+        assert compiled_factory_floor.receiver.snapshot() == factory_floor.receiver.snapshot()
+        assert compiled_factory_floor.conveyor_belt.snapshot() == factory_floor.conveyor_belt.snapshot()
+
+    def test_two_phase_fast_forward_matches_run(self):
+        config = FactoryFloorConfig(num_steps=1000, conveyor_belt_slots=4, num_pairs=3)
+        factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(feed_input=['A', 'E', 'B', 'A', 'B', 'E', 'E'], repeat=True),
+            tick_mode=TickMode.TWO_PHASE, conflict_policy=ConflictPolicy.ROTATE,
+        )
+        fast_forward_factory_floor = factory_floor.fork()
+
+        factory_floor.run()
+        fast_forward_factory_floor.run(fast_forward=True)
+
+        assert fast_forward_factory_floor.receiver.snapshot() == factory_floor.receiver.snapshot()
+        assert fast_forward_factory_floor.state_key() == factory_floor.state_key()
+
+    def test_policy_phase_repeats_after_all_rotations(self):
+        workers = [mock.Mock(slot_number=slot_number) for slot_number in [0, 0, 1, 1, 1]]
+
+        assert [policy_phase(workers, ConflictPolicy.ROTATE, tick) for tick in [5, 6, 13]] == [5, 0, 1]
+        assert policy_phase(workers, ConflictPolicy.LOWEST_PAIR, 5) is None
+        assert policy_phase([], ConflictPolicy.ROTATE, 5) == 0
+
+    def test_event_driven_run_requires_sequential_tick_mode(self):
+        factory_floor = FactoryFloor(tick_mode=TickMode.TWO_PHASE)
+        with pytest.raises(FactoryConfigError):
+            factory_floor.run(event_driven=True)
+
+    @pytest.mark.parametrize('tick_mode, conflict_policy', [
+        ('parallel', ConflictPolicy.LOWEST_PAIR),
+        (TickMode.TWO_PHASE, 'random'),
+    ])
+    def test_invalid_tick_mode_or_conflict_policy(self, tick_mode, conflict_policy):
+        with pytest.raises(ValueError):
+            FactoryFloor(tick_mode=tick_mode, conflict_policy=conflict_policy)
+
+    def test_iter_steps(self):
+        config = FactoryFloorConfig(num_steps=300, conveyor_belt_slots=5, num_pairs=4)
+        factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(('A', 'B', 'E'), seed=15), receiver=Receiver(config=config, keep_items=True)
+        )
+        stepped_factory_floor = factory_floor.fork()
+        factory_floor.run()
+
+        step_events = stepped_factory_floor.iter_steps(num_steps=300)
+        first_step_event = next(step_events)
+        assert stepped_factory_floor.time == 1
+        step_events = [first_step_event] + list(step_events)
+
+        assert [step_event.tick for step_event in step_events] == list(range(300))
+        assert [step_event.delivered_item for step_event in step_events] == factory_floor.receiver.received_items
+        pickups, drops, builds = (
+            sum(step_event.pickups for step_event in step_events),
+            sum(step_event.drops for step_event in step_events),
+            sum(step_event.builds for step_event in step_events),
+        )
+        assert pickups >= 2 * builds >= 2 * drops >= 2 * factory_floor.receiver.statistics.products > 0
+        assert stepped_factory_floor.snapshot() == factory_floor.snapshot()
+
+    @pytest.mark.parametrize('worker_class', [Worker, CompiledWorker])
+    def test_iter_steps_counts_operations(self, worker_class):
+        config = FactoryFloorConfig(num_pairs=1)
+        factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(feed_input=['A', 'B', 'E', 'E', 'E', 'E', 'E']), worker_class=worker_class
+        )
+        step_events = list(factory_floor.iter_steps(num_steps=7))
+
+        assert [(step_event.pickups, step_event.drops, step_event.builds) for step_event in step_events] == [
+            (1, 0, 0), (1, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 1), (0, 1, 0),
+        ]
+
+    def test_run_until_products_reached(self):
+        config = FactoryFloorConfig(conveyor_belt_slots=5, num_pairs=5)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(('A', 'B', 'E'), seed=16))
+        reference_factory_floor = factory_floor.fork()
+
+        num_steps = factory_floor.run_until(products_reached(20))
+
+        assert factory_floor.time == num_steps
+        assert factory_floor.receiver.statistics.products == 20
+        reference_factory_floor.config = FactoryFloorConfig(num_steps=num_steps - 1)
+        reference_factory_floor.run()
+        assert reference_factory_floor.receiver.statistics.products < 20
+
+    def test_run_until_max_steps(self):
+        factory_floor = FactoryFloor(feeder=Feeder(('A', 'B', 'E'), seed=17))
+        assert factory_floor.run_until(lambda floor, step_event: False, max_steps=50) == 50
+        assert factory_floor.time == 50
+
+    def test_run_until_time_budget(self):
+        factory_floor = FactoryFloor(feeder=Feeder(('A', 'B', 'E'), seed=18))
+        assert factory_floor.run_until(any_of(time_budget(0), products_reached(10 ** 9))) == 1
+
+    def test_run_until_throughput_converged(self):
+        config = FactoryFloorConfig(conveyor_belt_slots=5, num_pairs=5)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(('A', 'B', 'E'), seed=19))
+
+        num_steps = factory_floor.run_until(throughput_converged(tolerance=0.05, check_every=500), max_steps=100000)
+
+        assert num_steps % 500 == 0
+        assert 1000 <= num_steps < 100000
+
+    def test_run_until_throughput_converged_on_belt_longer_than_check_window(self):
+        config = FactoryFloorConfig(conveyor_belt_slots=2000, num_pairs=3)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(('A', 'B', 'E'), seed=19))
+
+        num_steps = factory_floor.run_until(throughput_converged(tolerance=0.05, check_every=500), max_steps=100000)
+
+        # No product reaches the receiver in the first 2000 ticks.
+        assert num_steps >= 3000
+        assert factory_floor.receiver.statistics.products > 0
+
+    @pytest.mark.parametrize('sample_every, event_driven', [(1, False), (10, False), (3, True)])
+    def test_run_with_profiler(self, sample_every, event_driven):
+        config = FactoryFloorConfig(num_steps=300, conveyor_belt_slots=5, num_pairs=4)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(('A', 'B', 'E'), seed=20))
+        profiled_factory_floor = factory_floor.fork()
+        profiler = FloorProfiler(sample_every=sample_every)
+
+        for _ in range(2):
+            factory_floor.run()
+            profiled_factory_floor.run(profiler=profiler, event_driven=event_driven)
+        summary = profiler.summary()
+
+        assert profiled_factory_floor.snapshot() == factory_floor.snapshot()
+        assert summary.num_ticks == 600
+        assert profiler.num_sampled_ticks == 600 // sample_every
+        assert summary.ticks_per_second > 0
+        assert set(summary.phase_shares) == {Phase.RECEIVE, Phase.FEED, Phase.WORK, 'other'}
+        assert sum(summary.phase_shares.values()) == pytest.approx(1)
+        assert all(ns_per_tick > 0 for ns_per_tick in summary.phase_ns_per_tick.values())
+        operation_counts = profiled_factory_floor.operation_counts
+        assert summary.transitions[(WorkerState.IDLE, WorkerState.PICKING_UP)] == operation_counts.pickups
+        assert summary.transitions[(WorkerState.BUILDING, WorkerState.IDLE)] == operation_counts.builds
+        assert summary.transitions[(WorkerState.IDLE, WorkerState.DROPPING)] == operation_counts.drops
+        assert 'ticks/s' in summary.format()
+
+    def test_profiler_counts_transitions_of_unfinished_operations(self, worker_operation_times):
+        config = FactoryFloorConfig(num_pairs=1, num_steps=3)
+        # Picking up A takes 4 ticks, so B passes the busy slot.
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(feed_input=['A', 'B', 'E']))
+        factory_floor = factory_floor.fork(operation_times=worker_operation_times)
+        profiler = FloorProfiler()
+
+        factory_floor.run(profiler=profiler)
+
+        assert profiler.summary().transitions == {
+            (WorkerState.IDLE, WorkerState.PICKING_UP): 1,
+            (WorkerState.PICKING_UP, WorkerState.IDLE): 0,
+            (WorkerState.IDLE, WorkerState.DROPPING): 0,
+            (WorkerState.DROPPING, WorkerState.IDLE): 0,
+            (WorkerState.IDLE, WorkerState.BUILDING): 0,
+            (WorkerState.BUILDING, WorkerState.IDLE): 0,
+        }
+
+    @pytest.mark.parametrize('worker_class, event_driven, tick_mode', [
+        (Worker, False, TickMode.SEQUENTIAL),
+        (CompiledWorker, False, TickMode.SEQUENTIAL),
+        (Worker, True, TickMode.SEQUENTIAL),
+        (CompiledWorker, False, TickMode.TWO_PHASE),
+    ])
+    def test_track_utilization(self, worker_class, event_driven, tick_mode):
+        config = FactoryFloorConfig(required_items=['A', 'B', 'C'], num_steps=400, conveyor_belt_slots=6, num_pairs=4)
+        factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(('A', 'B', 'C', 'E', 'E'), seed=3), worker_class=worker_class,
+            tick_mode=tick_mode,
+        )
+        utilization = factory_floor.track_utilization()
+
+        factory_floor.run(event_driven=event_driven)
+        summary = utilization.summary(factory_floor.time)
+
+        operation_counts = factory_floor.operation_counts
+        building_ticks = sum(
+            4 - worker.remaining_time_of_operation for worker in factory_floor.workers
+            if worker.snapshot()[0] == WorkerState.BUILDING
+        )
+        assert summary.floor.total == 400 * len(factory_floor.workers)
+        assert summary.floor.picking_up == operation_counts.pickups
+        assert summary.floor.dropping == operation_counts.drops
+        assert summary.floor.building == 4 * operation_counts.builds + building_ticks
+        assert [sum(column) for column in zip(*summary.slots.values())] == list(summary.floor)
+        assert [sum(column) for column in zip(*summary.workers)] == list(summary.floor)
+        assert summary.floor_blocked_drops.drops > 0
+        slot_blocked_drops = summary.slot_blocked_drops.values()
+        assert [sum(column) for column in zip(*slot_blocked_drops)] == list(summary.floor_blocked_drops)
+        assert [sum(column) for column in zip(*summary.worker_blocked_drops)] == list(summary.floor_blocked_drops)
+        assert summary.slots[0].busy_share > summary.slots[3].busy_share
+
+    def test_utilization_counts_blocked_drops(self):
+        config = FactoryFloorConfig(required_items=['B', 'C'], num_steps=5, conveyor_belt_slots=1, num_pairs=1)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(feed_input=['A', 'A', 'A', 'E', 'A']))
+        factory_floor.workers[0].restore((WorkerState.IDLE, ('P',), 0))
+        utilization = factory_floor.track_utilization()
+
+        assert utilization.summary(factory_floor.time).floor_blocked_drops == BlockedDrops(drops=0, ticks=0)
+        factory_floor.run(event_driven=True)
+        summary = utilization.summary(factory_floor.time)
+
+        # The slot is taken by A for 3 ticks before the product can be dropped.
+        assert summary.worker_blocked_drops == [BlockedDrops(drops=1, ticks=3), BlockedDrops(0, 0)]
+        assert summary.slot_blocked_drops == {0: BlockedDrops(drops=1, ticks=3)}
+        assert summary.floor_blocked_drops == BlockedDrops(drops=1, ticks=3)
+        assert summary.workers == [StateTicks(idle=4, picking_up=0, dropping=1, building=0), StateTicks(5, 0, 0, 0)]
+
+    def test_track_utilization_with_fast_forward(self):
+        factory_floor = FactoryFloor(config=FactoryFloorConfig(), feeder=Feeder(['A', 'B', 'E'], repeat=True))
+        factory_floor.track_utilization()
+
+        with pytest.raises(FactoryConfigError):
+            factory_floor.run(fast_forward=True)
+
 
 class TestConveyorBelt:
+    def test_fork_is_independent(self, conveyor_belt_factory, factory_floor_config):
+        conveyor_belt: ConveyorBelt = conveyor_belt_factory(config=factory_floor_config)
+        conveyor_belt.enqueue('A')
+        conveyor_belt.put_item_in_slot(slot_number=1, item='B')
+        forked_conveyor_belt = conveyor_belt.fork()
+
+        conveyor_belt.enqueue('C')
+        conveyor_belt.confirm_operation_at_slot_finished(slot_number=1)
+        forked_conveyor_belt.enqueue('D')
+
+        assert conveyor_belt.snapshot() == (('C', 'A', 'B'), ('free', 'free', 'free'))
+        assert forked_conveyor_belt.snapshot() == (('D', 'A', 'B'), ('free', 'busy', 'free'))
+
     def test_initialization(self, conveyor_belt_factory, factory_floor_config):
         conveyor_belt: ConveyorBelt = conveyor_belt_factory(config=factory_floor_config)
 
@@ -402,3 +1253,214 @@ class TestConveyorBelt:
         assert conveyor_belt.retrieve_item_from_slot(slot_number=0) == 'A'
         assert conveyor_belt.is_slot_busy(slot_number=0)
         assert conveyor_belt.check_item_at_slot(slot_number=0) == factory_floor_config.empty_code
+
+    def test_enqueue_on_full_belt_pushes_last_item_off(self, conveyor_belt_factory, factory_floor_config):
+        conveyor_belt: ConveyorBelt = conveyor_belt_factory(config=factory_floor_config)
+        conveyor_belt[2] = 'B'
+
+        assert conveyor_belt.enqueue('A') == 'B'
+        assert conveyor_belt.size == 3
+        assert conveyor_belt.items == ['A', factory_floor_config.empty_code, factory_floor_config.empty_code]
+
+    def test_snapshot_and_restore(self, conveyor_belt_factory, factory_floor_config):
+        conveyor_belt: ConveyorBelt = conveyor_belt_factory(config=factory_floor_config)
+        conveyor_belt.enqueue('A')
+        conveyor_belt.put_item_in_slot(slot_number=1, item='B')
+        snapshot = conveyor_belt.snapshot()
+        assert snapshot == (('A', 'B', 'E'), ('free', 'busy', 'free'))
+
+        restored_conveyor_belt: ConveyorBelt = conveyor_belt_factory(config=factory_floor_config)
+        restored_conveyor_belt.restore(snapshot)
+
+        assert restored_conveyor_belt.items == ['A', 'B', 'E']
+        assert restored_conveyor_belt.is_slot_busy(slot_number=1)
+
+
+class TestTrace:
+    def test_trace_matches_snapshots(self, tmpdir, factory_floor_factory, feeder_factory, factory_floor_config):
+        path = str(tmpdir.join('trace.bin'))
+        factory_floor_config.num_steps = 12
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=feeder_factory(feed_input=['A', 'B', 'A', 'C', 'B'] + ['E'] * 7)
+        )
+        snapshots = [(factory_floor.conveyor_belt.snapshot(), [worker.snapshot() for worker in factory_floor.workers])]
+        trace_recorder = TraceRecorder(path, capacity=2)
+        trace_recorder.record(factory_floor)
+        for _ in range(12):
+            factory_floor.tick()
+            trace_recorder.record(factory_floor)
+            snapshots.append(
+                (factory_floor.conveyor_belt.snapshot(), [worker.snapshot() for worker in factory_floor.workers])
+            )
+        trace_recorder.close()
+
+        with TraceReader(path) as trace_reader:
+            assert len(trace_reader) == 13
+            for tick in [7, 0, 12, 3]:
+                (items, slot_states), worker_snapshots = snapshots[tick]
+                record = trace_reader[tick]
+                assert record.tick == tick
+                assert record.items == items
+                assert record.busy_slots == tuple(slot_state == 'busy' for slot_state in slot_states)
+                assert record.worker_states == tuple(state for state, _, _ in worker_snapshots)
+                assert record.remaining_times == tuple(remaining for _, _, remaining in worker_snapshots)
+
+    def test_run_with_fast_forward_records_every_tick(
+            self, tmpdir, factory_floor_factory, feeder_factory, factory_floor_config
+    ):
+        factory_floor_config.num_steps = 200
+        feed_input = ['A', 'B', 'E', 'E', 'E']
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=feeder_factory(feed_input=feed_input, repeat=True)
+        )
+        fast_forwarded_factory_floor: FactoryFloor = factory_floor_factory(
+            config=factory_floor_config, feeder=feeder_factory(feed_input=feed_input, repeat=True)
+        )
+        with TraceRecorder(str(tmpdir.join('trace.bin'))) as trace_recorder:
+            factory_floor.run(trace_recorder=trace_recorder)
+        with TraceRecorder(str(tmpdir.join('fast_forward.bin'))) as trace_recorder:
+            fast_forwarded_factory_floor.run(fast_forward=True, trace_recorder=trace_recorder)
+
+        with TraceReader(str(tmpdir.join('trace.bin'))) as trace_reader, \
+                TraceReader(str(tmpdir.join('fast_forward.bin'))) as fast_forwarded_trace_reader:
+            assert len(trace_reader) == len(fast_forwarded_trace_reader) == 201
+            assert list(trace_reader) == list(fast_forwarded_trace_reader)
+
+    def test_trace_of_long_belt(self, tmpdir):
+        path = str(tmpdir.join('trace.bin'))
+        config = FactoryFloorConfig(num_steps=2, conveyor_belt_slots=70000, num_pairs=1)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(feed_input=(str(item) for item in range(70002))))
+        with TraceRecorder(path) as trace_recorder:
+            factory_floor.run(trace_recorder=trace_recorder)
+
+        with TraceReader(path) as trace_reader:
+            assert trace_reader.num_slots == 70000
+            assert trace_reader[2].items[:2] == ('1', '0')
+
+    def test_consecutive_runs_record_every_tick_once(self, tmpdir, factory_floor_factory, feeder_factory):
+        path = str(tmpdir.join('trace.bin'))
+        config = FactoryFloorConfig(num_steps=5)
+        factory_floor: FactoryFloor = factory_floor_factory(
+            config=config, feeder=feeder_factory(feed_input=['A', 'B', 'E'], repeat=True)
+        )
+        snapshots = []
+        with TraceRecorder(path) as trace_recorder:
+            for _ in range(2):
+                factory_floor.run(trace_recorder=trace_recorder)
+                snapshots.append(factory_floor.conveyor_belt.snapshot())
+
+        with TraceReader(path) as trace_reader:
+            assert len(trace_reader) == 11
+            for tick, (items, _) in zip([5, 10], snapshots):
+                assert trace_reader[tick].items == items
+
+    def test_tick_not_in_trace(self, tmpdir, factory_floor_factory):
+        path = str(tmpdir.join('trace.bin'))
+        with TraceRecorder(path) as trace_recorder:
+            trace_recorder.record(factory_floor_factory())
+
+        with TraceReader(path) as trace_reader:
+            with pytest.raises(TraceError) as exception:
+                trace_reader[1]
+
+        assert exception.value.args == ('Tick 1 is not recorded in the trace.',)
+
+    def test_invalid_trace_file(self, tmpdir):
+        tmpdir.join('trace.bin').write('not a trace')
+
+        with pytest.raises(TraceError):
+            TraceReader(str(tmpdir.join('trace.bin')))
+
+
+@pytest.fixture(params=[CompactConveyorBelt, SparseConveyorBelt])
+def belt_class(request):
+    return request.param
+
+
+class TestCompactAndSparseConveyorBelts:
+    @pytest.mark.parametrize('intern_items', [False, True])
+    def test_matches_conveyor_belt(self, belt_class, intern_items):
+        config = FactoryFloorConfig(conveyor_belt_slots=10, intern_items=intern_items)
+        belt_config = config.interned() if intern_items else config
+        conveyor_belt = ConveyorBelt(config=belt_config)
+        compact_conveyor_belt = belt_class(config=belt_config)
+        for belt in [conveyor_belt, compact_conveyor_belt]:
+            belt.enqueue(belt_config.required_items[0])
+            belt.put_item_in_slot(slot_number=3, item=belt_config.product_code)
+            belt.retrieve_item_from_slot(slot_number=0)
+            belt.confirm_operation_at_slot_finished(slot_number=0)
+            belt.dequeue()
+            belt.enqueue(belt_config.required_items[1])
+
+        assert compact_conveyor_belt.snapshot() == conveyor_belt.snapshot()
+        assert compact_conveyor_belt.slot_states == conveyor_belt.slot_states
+        assert compact_conveyor_belt.busy_bitmap() == conveyor_belt.busy_bitmap() == bytes([0b1000, 0])
+        for slot_number in range(10):
+            assert compact_conveyor_belt.is_slot_free(slot_number) == conveyor_belt.is_slot_free(slot_number)
+            assert compact_conveyor_belt.is_slot_empty(slot_number) == conveyor_belt.is_slot_empty(slot_number)
+
+    def test_enqueue_on_full_belt_pushes_last_item_off(self, belt_class, factory_floor_config):
+        conveyor_belt = belt_class(config=factory_floor_config)
+        conveyor_belt[2] = 'B'
+
+        assert conveyor_belt.enqueue('A') == 'B'
+        assert conveyor_belt.items == ['A', 'E', 'E']
+
+    def test_many_distinct_items(self, belt_class):
+        conveyor_belt = belt_class(config=FactoryFloorConfig(conveyor_belt_slots=400))
+        for number in range(400):
+            conveyor_belt.enqueue(number)
+
+        assert conveyor_belt.items == list(reversed(range(400)))
+
+    def test_snapshot_restore_and_fork(self, belt_class, factory_floor_config):
+        conveyor_belt = belt_class(config=factory_floor_config)
+        conveyor_belt.enqueue('A')
+        conveyor_belt.put_item_in_slot(slot_number=1, item='B')
+        forked_conveyor_belt = conveyor_belt.fork()
+        restored_conveyor_belt = belt_class(config=factory_floor_config)
+        restored_conveyor_belt.restore(conveyor_belt.snapshot())
+        conveyor_belt.confirm_operation_at_slot_finished(slot_number=1)
+
+        assert forked_conveyor_belt.snapshot() == restored_conveyor_belt.snapshot() == (
+            ('A', 'B', 'E'), ('free', 'busy', 'free')
+        )
+        assert conveyor_belt.is_slot_free(slot_number=1)
+
+    def test_invalid_slot(self, belt_class, factory_floor_config):
+        with pytest.raises(IndexError):
+            belt_class(config=factory_floor_config).check_item_at_slot(3)
+
+    @pytest.mark.parametrize('intern_items, worker_class', [(False, Worker), (True, CompiledWorker)])
+    def test_factory_floor_matches_conveyor_belt(self, belt_class, intern_items, worker_class):
+        def make_factory_floor(conveyor_belt_class):
+            config = FactoryFloorConfig(num_steps=300, conveyor_belt_slots=20, num_pairs=12, intern_items=intern_items)
+            return FactoryFloor(
+                config=config,
+                feeder=Feeder(('A', 'B', 'E'), seed=13),
+                worker_class=worker_class,
+                conveyor_belt_class=conveyor_belt_class,
+            )
+
+        factory_floor = make_factory_floor(ConveyorBelt)
+        compact_factory_floor = make_factory_floor(belt_class)
+        factory_floor.run()
+        compact_factory_floor.run(event_driven=True)
+
+        assert isinstance(compact_factory_floor.conveyor_belt, belt_class)
+        assert compact_factory_floor.snapshot() == factory_floor.snapshot()
+
+
+class TestSparseConveyorBelt:
+    def test_memory_follows_occupied_slots(self):
+        conveyor_belt = SparseConveyorBelt(config=FactoryFloorConfig(conveyor_belt_slots=1000000))
+        conveyor_belt.enqueue('A')
+        for _ in range(10):
+            conveyor_belt.enqueue('E')
+        conveyor_belt.put_item_in_slot(slot_number=999999, item='P')
+
+        assert conveyor_belt.num_occupied_slots == 2
+        assert conveyor_belt.check_item_at_slot(10) == 'A'
+        assert conveyor_belt.is_slot_empty(11)
+        assert conveyor_belt.enqueue('E') == 'P'
+        assert conveyor_belt.num_occupied_slots == 1
@@ -0,0 +1,219 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.domain_models.conveyor_belt import CompactConveyorBelt
+from src.domain_models.factory_floor import FactoryFloor
+from src.domain_models.feeder import Feeder
+from src.domain_models.intents import ConflictPolicy, TickMode
+from src.domain_models.receiver import Receiver
+from src.domain_models.worker import CompiledWorker
+from src.engines.batch import BatchFactoryFloor
+from src.engines.pipeline import PipelineFactoryFloor
+from src.engines.vectorized import VectorizedFactoryFloor, ItemCodes
+from src.exceptions.exceptions import FactoryConfigError, PipelineError
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig
+
+
+def random_feed_input(components, num_steps, seed):
+    generator = random.Random(seed)
+    return [generator.choice(components) for _ in range(num_steps)]
+
+
+class TestItemCodes:
+    def test_known_items_are_registered_first(self, factory_floor_config):
+        item_codes = ItemCodes(factory_floor_config)
+        assert item_codes.encode('E') == ItemCodes.EMPTY
+        assert item_codes.encode('P') == ItemCodes.PRODUCT
+        assert item_codes.encode('A') == 2
+        assert item_codes.encode('B') == 3
+
+    def test_new_items_get_next_code(self, factory_floor_config):
+        item_codes = ItemCodes(factory_floor_config)
+        assert item_codes.encode(7) == 4
+        assert item_codes.encode(7) == 4
+        assert item_codes.decode(4) == 7
+
+
+class TestVectorizedFactoryFloor:
+    def test_basic_run_belt(self):
+        floor = VectorizedFactoryFloor(feeder=Feeder(feed_input=range(1, 11)), receiver=Receiver(keep_items=True))
+        floor.run()
+        assert floor.receiver.received_items == ['E', 'E', 'E', 1, 2, 3, 4, 5, 6, 7]
+        assert floor.time == 10
+
+    def test_run_out_of_feed_items(self):
+        floor = VectorizedFactoryFloor(feeder=Feeder(feed_input=[1]))
+
+        with pytest.raises(FactoryConfigError) as exception:
+            floor.run()
+
+        assert exception.value.args == (
+            'Insufficient amount of items available in the feed_input of the Feeder. Please check your configuration.',
+        )
+
+    def test_num_pairs_exceeding_num_slots(self):
+        with pytest.raises(FactoryConfigError):
+            VectorizedFactoryFloor(config=FactoryFloorConfig(num_pairs=4))
+
+    @pytest.mark.parametrize('slots, num_pairs, required_items, components, seed', [
+        (3, 3, ['A', 'B'], ['A', 'B', 'E'], 0),
+        (10, 7, ['A', 'B'], ['A', 'B', 'E'], 1),
+        (25, 25, ['A', 'B', 'C'], ['A', 'B', 'C', 'E', 'X'], 2),
+        (8, 4, ['A'], ['A', 'E'], 3),
+    ])
+    def test_matches_factory_floor(self, slots, num_pairs, required_items, components, seed):
+        num_steps = 400
+        feed_input = random_feed_input(components, num_steps, seed)
+        config = FactoryFloorConfig(
+            required_items=required_items, num_steps=num_steps, conveyor_belt_slots=slots, num_pairs=num_pairs
+        )
+        factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(feed_input=feed_input), receiver=Receiver(keep_items=True)
+        )
+        vectorized_floor = VectorizedFactoryFloor(
+            config=config, feeder=Feeder(feed_input=feed_input), receiver=Receiver(keep_items=True)
+        )
+
+        factory_floor.run()
+        vectorized_floor.run()
+
+        assert 'P' in factory_floor.receiver.received_items
+        assert vectorized_floor.receiver.received_items == factory_floor.receiver.received_items
+        assert vectorized_floor.belt_items == factory_floor.conveyor_belt.items
+
+
+class TestBatchFactoryFloor:
+    def test_replicas_match_factory_floor(self):
+        num_replicas = 5
+        config = FactoryFloorConfig(num_steps=300, conveyor_belt_slots=6, num_pairs=4)
+        batch_floor = BatchFactoryFloor(config=config, num_replicas=num_replicas, components=('A', 'B', 'E'), seed=7)
+
+        result = batch_floor.run()
+
+        draws = np.random.default_rng(7).integers(3, size=(300, num_replicas))
+        for replica in range(num_replicas):
+            feed_input = [('A', 'B', 'E')[draw] for draw in draws[:, replica]]
+            factory_floor = FactoryFloor(config=config, feeder=Feeder(feed_input=feed_input))
+            factory_floor.run()
+            assert result.product_counts[replica] == factory_floor.receiver.statistics.products
+
+    def test_confidence_interval(self):
+        config = FactoryFloorConfig(num_steps=200)
+        result = BatchFactoryFloor(
+            config=config, num_replicas=50, components=('A', 'B', 'E'), seed=1
+        ).run(confidence=0.9)
+
+        assert result.num_steps == 200
+        assert result.product_counts.shape == (50,)
+        assert result.confidence_interval.confidence == 0.9
+        assert result.confidence_interval.lower < result.mean_product_count < result.confidence_interval.upper
+        assert result.mean_product_count == result.product_counts.mean()
+        assert result.products_per_tick == pytest.approx(result.product_counts.mean() / 200)
+
+    def test_single_replica(self):
+        with pytest.raises(FactoryConfigError):
+            BatchFactoryFloor(num_replicas=1)
+
+
+class TestPipelineFactoryFloor:
+    @pytest.mark.parametrize('slots, num_pairs, num_segments, chunk_size', [
+        (10, 10, 3, 7),
+        (12, 5, 4, 1),
+        (6, 6, 1, 256),
+    ])
+    def test_matches_factory_floor(self, slots, num_pairs, num_segments, chunk_size):
+        config = FactoryFloorConfig(
+            required_items=['A', 'B', 'C'], num_steps=200, conveyor_belt_slots=slots, num_pairs=num_pairs
+        )
+        components = ('A', 'B', 'C', 'E', 'X')
+        factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(components, seed=3), receiver=Receiver(config=config, keep_items=True)
+        )
+        pipeline_factory_floor = PipelineFactoryFloor(
+            config=config, feeder=Feeder(components, seed=3), receiver=Receiver(config=config, keep_items=True),
+            num_segments=num_segments, chunk_size=chunk_size,
+        )
+
+        for _ in range(2):
+            factory_floor.run()
+            pipeline_factory_floor.run()
+
+            assert pipeline_factory_floor.time == factory_floor.time
+            assert pipeline_factory_floor.receiver.received_items == factory_floor.receiver.received_items
+            assert pipeline_factory_floor.belt_items == factory_floor.conveyor_belt.items
+        assert factory_floor.receiver.statistics.products > 0
+
+    def test_two_phase_compiled_workers_match_factory_floor(self):
+        config = FactoryFloorConfig(num_steps=300, conveyor_belt_slots=9, num_pairs=8)
+        factory_floor = FactoryFloor(
+            config=config, feeder=Feeder(('A', 'B', 'E'), seed=4), tick_mode=TickMode.TWO_PHASE,
+            conflict_policy=ConflictPolicy.ROTATE,
+        )
+        pipeline_factory_floor = PipelineFactoryFloor(
+            config=config, feeder=Feeder(('A', 'B', 'E'), seed=4), num_segments=3, chunk_size=16,
+            worker_class=CompiledWorker, conveyor_belt_class=CompactConveyorBelt, tick_mode=TickMode.TWO_PHASE,
+            conflict_policy=ConflictPolicy.ROTATE,
+        )
+        factory_floor.run()
+        pipeline_factory_floor.run()
+
+        assert pipeline_factory_floor.receiver.snapshot() == factory_floor.receiver.snapshot()
+        assert pipeline_factory_floor.belt_items == factory_floor.conveyor_belt.items
+
+    def test_run_out_of_feed_items(self):
+        config = FactoryFloorConfig(num_steps=100, conveyor_belt_slots=6)
+        pipeline_factory_floor = PipelineFactoryFloor(
+            config=config, feeder=Feeder(feed_input=range(50)), receiver=Receiver(keep_items=True), num_segments=2,
+            chunk_size=16,
+        )
+
+        with pytest.raises(FactoryConfigError):
+            pipeline_factory_floor.run()
+
+        assert pipeline_factory_floor.time == 50
+        assert pipeline_factory_floor.receiver.received_items == ['E'] * 6 + list(range(45))
+
+    def test_feeder_error_is_raised(self):
+        def feed_input():
+            yield 'A'
+            yield 'B'
+            raise ValueError('Unable to decode item 3.')
+
+        config = FactoryFloorConfig(num_steps=100, conveyor_belt_slots=6)
+        pipeline_factory_floor = PipelineFactoryFloor(
+            config=config, feeder=Feeder(feed_input=feed_input()), receiver=Receiver(keep_items=True), num_segments=2,
+            chunk_size=16,
+        )
+
+        with pytest.raises(ValueError) as exception:
+            pipeline_factory_floor.run()
+
+        assert exception.value.args == ('Unable to decode item 3.',)
+        assert pipeline_factory_floor.time == 2
+        # The item leaving the belt in the tick the feeder failed in is received too, the same as with FactoryFloor.
+        assert pipeline_factory_floor.receiver.received_items == ['E', 'E', 'E']
+
+    def test_run_after_failed_run(self):
+        config = FactoryFloorConfig(num_steps=100, conveyor_belt_slots=6)
+        pipeline_factory_floor = PipelineFactoryFloor(
+            config=config, feeder=Feeder(feed_input=range(50)), num_segments=2, chunk_size=16,
+        )
+        with pytest.raises(FactoryConfigError):
+            pipeline_factory_floor.run()
+        pipeline_factory_floor.feeder = Feeder(feed_input=range(100))
+
+        with pytest.raises(PipelineError) as exception:
+            pipeline_factory_floor.run()
+
+        assert exception.value.args == (
+            'A run of the pipeline failed at time 50, so its belt no longer matches time and the receiver. Please'
+            ' create a new PipelineFactoryFloor.',
+        )
+        assert pipeline_factory_floor.time == 50
+
+    @pytest.mark.parametrize('num_segments', [-1, 7])
+    def test_invalid_num_segments(self, num_segments):
+        with pytest.raises(FactoryConfigError):
+            PipelineFactoryFloor(config=FactoryFloorConfig(conveyor_belt_slots=6), num_segments=num_segments)
@@ -0,0 +1,221 @@
+import pytest
+
+from src.domain_models.factory_floor import FactoryFloor
+from src.domain_models.feeder import Feeder
+from src.experiments.branches import run_branches
+from src.experiments.comparison import compare_configs
+from src.experiments.markov_chain import EstimationMethod, estimate_throughput
+from src.experiments.sequential import estimate_products_per_tick
+from src.experiments.sweep import SweepPoint, SweepResult, grid, load_results, main, point_seed, run_point, sweep
+from src.factory_floor_configuration.factory_floor_configuration import FactoryFloorConfig
+from src.exceptions.exceptions import FactoryConfigError
+
+
+def small_grid():
+    return list(grid(conveyor_belt_slots=[3, 4], num_pairs=[1, 4], num_steps=[50], required_items=[['A', 'B']]))
+
+
+class TestSweep:
+    def test_grid_skips_more_pairs_than_slots(self):
+        assert small_grid() == [
+            SweepPoint(conveyor_belt_slots=3, num_pairs=1, num_steps=50, required_items=('A', 'B')),
+            SweepPoint(conveyor_belt_slots=4, num_pairs=1, num_steps=50, required_items=('A', 'B')),
+            SweepPoint(conveyor_belt_slots=4, num_pairs=4, num_steps=50, required_items=('A', 'B')),
+        ]
+
+    def test_point_seed_is_deterministic(self):
+        first, second, _ = small_grid()
+        assert point_seed(0, first) == point_seed(0, first)
+        assert point_seed(0, first) != point_seed(0, second)
+        assert point_seed(0, first) != point_seed(1, first)
+
+    def test_run_point_is_reproducible(self):
+        point = small_grid()[2]
+        first_result, second_result = run_point(point, base_seed=3), run_point(point, base_seed=3)
+        assert first_result.products == second_result.products
+        assert first_result.products_per_tick == first_result.products / 50
+
+    def test_result_json_round_trip(self):
+        result = run_point(small_grid()[0])
+        assert SweepResult.from_json(result.to_json()) == result
+
+    def test_sweep_matches_sequential_runs(self):
+        points = small_grid()
+        results = sorted(sweep(points, base_seed=5, processes=2), key=lambda result: points.index(result.point))
+        assert [result.products for result in results] == [run_point(point, 5).products for point in points]
+
+    def test_sweep_resumes_from_results_file(self, tmpdir):
+        results_path = str(tmpdir.join('results.jsonl'))
+        points = small_grid()
+        first_result = run_point(points[0])
+        with open(results_path, 'w') as results_file:
+            results_file.write(first_result.to_json() + '\n')
+            results_file.write('{"conveyor_belt_slots": 4, "num_pa')
+
+        resumed_results = list(sweep(points, processes=2, results_path=results_path))
+
+        assert {result.point for result in resumed_results} == set(points[1:])
+        assert {result.point for result in load_results(results_path)} == set(points)
+        assert list(sweep(points, processes=2, results_path=results_path)) == []
+
+    def test_cli(self, tmpdir, capsys):
+        results_path = str(tmpdir.join('results.jsonl'))
+        main([
+            '--conveyor-belt-slots', '3', '--num-pairs', '1', '2', '--num-steps', '20', '--required-items', 'A,B',
+            '--processes', '1', '--results', results_path,
+        ])
+
+        printed_results = [SweepResult.from_json(line) for line in capsys.readouterr().out.splitlines()]
+        assert sorted(result.point.num_pairs for result in printed_results) == [1, 2]
+        assert sorted(load_results(results_path)) == sorted(printed_results)
+
+
+class TestMarkovChain:
+    def test_estimate_matches_long_simulation(self):
+        config = FactoryFloorConfig(conveyor_belt_slots=3, num_pairs=1)
+        estimate = estimate_throughput(config, components=('A', 'B', 'E'))
+        simulated_estimate = estimate_throughput(
+            config, components=('A', 'B', 'E'), max_states=1, simulation_steps=100000, seed=0
+        )
+
+        assert estimate.method == EstimationMethod.MARKOV_CHAIN
+        assert estimate.num_states == 59
+        assert estimate.converged
+        assert simulated_estimate.method == EstimationMethod.SIMULATION
+        assert estimate.products_per_tick == pytest.approx(simulated_estimate.products_per_tick, abs=0.005)
+
+    def test_estimate_of_default_floor(self):
+        estimate = estimate_throughput(components=('A', 'B', 'E'))
+        simulated_estimate = estimate_throughput(
+            components=('A', 'B', 'E'), max_states=1, simulation_steps=100000, seed=0
+        )
+
+        assert estimate.method == EstimationMethod.MARKOV_CHAIN
+        assert estimate.converged
+        assert estimate.products_per_tick == pytest.approx(simulated_estimate.products_per_tick, abs=0.005)
+
+    def test_estimate_not_converged(self):
+        config = FactoryFloorConfig(conveyor_belt_slots=3, num_pairs=1)
+        estimate = estimate_throughput(config, components=('A', 'B', 'E'), max_iterations=3)
+
+        assert estimate.method == EstimationMethod.MARKOV_CHAIN
+        assert not estimate.converged
+
+    def test_estimate_of_deadlocked_floor_is_zero(self):
+        estimate = estimate_throughput(FactoryFloorConfig(conveyor_belt_slots=1, num_pairs=1), components=('A',))
+        assert estimate.products_per_tick == 0
+
+    def test_estimate_of_fully_predictable_floor(self):
+        # Feed of only empty slots is a single state in which nothing ever happens.
+        estimate = estimate_throughput(components=('E',))
+        assert estimate.num_states == 1
+        assert estimate.products_per_tick == 0
+
+    def test_weighted_estimate_matches_long_simulation(self):
+        config = FactoryFloorConfig(conveyor_belt_slots=3, num_pairs=1)
+        weights = (1, 1, 3)
+        estimate = estimate_throughput(config, components=('A', 'B', 'E'), weights=weights)
+        simulated_estimate = estimate_throughput(
+            config, components=('A', 'B', 'E'), weights=weights, max_states=1, simulation_steps=100000, seed=0
+        )
+
+        assert estimate.method == EstimationMethod.MARKOV_CHAIN
+        assert estimate.products_per_tick == pytest.approx(simulated_estimate.products_per_tick, abs=0.005)
+
+
+class TestBranches:
+    def test_run_branches(self):
+        factory_floor = FactoryFloor(config=FactoryFloorConfig(num_steps=100), feeder=Feeder(('A', 'B', 'E'), seed=6))
+        factory_floor.run()
+        snapshot = factory_floor.snapshot()
+
+        def without_workers(floor):
+            fork = floor.fork()
+            fork.workers.clear()
+            return fork
+
+        results = run_branches(
+            factory_floor,
+            {
+                'unchanged': lambda floor: floor.fork(),
+                'no workers': without_workers,
+                'only empty slots': lambda floor: floor.fork(feeder=Feeder(('E',))),
+            },
+            num_steps=200,
+        )
+
+        factory_floor.run()
+        factory_floor.run()
+        assert results['unchanged'].products == factory_floor.receiver.statistics.products
+        assert results['unchanged'].time == 300
+        # Without workers only products already on the belt can still be delivered.
+        assert results['no workers'].products <= snapshot.receiver[1] + factory_floor.config.conveyor_belt_slots
+        assert results['only empty slots'].products_per_tick < results['unchanged'].products_per_tick
+
+
+class TestSequentialEstimation:
+    def test_interval_covers_exact_throughput(self):
+        config = FactoryFloorConfig(conveyor_belt_slots=4, num_pairs=2)
+        exact = estimate_throughput(config, components=('A', 'B', 'E'))
+        assert exact.method == EstimationMethod.MARKOV_CHAIN
+
+        estimate = estimate_products_per_tick(
+            FactoryFloor(config=config, feeder=Feeder(('A', 'B', 'E'), seed=2)), relative_precision=0.05
+        )
+
+        assert estimate.converged
+        assert estimate.num_steps < 10000
+        assert estimate.confidence_interval.relative_half_width <= 0.05
+        assert estimate.confidence_interval.lower <= exact.products_per_tick <= estimate.confidence_interval.upper
+        assert estimate.products_per_tick == estimate.confidence_interval.mean
+
+    def test_initial_belt_is_dropped_as_warm_up(self):
+        config = FactoryFloorConfig(conveyor_belt_slots=100, num_pairs=3)
+        factory_floor = FactoryFloor(config=config, feeder=Feeder(('A', 'B', 'E'), seed=1))
+
+        estimate = estimate_products_per_tick(factory_floor, relative_precision=0.1, check_every=500)
+
+        assert estimate.converged
+        assert estimate.warm_up_steps >= 100
+        assert factory_floor.time == estimate.num_steps
+
+    def test_stops_after_max_steps(self):
+        estimate = estimate_products_per_tick(
+            FactoryFloor(feeder=Feeder(('A', 'B', 'E'), seed=3)), relative_precision=0.001, max_steps=1500
+        )
+
+        assert not estimate.converged
+        assert estimate.num_steps == 1500
+        assert estimate.confidence_interval.relative_half_width > 0.001
+
+
+class TestComparison:
+    @pytest.mark.parametrize('antithetic', [False, True])
+    def test_common_random_numbers_narrow_the_difference(self, antithetic):
+        first = FactoryFloorConfig(conveyor_belt_slots=6, num_pairs=3, num_steps=500)
+        second = FactoryFloorConfig(conveyor_belt_slots=6, num_pairs=4, num_steps=500)
+
+        comparison = compare_configs(
+            first, second, num_replicas=6, components=('A', 'B', 'E'), base_seed=1, antithetic=antithetic
+        )
+
+        assert comparison.num_replicas == 6
+        assert comparison.antithetic is antithetic
+        assert comparison.difference.mean == pytest.approx(comparison.second.mean - comparison.first.mean)
+        assert comparison.difference.half_width < comparison.independent_half_width
+        assert comparison.variance_reduction > 2
+
+    def test_same_configs_do_not_differ(self):
+        config = FactoryFloorConfig(num_steps=200)
+
+        comparison = compare_configs(config, config, num_replicas=3, components=('A', 'B', 'E'))
+
+        assert comparison.first == comparison.second
+        assert comparison.difference.mean == comparison.difference.half_width == 0
+        assert comparison.variance_reduction == float('inf')
+
+    def test_single_replica(self):
+        with pytest.raises(FactoryConfigError) as exception:
+            compare_configs(FactoryFloorConfig(), FactoryFloorConfig(), num_replicas=1)
+
+        assert exception.value.args == ('At least 2 replicas are required to estimate a confidence interval, got 1.',)
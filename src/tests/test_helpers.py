@@ -0,0 +1,70 @@
+import pytest
+
+from src.helpers.statistics import (
+    batch_means_confidence_interval, mean_confidence_interval, mser_truncation, normal_quantile,
+    student_t_quantile,
+)
+
+
+class TestStatistics:
+    @pytest.mark.parametrize('probability, quantile', [(0.5, 0.0), (0.975, 1.959964), (0.95, 1.644854)])
+    def test_normal_quantile(self, probability, quantile):
+        assert normal_quantile(probability) == pytest.approx(quantile, abs=1e-6)
+
+    @pytest.mark.parametrize('probability, degrees_of_freedom, quantile', [
+        (0.5, 9, 0.0),
+        (0.975, 1, 12.706205),
+        (0.975, 2, 4.302653),
+        (0.975, 9, 2.262157),
+        (0.975, 19, 2.093024),
+        (0.95, 30, 1.697261),
+        (0.025, 9, -2.262157),
+        (0.975, 5000, 1.960439),
+    ])
+    def test_student_t_quantile(self, probability, degrees_of_freedom, quantile):
+        assert student_t_quantile(probability, degrees_of_freedom) == pytest.approx(quantile, abs=1e-6)
+
+    def test_mean_confidence_interval(self):
+        interval = mean_confidence_interval([1, 2, 3, 4, 5])
+        assert interval.mean == 3
+        # Student's t quantile with 4 degrees of freedom.
+        assert interval.half_width == pytest.approx(2.776445 * (2.5 / 5) ** 0.5)
+        assert interval.lower == pytest.approx(3 - interval.half_width)
+        assert interval.upper == pytest.approx(3 + interval.half_width)
+
+    def test_mean_confidence_interval_not_enough_samples(self):
+        with pytest.raises(ValueError) as exception:
+            mean_confidence_interval([1])
+
+        assert exception.value.args == (
+            'At least 2 samples are required to estimate a confidence interval, got 1.',
+        )
+
+    @pytest.mark.parametrize('observations, truncation', [
+        ([0] * 20 + [1, 3] * 50, 20),
+        ([1, 3] * 50, 0),
+        ([5], 0),
+    ])
+    def test_mser_truncation(self, observations, truncation):
+        assert mser_truncation(observations) == truncation
+
+    def test_batch_means_confidence_interval(self):
+        interval = batch_means_confidence_interval(list(range(42)), num_batches=4, confidence=0.9)
+        assert interval == mean_confidence_interval([6.5, 16.5, 26.5, 36.5], confidence=0.9)
+
+    def test_batch_means_confidence_interval_uses_t_quantile(self):
+        observations = [number % 7 for number in range(200)]
+        interval = batch_means_confidence_interval(observations, num_batches=20)
+
+        batch_means = [sum(observations[start:start + 10]) / 10 for start in range(0, 200, 10)]
+        mean = sum(batch_means) / 20
+        standard_error = (sum((batch_mean - mean) ** 2 for batch_mean in batch_means) / 19 / 20) ** 0.5
+        assert interval.half_width == pytest.approx(2.093024 * standard_error)
+
+    def test_batch_means_confidence_interval_not_enough_observations(self):
+        with pytest.raises(ValueError) as exception:
+            batch_means_confidence_interval([1, 2, 3], num_batches=4)
+
+        assert exception.value.args == (
+            'Unable to split 3 observations into 4 batches. At least 2 non-empty batches are required.',
+        )